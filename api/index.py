@@ -1,9 +1,28 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from api.modules.service_metrics import router as metrics_router
 from api.modules.stock import router as stock_router
+from api.modules.stock_chart import CHINA_INDEX_MAP
+from api.modules.stock_search import symbol_index
+from api.modules.stock_stream import stream_hub
+from api.modules.utils.metrics import MetricsMiddleware
+from api.modules.utils.prefetcher import market_prefetcher
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 在后台构建证券代码索引，不阻塞服务启动
+    symbol_index.start_background_refresh()
+    # 后台预取行情快照、主要指数和热门代码，首个访问者直接命中缓存
+    market_prefetcher.start(index_tickers=list(CHINA_INDEX_MAP))
+    yield
+    market_prefetcher.stop()
+    symbol_index.stop_background_refresh()
+    stream_hub.close()
 
 # Create FastAPI instance with custom docs and openapi url
-app = FastAPI(docs_url="/api/py/docs", openapi_url="/api/py/openapi.json")
+app = FastAPI(docs_url="/api/py/docs", openapi_url="/api/py/openapi.json", lifespan=lifespan)
 
 # 添加 CORS 中间件
 app.add_middleware(
@@ -14,9 +33,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 记录各接口的请求数、状态码和耗时
+app.add_middleware(MetricsMiddleware)
+
 # Register routers
 app.include_router(stock_router, prefix="/api/py")
 
+# 服务指标接口 (/api/py/metrics)
+app.include_router(metrics_router, prefix="/api/py")
+
 # 专为 Vercel 添加的处理函数入口点
 @app.get("/")
 async def root():
@@ -0,0 +1,117 @@
+from typing import List
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from .stock_stream import stream_hub
+from .utils import cache_backend as shared_cache
+from .utils.bar_cache import intraday_bar_cache
+from .utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, circuit_breakers
+from .utils.disk_cache import disk_cache
+from .utils.latency import source_latency
+from .utils.market_snapshot import index_snapshot, market_snapshot
+from .utils.metrics import PROMETHEUS_CONTENT_TYPE, MetricFamily, hit_ratio, metrics
+
+router = APIRouter(tags=["metrics"])
+
+# 熔断器状态导出为数值：0关闭，1半开，2打开
+BREAKER_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+def _collect_caches() -> List[MetricFamily]:
+    """行情快照和分时K线缓存的命中统计"""
+    snapshots = [snapshot.stats() for snapshot in (market_snapshot, index_snapshot)]
+    bars = intraday_bar_cache.stats()
+    disk = disk_cache.stats()
+    shared = shared_cache.cache_backend.stats()
+    return [
+        MetricFamily("snapshot_cache_requests_total", "counter", "行情快照缓存访问次数", [
+            ({"cache": stats["name"], "result": result}, stats[result])
+            for stats in snapshots
+            for result in ("hits", "stale_hits", "misses")
+        ]),
+        MetricFamily("snapshot_cache_hit_ratio", "gauge", "行情快照缓存命中率（含过期命中）", [
+            ({"cache": stats["name"]}, hit_ratio(stats["hits"] + stats["stale_hits"], stats["misses"]))
+            for stats in snapshots
+        ]),
+        MetricFamily("snapshot_cache_refresh_errors_total", "counter", "行情快照刷新失败次数", [
+            ({"cache": stats["name"]}, stats["errors"]) for stats in snapshots
+        ]),
+        MetricFamily("snapshot_cache_age_seconds", "gauge", "行情快照距上次刷新的时间", [
+            ({"cache": stats["name"]}, stats["age_seconds"]) for stats in snapshots
+        ]),
+        MetricFamily("bar_cache_requests_total", "counter", "分时K线缓存访问次数", [
+            ({"result": result}, bars[result]) for result in ("hits", "misses")
+        ]),
+        MetricFamily("bar_cache_hit_ratio", "gauge", "分时K线缓存命中率", [
+            ({}, hit_ratio(bars["hits"], bars["misses"]))
+        ]),
+        MetricFamily("bar_cache_entries", "gauge", "分时K线缓存条目数", [({}, bars["entries"])]),
+        MetricFamily("bar_cache_bytes", "gauge", "分时K线缓存占用内存", [({}, bars["bytes"])]),
+        MetricFamily("bar_cache_evictions_total", "counter", "分时K线缓存淘汰次数", [({}, bars["evictions"])]),
+        MetricFamily("disk_cache_requests_total", "counter", "磁盘缓存读取次数", [
+            ({"result": result}, disk[result]) for result in ("hits", "misses")
+        ]),
+        MetricFamily("disk_cache_writes_total", "counter", "磁盘缓存写入次数", [({}, disk["writes"])]),
+        MetricFamily("disk_cache_errors_total", "counter", "磁盘缓存读写失败次数", [({}, disk["errors"])]),
+        MetricFamily("disk_cache_bytes", "gauge", "磁盘缓存文件大小", [({}, disk["bytes"])]),
+        MetricFamily("shared_cache_requests_total", "counter", "共享缓存后端读取次数", [
+            ({"backend": shared["backend"], "result": result}, shared[result]) for result in ("hits", "misses")
+        ]),
+        MetricFamily("shared_cache_errors_total", "counter", "共享缓存后端访问失败次数", [
+            ({"backend": shared["backend"]}, shared["errors"])
+        ]),
+        MetricFamily("shared_cache_loads_total", "counter", "使用其他工作进程共享数据的次数", [
+            ({"cache": stats["name"]}, stats["shared_loads"]) for stats in snapshots
+        ] + [({"cache": "intraday_bars"}, bars["shared_loads"])]),
+        MetricFamily("refresh_lock_total", "counter", "刷新锁获取结果（contended 表示等待其他工作进程刷新）", [
+            ({"result": result}, count) for result, count in shared_cache.refresh_lock_stats.items()
+        ]),
+    ]
+
+
+def _collect_upstream() -> List[MetricFamily]:
+    """上游数据源的熔断器状态和对冲请求耗时"""
+    breakers = circuit_breakers.stats()
+    histograms = source_latency.items()
+    return [
+        MetricFamily("upstream_breaker_state", "gauge", "熔断器状态（0关闭，1半开，2打开）", [
+            ({"source": name}, BREAKER_STATE_VALUES.get(stats["state"], 0)) for name, stats in breakers.items()
+        ]),
+        MetricFamily("upstream_error_rate", "gauge", "统计窗口内的失败率", [
+            ({"source": name}, stats["error_rate"]) for name, stats in breakers.items()
+        ]),
+        MetricFamily("upstream_latency_ewma_seconds", "gauge", "成功调用耗时的指数移动平均", [
+            ({"source": name}, stats["latency_ewma_seconds"]) for name, stats in breakers.items()
+        ]),
+        MetricFamily("upstream_rejected_total", "counter", "熔断期间被拒绝的调用次数", [
+            ({"source": name}, stats["rejected"]) for name, stats in breakers.items()
+        ]),
+        MetricFamily("upstream_request_duration_seconds", "histogram", "数据源请求耗时（含对冲请求）", [
+            ({"source": name}, histogram) for name, histogram in histograms
+        ]),
+        MetricFamily("upstream_request_errors_total", "counter", "数据源请求失败次数", [
+            ({"source": name}, histogram.errors) for name, histogram in histograms
+        ]),
+    ]
+
+
+def _collect_stream() -> List[MetricFamily]:
+    """实时推送的连接数"""
+    stats = stream_hub.stats()
+    return [
+        MetricFamily("stream_tickers", "gauge", "正在轮询的推送订阅键数量", [({}, stats["tickers"])]),
+        MetricFamily("stream_subscribers", "gauge", "推送订阅数量", [({}, stats["subscribers"])]),
+    ]
+
+
+metrics.register_collector(_collect_caches)
+metrics.register_collector(_collect_upstream)
+metrics.register_collector(_collect_stream)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def service_metrics() -> PlainTextResponse:
+    """
+    Prometheus 格式的服务指标：akshare调用、接口耗时和状态码、缓存命中率、熔断器状态
+    :return: Prometheus 文本格式
+    """
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,9 +1,14 @@
-from typing import Dict, List, Any, Optional
-from fastapi import APIRouter, HTTPException, Query
+from typing import Dict, List, Any, Optional, Union
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from datetime import datetime, timedelta
+import logging
 import pandas as pd
 from .utils.logger import get_logger
-from .utils.stock_data_provider import stock_data_provider
+from .utils.async_data_provider import async_stock_data_provider
+from .utils.bar_series import BarSeries, as_records
+from .utils.columnar import ColumnarJSONResponse, bars_to_columns
+from .utils.http_cache import apply_cache_headers, conditional_response
+from .utils.prefetcher import hot_tickers
 
 # 创建logger实例
 logger = get_logger(__name__)
@@ -17,23 +22,53 @@ CHINA_INDEX_MAP = {
     "sh000852": "中证1000",
 }
 
+# 日线/周线/月线对应的K线周期
+HISTORY_PERIODS = {
+    "D": "daily",
+    "W": "weekly",
+    "M": "monthly",
+}
+
+# 未指定range时各周期的默认时间范围
+DEFAULT_HISTORY_RANGES = {
+    "D": "1y",
+    "W": "5y",
+    "M": "max",
+}
+
+# 前端使用的时间范围 -> StockDataProvider.get_date_range 支持的格式
+RANGE_ALIASES = {
+    "1w": "5d",
+    "1m": "1mo",
+    "3m": "3mo",
+}
+
 @router.get("/stock/chart")
 async def stock_chart(
     ticker: str, 
-    interval: str = "1m"
+    interval: str = "1m",
+    range: Optional[str] = None,
+    format: str = "rows",
+    delta: bool = False,
+    request: Request = None,
+    response: Response = None
 ) -> Dict[str, Any]:
     """
     获取股票图表数据API
     :param ticker: 股票代码
     :param interval: 时间间隔 (1m, 5m, 15m, 30m, 60m, 1d, 1wk, 1mo)
+    :param range: 日线/周线/月线的时间范围 (1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max)，分时数据忽略该参数
+    :param format: 返回格式，rows 为逐条记录（默认），columnar 为列式数组
+    :param delta: columnar 格式下是否对时间和价格做差分编码，见 bars_to_columns
     :return: 图表数据
     """
-    logger.info(f"接收到图表数据请求: ticker={ticker}, interval={interval}")
+    logger.info(f"接收到图表数据请求: ticker={ticker}, interval={interval}, range={range}")
     
     try:
         # 标准化股票代码
-        clean_ticker, is_index = stock_data_provider.standardize_ticker(ticker)
+        clean_ticker, is_index = async_stock_data_provider.standardize_ticker(ticker)
         logger.debug(f"处理后的股票代码: {clean_ticker}, 是否为指数: {is_index}")
+        hot_tickers.record(clean_ticker)
         
         # 转换interval为akshare支持的格式
         ak_interval = _convert_interval(interval)
@@ -42,31 +77,56 @@ async def stock_chart(
         # 获取分时数据
         quotes = []
         if ak_interval in ('1', '5', '15', '30', '60'):
-            # 使用分时数据
-            quotes = stock_data_provider.get_realtime_min_data(clean_ticker, ak_interval)
+            # 使用分时数据，5/15/30/60分钟K线由缓存的1分钟K线聚合，不单独访问上游
+            quotes = await async_stock_data_provider.get_resampled_min_data(clean_ticker, ak_interval)
             if not quotes:
                 logger.warning(f"未能获取到 {ticker} 的分时数据")
         else:
-            # 对于非分钟级别的请求，使用较长时间范围的数据
-            logger.warning(f"不支持的时间间隔: {interval}，默认使用1分钟")
-            quotes = stock_data_provider.get_realtime_min_data(clean_ticker, '1')
+            # 日线/周线/月线从本地历史数据存储读取
+            range_str = RANGE_ALIASES.get(range, range) or DEFAULT_HISTORY_RANGES[ak_interval]
+            start_date, end_date, _ = async_stock_data_provider.get_date_range(range_str)
+            logger.debug(f"K线周期: {HISTORY_PERIODS[ak_interval]}, 时间范围: {start_date.date()} 至 {end_date.date()}")
+            quotes = await async_stock_data_provider.get_daily_history(
+                clean_ticker, start_date.date(), end_date.date(), HISTORY_PERIODS[ak_interval]
+            )
+            if not quotes:
+                logger.warning(f"未能获取到 {ticker} 的历史K线数据")
         
         # 记录最终数据内容
         data_count = len(quotes) if quotes else 0
         logger.info(f"返回数据: 股票={ticker}, 数据点数={data_count}")
-        if quotes and data_count > 0:
+        if quotes and data_count > 0 and logger.isEnabledFor(logging.DEBUG):
             logger.debug(f"第一个数据点: {quotes[0]}")
             logger.debug(f"最后一个数据点: {quotes[-1]}")
         
+        # 数据未变化时返回304，ETag由缓存数据版本和请求参数决定
+        if quotes:
+            if ak_interval in HISTORY_PERIODS:
+                version = async_stock_data_provider.get_daily_version(clean_ticker)
+            else:
+                version = async_stock_data_provider.get_min_data_version(clean_ticker)
+            first_date = quotes.first_date if isinstance(quotes, BarSeries) else quotes[0]["date"]
+            not_modified = conditional_response(
+                request, response, "chart", clean_ticker, ak_interval, range, format, delta, version, first_date
+            )
+            if not_modified is not None:
+                return not_modified
+        
+        if format == "columnar":
+            return apply_cache_headers(_columnar_response(ticker, quotes, delta, None), response)
+        
         # 返回与Yahoo Finance格式兼容的结果
+        # 分时K线序列在这里才转换为逐条记录（同一序列只转换一次）
         return {
             "ticker": ticker,
-            "quotes": quotes,
+            "quotes": as_records(quotes),
             "currency": "CNY",
             "error": None
         }
     except Exception as e:
         logger.error(f"处理图表数据请求时发生错误: {str(e)}", exc_info=True)
+        if format == "columnar":
+            return _columnar_response(ticker, [], delta, str(e))
         return {
             "ticker": ticker,
             "quotes": [],
@@ -74,6 +134,28 @@ async def stock_chart(
             "error": str(e)
         }
 
+def _columnar_response(
+    ticker: str, quotes: Union[BarSeries, List[Dict[str, Any]]], delta: bool, error: Optional[str]
+) -> ColumnarJSONResponse:
+    """
+    生成列式格式的图表数据响应
+    :param ticker: 请求的股票代码
+    :param quotes: 分时K线序列或标准化后的K线
+    :param delta: 是否差分编码
+    :param error: 错误信息
+    :return: 使用orjson序列化的响应
+    """
+    encoded = bars_to_columns(quotes, delta=delta)
+    return ColumnarJSONResponse({
+        "ticker": ticker,
+        "format": "columnar",
+        "count": len(quotes),
+        "columns": encoded["columns"],
+        "encoding": encoded["encoding"],
+        "currency": "CNY",
+        "error": error
+    })
+
 def _convert_interval(interval: str) -> str:
     """
     将前端时间间隔转换为akshare支持的格式
@@ -1,9 +1,14 @@
-from typing import Dict
-from fastapi import APIRouter
-import akshare as ak
+import asyncio
+from typing import Any, Dict
+from fastapi import APIRouter, Request, Response
+import pandas as pd
 from datetime import datetime
-from .utils.logger import get_logger, log_akshare_call
-from .utils.stock_data_provider import stock_data_provider
+from .utils.logger import get_logger
+from .utils.async_data_provider import async_stock_data_provider
+from .utils.prefetcher import hot_tickers
+from .utils.frame_mapper import convert_frame, frame_to_records
+from .utils.http_cache import conditional_response
+from .utils.market_snapshot import index_snapshot, market_snapshot
 
 # 创建logger实例
 logger = get_logger(__name__)
@@ -18,124 +23,56 @@ CHINA_INDEX_MAP = {
     
 }
 
+# 批量报价单次最多支持的代码数量
+MAX_BATCH_TICKERS = 200
+
+# 报价字段 -> 行情快照源列名（东方财富A股行情与新浪指数行情列名一致）
+SPOT_QUOTE_COLUMNS = {
+    "code": "代码",
+    "name": "名称",
+    "price": "最新价",
+    "change": "涨跌额",
+    "change_percent": "涨跌幅",
+    "day_high": "最高",
+    "day_low": "最低",
+    "open": "今开",
+    "previous_close": "昨收",
+    "volume": "成交量",
+    "market_cap": "总市值",
+}
+
 @router.get("/stock/quote")
-async def stock_quote(ticker: str) -> Dict:
+async def stock_quote(ticker: str, request: Request = None, response: Response = None) -> Dict:
     """
     获取股票报价API
     :param ticker: 股票代码
+    :param request: 请求（FastAPI注入，内部调用时为None）
+    :param response: 响应（FastAPI注入，用于设置ETag和Cache-Control）
     :return: 股票报价信息
     """
     logger.info(f"接收到股票报价请求: {ticker}")
     try:
         # 移除前缀符号处理
-        clean_ticker, is_index = stock_data_provider.standardize_ticker(ticker)
+        clean_ticker, is_index = async_stock_data_provider.standardize_ticker(ticker)
         logger.debug(f"处理后的股票代码: {clean_ticker}, 是否为指数: {is_index}")
+        hot_tickers.record(clean_ticker)
         
         # Yahoo Finance 返回格式的基本结构
-        yahoo_response = {
-            "symbol": ticker,
-            "shortName": "",
-            "longName": "",
-            "regularMarketPrice": 0,
-            "regularMarketChange": 0,
-            "regularMarketChangePercent": 0,
-            "regularMarketDayHigh": 0,
-            "regularMarketDayLow": 0,
-            "regularMarketVolume": 0,
-            "regularMarketOpen": 0,
-            "regularMarketPreviousClose": 0,
-            "bid": 0,
-            "ask": 0,
-            "bidSize": 0,
-            "askSize": 0,
-            "marketCap": 0,
-            "currency": "CNY",
-            "market": "cn_market",
-            "exchange": "",
-            "quoteType": "INDEX" if is_index else "EQUITY",
-            "region": "CN",
-            "language": "zh-CN",
-            "fiftyTwoWeekLow": 0,
-            "fiftyTwoWeekHigh": 0,
-            "fiftyTwoWeekLowChange": 0,
-            "fiftyTwoWeekHighChange": 0,
-            "fiftyTwoWeekLowChangePercent": 0,
-            "fiftyTwoWeekHighChangePercent": 0,
-            "priceHint": 2,
-            "fullExchangeName": "",
-            "averageDailyVolume3Month": 0
-        }
+        yahoo_response = _new_quote_response(ticker, is_index)
         
-        # 使用stock_data_provider获取最新的分时数据，与图表数据来源保持一致
-        logger.info(f"通过stock_data_provider获取{ticker}的最新分时数据")
-        quotes = stock_data_provider.get_realtime_min_data(ticker, interval='1')
+        # 使用与图表相同的分时缓存计算报价字段，K线未更新时直接复用已计算的结果
+        logger.info(f"通过async_stock_data_provider获取{ticker}的报价字段")
+        stats = await async_stock_data_provider.get_quote_stats(ticker)
         
-        if quotes and len(quotes) > 0:
-            # 获取最新一条数据和第一条数据
-            latest_quote = quotes[-1]
-            first_quote = quotes[0] if len(quotes) > 1 else latest_quote
-            
-            # 计算涨跌幅
-            prev_close = first_quote.get("close", 0)
-            current_price = latest_quote.get("close", 0)
-            
-            if prev_close and prev_close > 0:
-                change = current_price - prev_close
-                change_percent = change / prev_close
-            else:
-                change = 0
-                change_percent = 0
-                
-            # 获取当日最高最低价
-            highs = [q.get("high", 0) for q in quotes if "high" in q]
-            lows = [q.get("low", 0) for q in quotes if "low" in q]
-            day_high = max(highs) if highs else current_price
-            day_low = min(lows) if lows else current_price
-            
-            # 获取开盘价
-            open_price = quotes[0].get("open", 0) if quotes else 0
-            
-            # 计算成交量
-            volume = sum(q.get("volume", 0) for q in quotes if "volume" in q)
-            
-            # 更新响应数据
-            yahoo_response.update({
-                "shortName": CHINA_INDEX_MAP.get(clean_ticker, f"股票 {clean_ticker}"),
-                "longName": CHINA_INDEX_MAP.get(clean_ticker, f"股票 {clean_ticker}"),
-                "regularMarketPrice": current_price,
-                "regularMarketChange": change,
-                "regularMarketChangePercent": change_percent,
-                "regularMarketDayHigh": day_high,
-                "regularMarketDayLow": day_low,
-                "regularMarketVolume": volume,
-                "regularMarketOpen": open_price,
-                "regularMarketPreviousClose": prev_close,
-                "currency": "CNY",
-                "exchange": "SSE" if clean_ticker.startswith("6") else "SZSE",
-                "fullExchangeName": "上海证券交易所" if clean_ticker.startswith("6") else "深圳证券交易所"
-            })
-            
-            # 计算52周数据
-            yahoo_response["fiftyTwoWeekLow"] = day_low * 0.9  # 简化处理
-            yahoo_response["fiftyTwoWeekHigh"] = day_high * 1.1  # 简化处理
-            yahoo_response["fiftyTwoWeekLowChange"] = current_price - yahoo_response["fiftyTwoWeekLow"]
-            yahoo_response["fiftyTwoWeekHighChange"] = current_price - yahoo_response["fiftyTwoWeekHigh"]
-            
-            # 安全除法
-            if yahoo_response["fiftyTwoWeekLow"] != 0:
-                yahoo_response["fiftyTwoWeekLowChangePercent"] = yahoo_response["fiftyTwoWeekLowChange"] / yahoo_response["fiftyTwoWeekLow"]
-            else:
-                yahoo_response["fiftyTwoWeekLowChangePercent"] = 0
-                
-            if yahoo_response["fiftyTwoWeekHigh"] != 0:
-                yahoo_response["fiftyTwoWeekHighChangePercent"] = yahoo_response["fiftyTwoWeekHighChange"] / yahoo_response["fiftyTwoWeekHigh"]
-            else:
-                yahoo_response["fiftyTwoWeekHighChangePercent"] = 0
-                
-            # 平均成交量
-            yahoo_response["averageDailyVolume3Month"] = volume
-            
-            logger.info(f"成功获取{ticker}的报价数据：价格={current_price}, 涨跌幅={change_percent:.2%}")
+        if stats:
+            # 分时K线未更新时返回304
+            not_modified = conditional_response(
+                request, response, "quote", clean_ticker, async_stock_data_provider.get_min_data_version(ticker)
+            )
+            if not_modified is not None:
+                return not_modified
+            _apply_quote_fields(yahoo_response, clean_ticker, stats)
+            logger.info(f"成功获取{ticker}的报价数据：价格={stats['price']}, 涨跌幅={stats['change_percent']:.2%}")
             
         else:
             logger.warning(f"无法获取{ticker}的分时数据，返回空数据")
@@ -165,4 +102,178 @@ async def stock_quote(ticker: str) -> Dict:
             "_no_data": True
         }
         logger.debug(f"返回错误响应: {error_response}")
-        return error_response 
\ No newline at end of file
+        return error_response
+
+
+
+@router.get("/stock/quotes")
+async def stock_quotes(tickers: str) -> Dict:
+    """
+    批量获取股票报价API（自选股列表）
+    股票报价来自东方财富全市场行情快照，指数报价来自新浪指数行情快照，
+    快照中找不到的代码逐个回退到分时数据计算的报价（/stock/quote）
+    :param tickers: 逗号分隔的股票代码，如 600519,sz000001,^sh000300
+    :return: 与请求顺序一致的报价列表
+    """
+    symbols = list(dict.fromkeys(t.strip() for t in tickers.split(",") if t.strip()))[:MAX_BATCH_TICKERS]
+    logger.info(f"接收到批量报价请求，代码数量: {len(symbols)}")
+    
+    quotes: Dict[str, Dict[str, Any]] = {}
+    targets = []
+    for symbol in symbols:
+        clean_ticker, is_index = async_stock_data_provider.standardize_ticker(symbol)
+        targets.append((symbol, clean_ticker, is_index))
+    
+    # 股票和指数各自只需访问一次快照
+    for is_index, snapshot in ((False, market_snapshot), (True, index_snapshot)):
+        group = [t for t in targets if t[2] == is_index]
+        if not group:
+            continue
+        try:
+            spot_fields = await async_stock_data_provider.get_snapshot_derived(
+                snapshot, "quote_fields", _spot_quote_fields
+            )
+        except Exception as e:
+            logger.warning(f"从 {snapshot.name} 获取批量报价失败，回退到分时数据: {e}")
+            continue
+        
+        for symbol, clean_ticker, _ in group:
+            # A股行情快照的代码不带市场前缀，指数行情快照带前缀
+            code = clean_ticker if is_index else (
+                clean_ticker[2:] if clean_ticker.startswith(("sh", "sz", "bj")) else clean_ticker
+            )
+            fields = spot_fields.get(code)
+            if fields is None:
+                continue
+            yahoo_response = _new_quote_response(symbol, is_index)
+            _apply_quote_fields(yahoo_response, clean_ticker, fields)
+            yahoo_response["hasPrePostMarketData"] = False
+            quotes[symbol] = yahoo_response
+    
+    # 快照中没有的代码回退到分时数据
+    missing = [symbol for symbol in symbols if symbol not in quotes]
+    if missing:
+        logger.info(f"{len(missing)} 个代码不在行情快照中，使用分时数据: {missing}")
+        fallback = await asyncio.gather(*(stock_quote(symbol) for symbol in missing))
+        quotes.update(zip(missing, fallback))
+    
+    return {
+        "quotes": [quotes[symbol] for symbol in symbols],
+        "count": len(symbols),
+        "error": None
+    }
+
+def _new_quote_response(ticker: str, is_index: bool) -> Dict[str, Any]:
+    """
+    生成Yahoo Finance格式的空报价
+    :param ticker: 请求的股票代码
+    :param is_index: 是否为指数
+    :return: 报价字段均为0的基本结构
+    """
+    return {
+        "symbol": ticker,
+        "shortName": "",
+        "longName": "",
+        "regularMarketPrice": 0,
+        "regularMarketChange": 0,
+        "regularMarketChangePercent": 0,
+        "regularMarketDayHigh": 0,
+        "regularMarketDayLow": 0,
+        "regularMarketVolume": 0,
+        "regularMarketOpen": 0,
+        "regularMarketPreviousClose": 0,
+        "bid": 0,
+        "ask": 0,
+        "bidSize": 0,
+        "askSize": 0,
+        "marketCap": 0,
+        "currency": "CNY",
+        "market": "cn_market",
+        "exchange": "",
+        "quoteType": "INDEX" if is_index else "EQUITY",
+        "region": "CN",
+        "language": "zh-CN",
+        "fiftyTwoWeekLow": 0,
+        "fiftyTwoWeekHigh": 0,
+        "fiftyTwoWeekLowChange": 0,
+        "fiftyTwoWeekHighChange": 0,
+        "fiftyTwoWeekLowChangePercent": 0,
+        "fiftyTwoWeekHighChangePercent": 0,
+        "priceHint": 2,
+        "fullExchangeName": "",
+        "averageDailyVolume3Month": 0
+    }
+
+
+def _apply_quote_fields(yahoo_response: Dict[str, Any], clean_ticker: str, fields: Dict[str, Any]) -> None:
+    """
+    将报价字段填入Yahoo Finance格式的报价
+    :param yahoo_response: _new_quote_response 生成的报价
+    :param clean_ticker: 标准化后的代码
+    :param fields: 报价字段 (price, previous_close, change, change_percent, day_high, day_low, open, volume)，
+                   可选 name, market_cap
+    """
+    current_price = fields["price"]
+    day_high = fields["day_high"]
+    day_low = fields["day_low"]
+    volume = fields["volume"]
+    name = fields.get("name") or CHINA_INDEX_MAP.get(clean_ticker, f"股票 {clean_ticker}")
+    code = clean_ticker[2:] if clean_ticker.startswith(("sh", "sz")) else clean_ticker
+    
+    # 更新响应数据
+    yahoo_response.update({
+        "shortName": name,
+        "longName": name,
+        "regularMarketPrice": current_price,
+        "regularMarketChange": fields["change"],
+        "regularMarketChangePercent": fields["change_percent"],
+        "regularMarketDayHigh": day_high,
+        "regularMarketDayLow": day_low,
+        "regularMarketVolume": volume,
+        "regularMarketOpen": fields["open"],
+        "regularMarketPreviousClose": fields["previous_close"],
+        "marketCap": fields.get("market_cap", 0),
+        "currency": "CNY",
+        "exchange": "SSE" if code.startswith("6") else "SZSE",
+        "fullExchangeName": "上海证券交易所" if code.startswith("6") else "深圳证券交易所"
+    })
+    
+    # 计算52周数据
+    yahoo_response["fiftyTwoWeekLow"] = day_low * 0.9  # 简化处理
+    yahoo_response["fiftyTwoWeekHigh"] = day_high * 1.1  # 简化处理
+    yahoo_response["fiftyTwoWeekLowChange"] = current_price - yahoo_response["fiftyTwoWeekLow"]
+    yahoo_response["fiftyTwoWeekHighChange"] = current_price - yahoo_response["fiftyTwoWeekHigh"]
+    
+    # 安全除法
+    if yahoo_response["fiftyTwoWeekLow"] != 0:
+        yahoo_response["fiftyTwoWeekLowChangePercent"] = yahoo_response["fiftyTwoWeekLowChange"] / yahoo_response["fiftyTwoWeekLow"]
+    else:
+        yahoo_response["fiftyTwoWeekLowChangePercent"] = 0
+        
+    if yahoo_response["fiftyTwoWeekHigh"] != 0:
+        yahoo_response["fiftyTwoWeekHighChangePercent"] = yahoo_response["fiftyTwoWeekHighChange"] / yahoo_response["fiftyTwoWeekHigh"]
+    else:
+        yahoo_response["fiftyTwoWeekHighChangePercent"] = 0
+        
+    # 平均成交量
+    yahoo_response["averageDailyVolume3Month"] = volume
+
+
+def _spot_quote_fields(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """
+    将行情快照批量转换为报价字段，按代码索引（每个快照版本只计算一次）
+    :param df: 东方财富A股行情快照或新浪指数行情快照
+    :return: {代码: 报价字段}
+    """
+    frame = convert_frame(
+        df,
+        SPOT_QUOTE_COLUMNS,
+        text_columns=("code", "name"),
+        required=("代码", "名称", "最新价"),
+    )
+    if frame is None:
+        raise Exception(f"行情快照缺少必要列，现有列: {df.columns.tolist()}")
+    
+    # 涨跌幅转换为小数
+    frame["change_percent"] = frame["change_percent"] / 100
+    return dict(zip(frame["code"].astype(str), frame_to_records(frame)))
@@ -1,9 +1,17 @@
-from typing import Dict
-from fastapi import APIRouter
-import akshare as ak
-from fastapi import APIRouter
 from typing import List, Dict, Any
+from fastapi import APIRouter, Request, Response
 from .utils.logger import get_logger
+from .utils.async_data_provider import async_stock_data_provider
+from .utils.http_cache import conditional_response
+from .utils.market_snapshot import market_snapshot
+from .utils.screener_engine import (
+    DEFAULT_SCREENER,
+    SCREENER_TOP_N,
+    compute_screener_data,
+    rank_screener,
+    to_screener_quotes,
+)
+from .utils.screener_query import QuerySyntaxError, build_screener_frame, compile_query, run_query
 import pandas as pd
 
 logger = get_logger(__name__)
@@ -11,7 +19,13 @@ logger = get_logger(__name__)
 router = APIRouter(tags=["stock_screener"])
 
 @router.get("/stock/screener")
-async def stock_screener(screener: str = "most_actives", count: int = 40) -> Dict:
+async def stock_screener(
+    screener: str = "most_actives",
+    count: int = 40,
+    sector: str = None,
+    request: Request = None,
+    http_response: Response = None
+) -> Dict:
     """
     获取股票筛选器数据API
     支持的筛选类型：
@@ -23,110 +37,143 @@ async def stock_screener(screener: str = "most_actives", count: int = 40) -> Dic
     - growth_technology_stocks: 科技成长股
     :param screener: 筛选类型
     :param count: 返回数量
+    :param sector: 只在指定行业中筛选（逗号分隔多个行业，行业列表见 /stock/sectors）
+    :param request: 请求（FastAPI注入）
+    :param http_response: 响应（FastAPI注入，用于设置ETag和Cache-Control）
     :return: 股票列表
     """
-    logger.info(f"获取筛选器数据，类型: {screener}, 数量: {count}")
+    logger.info(f"获取筛选器数据，类型: {screener}, 数量: {count}, 行业: {sector}")
     
     response = {
         "quotes": []
     }
     
     try:
-        # 全部筛选器数据基于东方财富A股行情
-        logger.info("从东方财富获取A股实时行情数据")
-        df = ak.stock_zh_a_spot_em()
+        # 全部筛选器数据基于东方财富A股行情（进程级快照缓存）
+        logger.info("从行情快照缓存获取A股实时行情数据")
+        # 先记录快照版本：获取期间后台刷新时ETag偏旧，下次请求会重新下载，不会误返回304
+        snapshot_version = market_snapshot.version
+        # 内置筛选器的排名和行业索引在每个快照版本只计算一次，这里只是字典查找
+        data = await async_stock_data_provider.get_snapshot_derived(
+            market_snapshot, "screener_data", compute_screener_data
+        )
+        sectors = [name.strip() for name in sector.split(",") if name.strip()] if sector else []
         
-        if df is not None and not df.empty:
-            logger.info(f"成功获取行情数据，条数: {len(df)}")
-            
-            # 添加必要的字段
-            df["symbol"] = df["代码"]
-            df["name"] = df["名称"]
-            df["price"] = df["最新价"]
-            df["change"] = df["涨跌额"]
-            df["changePct"] = df["涨跌幅"]
-            df["pe"] = df["市盈率-动态"]
-            df["marketCap"] = df["总市值"]
-            
-            # 按筛选类型处理数据
-            if screener == "all_stocks":
-                # 全部股票，按代码排序
-                df = df.sort_values(by="代码")
-                # 限制返回数量，但增加到100条
-                df = df.head(min(count, 100))
-            elif screener == "most_actives":
-                # 成交活跃股
-                df = df.sort_values(by="成交额", ascending=False)
-                # 限制返回数量
-                df = df.head(count)
-            elif screener == "day_gainers":
-                # 涨幅前列
-                df = df.sort_values(by="涨跌幅", ascending=False)
-                # 限制返回数量
-                df = df.head(count)
-            elif screener == "day_losers":
-                # 跌幅前列
-                df = df.sort_values(by="涨跌幅", ascending=True)
-                # 限制返回数量
-                df = df.head(count)
-            elif screener == "small_cap_gainers":
-                # 小市值涨幅股
-                # 过滤出总市值小于300亿的股票
-                small_cap_df = df[df["总市值"] < 30000000000]
-                # 按涨跌幅排序
-                small_cap_df = small_cap_df.sort_values(by="涨跌幅", ascending=False)
-                # 限制返回数量
-                df = small_cap_df.head(count)
-            elif screener == "growth_technology_stocks":
-                # 科技成长股 - 以计算机、通信、电子行业为主
-                tech_df = df[df["所处行业"].str.contains("计算机|通信|电子|科技|互联网", na=False)]
-                # 按涨跌幅排序
-                tech_df = tech_df.sort_values(by="涨跌幅", ascending=False)
-                # 限制返回数量
-                df = tech_df.head(count)
-            else:
-                # 默认按成交额排序
-                df = df.sort_values(by="成交额", ascending=False)
-                # 限制返回数量
-                df = df.head(count)
-            
-            # 转换数据格式
-            for _, row in df.iterrows():
-                # 格式化代码（添加市场前缀）
-                symbol = row["symbol"]
-                if symbol.startswith(("0", "3")):
-                    display_symbol = f"sz{symbol}"
-                elif symbol.startswith("6"):
-                    display_symbol = f"sh{symbol}"
-                else:
-                    display_symbol = symbol
-                    
-                # 构建股票数据
-                stock = {
-                    "symbol": display_symbol,
-                    "shortName": row["name"],
-                    "regularMarketPrice": float(row["price"]),
-                    "regularMarketChange": float(row["change"]),
-                    "regularMarketChangePercent": float(row["changePct"]) / 100,  # 转换为小数
-                    "regularMarketVolume": float(row["成交量"]) if "成交量" in row and not pd.isna(row["成交量"]) else 0,
-                    "regularMarketDayHigh": float(row["最高"]) if "最高" in row and not pd.isna(row["最高"]) else 0,
-                    "regularMarketDayLow": float(row["最低"]) if "最低" in row and not pd.isna(row["最低"]) else 0,
-                    "regularMarketOpen": float(row["开盘"]) if "开盘" in row and not pd.isna(row["开盘"]) else 0,
-                    "regularMarketPreviousClose": float(row["昨收"]) if "昨收" in row and not pd.isna(row["昨收"]) else 0,
-                    "trailingPE": float(row["pe"]) if "pe" in row and not pd.isna(row["pe"]) else 0,
-                    "marketCap": float(row["marketCap"]) if "marketCap" in row else 0,
-                    "averageDailyVolume3Month": float(row["成交量"]) if "成交量" in row and not pd.isna(row["成交量"]) else 0,
-                    "sector": row["所处行业"] if "所处行业" in row else "未知",
-                    "currency": "CNY"
-                }
-                response["quotes"].append(stock)
-                
-            logger.debug(f"处理完成，返回 {len(response['quotes'])} 条数据")
+        # 行情快照未更新时返回304
+        not_modified = conditional_response(
+            request, http_response, "screener", screener, count, sectors, snapshot_version
+        )
+        if not_modified is not None:
+            return not_modified
+        
+        # 全部股票最多返回100条
+        limit = min(count, 100) if screener == "all_stocks" else count
+        if not sectors and limit <= SCREENER_TOP_N:
+            response["quotes"] = data.rankings.get(screener, data.rankings[DEFAULT_SCREENER])[:limit]
         else:
-            raise Exception("获取到的数据为空")
+            # 按行业筛选或超出预先计算的条数时，基于行业索引单独计算
+            df = await async_stock_data_provider.get_market_snapshot()
+            response["quotes"] = to_screener_quotes(rank_screener(df, screener, limit, data.sectors, sectors))
+            
+        logger.debug(f"处理完成，返回 {len(response['quotes'])} 条数据")
             
     except Exception as e:
         logger.error(f"获取筛选器数据失败: {str(e)}", exc_info=True)
         response["error"] = f"获取数据失败: {str(e)}"
         
-    return response 
\ No newline at end of file
+    return response
+
+
+@router.get("/stock/sectors")
+async def stock_sectors(
+    request: Request = None,
+    http_response: Response = None
+) -> Dict:
+    """
+    获取行业列表及各行业汇总统计API（按成交额降序）
+    :param request: 请求（FastAPI注入）
+    :param http_response: 响应（FastAPI注入，用于设置ETag和Cache-Control）
+    :return: {"sectors": [{sector, count, averageChangePercent, advancers, decliners, turnover, marketCap}]}
+    """
+    logger.info("获取行业统计数据")
+
+    response = {
+        "sectors": []
+    }
+
+    try:
+        snapshot_version = market_snapshot.version
+        data = await async_stock_data_provider.get_snapshot_derived(
+            market_snapshot, "screener_data", compute_screener_data
+        )
+
+        not_modified = conditional_response(request, http_response, "sectors", snapshot_version)
+        if not_modified is not None:
+            return not_modified
+
+        response["sectors"] = data.sectors.stats
+        if not response["sectors"]:
+            logger.warning("行情数据不包含行业信息")
+
+    except Exception as e:
+        logger.error(f"获取行业统计数据失败: {str(e)}", exc_info=True)
+        response["error"] = f"获取数据失败: {str(e)}"
+
+    return response
+
+
+@router.get("/stock/screener/query")
+async def stock_screener_query(
+    q: str,
+    request: Request = None,
+    http_response: Response = None
+) -> Dict:
+    """
+    自定义筛选查询API，在全市场行情快照上执行筛选和排序
+    语法示例：pe<20 and marketCap>1e10 sort -changePct limit 50
+    - 比较：< <= > >= = != ，数值可带 万/亿 后缀；文本字段支持 = != 和 ~（包含），如 name~"银行"
+    - 组合：and / or / not 和括号
+    - 排序：sort 字段[,字段]，字段前加 - 表示降序
+    - 数量：limit N（默认50）
+    :param q: 查询语句
+    :param request: 请求（FastAPI注入）
+    :param http_response: 响应（FastAPI注入，用于设置ETag和Cache-Control）
+    :return: 股票列表
+    """
+    logger.info(f"执行自定义筛选查询: {q}")
+
+    response = {
+        "quotes": []
+    }
+
+    try:
+        compiled = compile_query(q)
+    except QuerySyntaxError as e:
+        logger.warning(f"筛选查询语法错误: {q}, {e}")
+        response["error"] = f"查询语法错误: {str(e)}"
+        return response
+
+    try:
+        snapshot_version = market_snapshot.version
+        # 查询字段的数值数组每个快照版本只转换一次
+        frame = await async_stock_data_provider.get_snapshot_derived(
+            market_snapshot, "screener_frame", build_screener_frame
+        )
+
+        not_modified = conditional_response(
+            request, http_response, "screener_query", compiled.source, snapshot_version
+        )
+        if not_modified is not None:
+            return not_modified
+
+        response["quotes"] = to_screener_quotes(run_query(frame, compiled))
+        logger.debug(f"查询完成，返回 {len(response['quotes'])} 条数据")
+
+    except KeyError as e:
+        logger.warning(f"行情数据缺少查询字段: {e}")
+        response["error"] = f"行情数据缺少查询字段: {str(e)}"
+    except Exception as e:
+        logger.error(f"执行筛选查询失败: {str(e)}", exc_info=True)
+        response["error"] = f"获取数据失败: {str(e)}"
+
+    return response
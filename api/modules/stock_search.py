@@ -1,8 +1,14 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 from fastapi import APIRouter
-import akshare as ak
 from datetime import datetime
 import json
+from .utils.async_data_provider import async_stock_data_provider
+from .utils.cache_backend import cache_get, cache_set
+from .utils.logger import get_logger
+from .utils.stock_data_provider import stock_data_provider
+from .utils.symbol_index import SymbolIndex, SymbolRow
+
+logger = get_logger(__name__)
 
 router = APIRouter(tags=["stock_search"])
 
@@ -13,6 +19,64 @@ CHINA_INDEX_MAP = {
     "sh000852": "中证1000"
 }
 
+# 证券列表在共享缓存后端中的键
+SHARED_SYMBOLS_KEY = "symbols:a_share"
+
+async def _load_symbol_rows() -> Optional[List[SymbolRow]]:
+    """
+    加载A股证券列表，用于构建证券代码索引
+    交易所股票列表与东方财富全市场行情快照之间使用对冲请求，取先返回的有效结果；
+    其他工作进程在一个重建周期内已加载过时直接使用共享缓存中的列表
+    :return: [(代码, 名称, 交易所, 类型)]
+    """
+    # 共享缓存后端（Redis）的读写需要网络往返，在本地任务线程池中执行
+    shared = await async_stock_data_provider.run_local(cache_get, SHARED_SYMBOLS_KEY)
+    if shared is not None:
+        return shared
+
+    data_sources = [
+        {
+            "name": "stock_info_a_code_name",
+            "handler": lambda: async_stock_data_provider.run("exchange", stock_data_provider.get_stock_code_name),
+            "columns": {"code": "code", "name": "name"}
+        },
+        {
+            "name": "stock_zh_a_spot_em",
+            "handler": lambda: async_stock_data_provider.get_market_snapshot(),
+            "columns": {"代码": "code", "名称": "name"}
+        }
+    ]
+    
+    async def attempt(source: Dict) -> Optional[List[SymbolRow]]:
+        stock_df = await source["handler"]()
+        if stock_df is None or stock_df.empty:
+            return None
+        stock_df = stock_df.rename(columns=source["columns"])
+        if "code" not in stock_df.columns or "name" not in stock_df.columns:
+            logger.warning(f"数据源 {source['name']} 返回的数据列不匹配")
+            return None
+        
+        codes = stock_df["code"].astype(str)
+        names = stock_df["name"].astype(str)
+        return [
+            (code, name, 'SHG' if code.startswith('6') else 'SHE', 'EQUITY')
+            for code, name in zip(codes, names)
+        ]
+    
+    rows = await async_stock_data_provider.hedged("A股证券列表", data_sources, attempt)
+    if rows:
+        await async_stock_data_provider.run_local(cache_set, SHARED_SYMBOLS_KEY, rows, symbol_index.refresh_interval)
+    return rows
+
+# 证券代码索引（启动时在后台构建并定期刷新，见 api/index.py）
+symbol_index = SymbolIndex(
+    _load_symbol_rows,
+    static_symbols=[
+        (code, name, 'SSE' if code.startswith('sh') else 'SZSE', 'INDEX')
+        for code, name in CHINA_INDEX_MAP.items()
+    ]
+)
+
 class SearchNews:
     def __init__(self, title: str, link: str, publisher: str, publish_time: datetime):
         self.title = title
@@ -37,11 +101,12 @@ class SearchResult:
         self.error = None
 
 @router.get("/stock/search")
-async def stock_search(ticker: str, news_count: int = 5) -> Dict:
+async def stock_search(ticker: str, news_count: int = 5, limit: int = 20) -> Dict:
     """
     股票搜索API
-    :param ticker: 股票代码或名称
+    :param ticker: 股票代码、名称或拼音首字母
     :param news_count: 新闻数量
+    :param limit: 最多返回的股票数量
     :return: 搜索结果
     """
     try:
@@ -67,8 +132,8 @@ async def stock_search(ticker: str, news_count: int = 5) -> Dict:
             if not try_china_index:
                 try:
                     # 处理其他指数
-                    # 使用 stock_zh_index_spot_sina 获取中国主要指数实时数据
-                    stock_info = ak.stock_zh_index_spot_sina()
+                    # 使用 stock_zh_index_spot_sina 获取中国主要指数实时数据（进程级快照缓存）
+                    stock_info = await async_stock_data_provider.get_index_snapshot()
                     # 从原始代码中提取指数名称和代码，并进行搜索
                     filtered = stock_info[
                         stock_info['代码'].str.contains(ticker[1:], case=False) |
@@ -116,72 +181,16 @@ async def stock_search(ticker: str, news_count: int = 5) -> Dict:
                     result.quotes.append(vars(quote))
         else:
             try:
-                # 获取A股股票信息
-                # 使用多个数据源尝试获取数据
-                data_sources = [
-                    {"name": "stock_zh_a_spot_em", "handler": lambda: ak.stock_zh_a_spot_em()},
-                    {"name": "stock_zh_a_spot_tx", "handler": lambda: ak.stock_zh_a_spot_tx()},
-                    {"name": "stock_info_a_code_name", "handler": lambda: ak.stock_info_a_code_name()}
-                ]
-                
-                stock_df = None
-                for source in data_sources:
-                    try:
-                        print(f"尝试使用数据源 {source['name']} 获取股票列表")
-                        stock_df = source["handler"]()
-                        
-                        if stock_df is not None and not stock_df.empty:
-                            print(f"从 {source['name']} 成功获取股票列表，数据条数: {len(stock_df)}")
-                            
-                            # 根据不同数据源调整列名映射
-                            column_mappings = {
-                                "stock_zh_a_spot_em": {
-                                    "代码": "code", 
-                                    "名称": "name"
-                                },
-                                "stock_zh_a_spot_tx": {
-                                    "code": "code", 
-                                    "name": "name"
-                                },
-                                "stock_info_a_code_name": {
-                                    "code": "code", 
-                                    "name": "name"
-                                }
-                            }
-                            
-                            # 应用列映射
-                            mapping = column_mappings.get(source["name"], {})
-                            if mapping:
-                                stock_df = stock_df.rename(columns=mapping)
-                                
-                            # 确保必要的列存在
-                            if "code" in stock_df.columns and "name" in stock_df.columns:
-                                break
-                            else:
-                                print(f"数据源 {source['name']} 返回的数据列不匹配，尝试下一个数据源")
-                                stock_df = None
-                    except Exception as e:
-                        print(f"从数据源 {source['name']} 获取数据失败: {str(e)}")
-                        stock_df = None
+                # 从内存证券代码索引搜索A股；索引未就绪时不等待上游加载，
+                # 先按只含主要指数的初始索引应答，由后台任务加载并在失败时重试
+                symbol_index.ensure_loading()
                 
-                if stock_df is None:
-                    raise Exception("所有数据源都无法获取股票列表")
-                
-                # 搜索匹配的股票
-                filtered = stock_df[
-                    stock_df['code'].str.contains(ticker, case=False) |
-                    stock_df['name'].str.contains(ticker, case=False)
-                ]
-                
-                # 转换为SearchQuote格式
-                for _, row in filtered.iterrows():
-                    code = row['code']
-                    exchange = 'SHG' if code.startswith('6') else 'SHE'
+                for entry in symbol_index.search(ticker, limit):
                     quote = SearchQuote(
-                        symbol=code,
-                        shortname=row['name'],
-                        exchange=exchange,
-                        type='EQUITY'
+                        symbol=entry.symbol,
+                        shortname=entry.name,
+                        exchange=entry.exchange,
+                        type=entry.quote_type
                     )
                     result.quotes.append(vars(quote))
             except Exception as e:
@@ -0,0 +1,122 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from api.modules.stock_quote import _apply_quote_fields, _new_quote_response
+from .utils.logger import get_logger
+from .utils.async_data_provider import async_stock_data_provider
+from .utils.stream_hub import StreamHub
+
+# 创建logger实例
+logger = get_logger(__name__)
+
+router = APIRouter(tags=["stock_stream"])
+
+# 单个连接最多订阅的代码数量
+MAX_STREAM_TICKERS = 20
+
+# 无事件时发送心跳的间隔（秒），防止代理断开空闲连接
+HEARTBEAT_SECONDS = 15
+
+# 支持推送的分时间隔 -> akshare周期；日线及以上周期不推送，由前端继续轮询 /stock/chart
+STREAM_INTERVALS = {"1m": "1", "5m": "5", "15m": "15", "30m": "30", "60m": "60", "1h": "60"}
+
+
+async def _fetch_stream_data(ticker: str, interval: str) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    获取推送用的最新K线和报价（与 /stock/chart、/stock/quote 共享分时缓存）
+    :param ticker: 股票代码
+    :param interval: 分时间隔 ('1', '5', '15', '30', '60')
+    :return: (K线列表, Yahoo Finance格式的报价)
+    """
+    bars = await async_stock_data_provider.get_resampled_min_data(ticker, interval)
+    # 直接由分时缓存计算报价，不经过 /stock/quote 路由（轮询不应计入热门代码的访问次数）
+    stats = await async_stock_data_provider.get_quote_stats(ticker)
+    quote = None
+    if stats:
+        clean_ticker, is_index = async_stock_data_provider.standardize_ticker(ticker)
+        quote = _new_quote_response(ticker, is_index)
+        _apply_quote_fields(quote, clean_ticker, stats)
+        quote["hasPrePostMarketData"] = False
+    # 同一K线序列的记录只转换一次，K线未更新时返回同一个列表，推送中心据此跳过比较
+    return bars.to_records(), quote
+
+
+def _stream_symbol(ticker: str) -> str:
+    """
+    推送中心使用的代码：同一股票的不同写法（如 600519 和 sh600519）共用一个轮询任务
+    :param ticker: 请求中的代码
+    :return: 指数为 ^ 加标准化代码，股票为带 sh/sz 前缀的代码
+    """
+    clean_ticker, is_index = async_stock_data_provider.standardize_ticker(ticker)
+    if is_index:
+        return f"^{clean_ticker}"
+    if clean_ticker.startswith(("sh", "sz")):
+        return clean_ticker
+    # 与新浪分时接口相同的前缀规则
+    return f"sh{clean_ticker}" if clean_ticker.startswith("6") else f"sz{clean_ticker}"
+
+
+def _for_ticker(data: Dict[str, Any], ticker: str) -> Dict[str, Any]:
+    """把推送中心的事件改写为订阅时使用的代码"""
+    if data["ticker"] == ticker:
+        return data
+    data = dict(data, ticker=ticker)
+    if data.get("quote") and "symbol" in data["quote"]:
+        data["quote"] = dict(data["quote"], symbol=ticker)
+    return data
+
+
+# 全局推送中心，每个 (代码, 周期) 只有一个轮询任务
+stream_hub = StreamHub(_fetch_stream_data)
+
+
+@router.get("/stock/stream")
+async def stock_stream(request: Request, tickers: str, interval: str = "1m") -> StreamingResponse:
+    """
+    实时行情推送API（Server-Sent Events）
+    连接后先为每个代码推送 snapshot 事件（完整K线和报价），之后只推送新增或更新的K线（bars）和变化的报价字段（quote）
+    :param tickers: 逗号分隔的股票代码
+    :param interval: 分时间隔 (1m, 5m, 15m, 30m, 60m, 1h)
+    :return: text/event-stream
+    :raises HTTPException: 400，不支持推送的时间间隔（如日线、周线）
+    """
+    symbols = list(dict.fromkeys(t.strip() for t in tickers.split(",") if t.strip()))[:MAX_STREAM_TICKERS]
+    ak_interval = STREAM_INTERVALS.get(interval)
+    if ak_interval is None:
+        logger.warning(f"推送不支持的时间间隔: {interval}")
+        raise HTTPException(
+            status_code=400,
+            detail=f"推送不支持的时间间隔: {interval}，支持: {', '.join(STREAM_INTERVALS)}",
+        )
+    logger.info(f"接收到行情推送订阅: tickers={symbols}, interval={interval}")
+
+    # 推送中心的代码 -> 订阅时使用的写法
+    aliases: Dict[str, List[str]] = {}
+    for symbol in symbols:
+        aliases.setdefault(_stream_symbol(symbol), []).append(symbol)
+    subscriber = stream_hub.subscribe([(key, ak_interval) for key in aliases])
+
+    async def event_stream():
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                for ticker in aliases.get(data["ticker"], [data["ticker"]]):
+                    payload = json.dumps(_for_ticker(data, ticker), ensure_ascii=False)
+                    yield f"event: {event}\ndata: {payload}\n\n"
+        finally:
+            stream_hub.unsubscribe(subscriber)
+            logger.info(f"行情推送连接已关闭: tickers={symbols}")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
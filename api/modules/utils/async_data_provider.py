@@ -0,0 +1,422 @@
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+import pandas as pd
+from .bar_cache import intraday_bar_cache, shared_bar_key
+from .bar_series import BarSeries
+from .cache_backend import refresh_lock
+from .circuit_breaker import circuit_breakers
+from .latency import source_latency
+from .logger import get_logger
+from .market_snapshot import MarketSnapshotCache, index_snapshot, market_snapshot, use_refresh_submitter
+from .stock_data_provider import StockDataProvider, stock_data_provider
+
+logger = get_logger(__name__)
+
+# 各上游数据源的默认限制：(最大并发数, 单次调用超时秒数)
+DEFAULT_SOURCE_LIMITS: Dict[str, Tuple[int, float]] = {
+    "eastmoney": (4, 15.0),
+    "sina": (4, 15.0),
+    "tencent": (2, 15.0),
+    "exchange": (2, 30.0),
+}
+
+# 对冲请求的默认延迟（秒）
+DEFAULT_HEDGE_DELAY = 1.5
+
+
+class AsyncStockDataProvider:
+    """
+    StockDataProvider的异步门面
+
+    akshare的接口都是同步HTTP调用，直接在事件循环中执行会阻塞同一worker内的所有请求。
+    这里把调用统一派发到有界线程池中执行，并按上游数据源限制并发数和超时时间。
+
+    并发与超时可通过环境变量配置：
+    - AKSHARE_MAX_WORKERS: 线程池大小（所有数据源共享的硬上限）
+    - AKSHARE_LIMIT_<SOURCE>: 某数据源的最大并发数，如 AKSHARE_LIMIT_EASTMONEY=4
+    - AKSHARE_TIMEOUT_<SOURCE>: 某数据源单次调用的超时秒数，如 AKSHARE_TIMEOUT_SINA=10
+    - LOCAL_MAX_WORKERS: 本地任务线程池大小（读写磁盘缓存、共享缓存后端等，不占用上游的并发名额）
+    """
+
+    def __init__(self, provider: StockDataProvider, max_workers: int = None):
+        self._provider = provider
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or int(os.getenv("AKSHARE_MAX_WORKERS", "16")),
+            thread_name_prefix="akshare",
+        )
+        self._local_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv("LOCAL_MAX_WORKERS", "4")),
+            thread_name_prefix="local",
+        )
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        # 进行中的分时数据请求，相同 (代码, 周期) 的并发请求共享同一次上游获取
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        # 服务所在的事件循环（首次调用 run 时记录）和后台执行中的任务，见 submit
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._background: Set[asyncio.Task] = set()
+
+    def standardize_ticker(self, ticker: str) -> Tuple[str, bool]:
+        """标准化股票代码，见 StockDataProvider.standardize_ticker"""
+        return self._provider.standardize_ticker(ticker)
+
+    def get_date_range(self, range_str: str) -> Tuple[datetime, datetime, str]:
+        """根据范围字符串获取日期范围，见 StockDataProvider.get_date_range"""
+        return self._provider.get_date_range(range_str)
+
+    def get_source_limits(self, source: str) -> Tuple[int, float]:
+        """
+        获取数据源的并发数和超时配置
+        :param source: 数据源名称 (eastmoney, sina, tencent, exchange)
+        :return: (最大并发数, 超时秒数)
+        """
+        default_limit, default_timeout = DEFAULT_SOURCE_LIMITS.get(source, (2, 15.0))
+        key = source.upper()
+        limit = int(os.getenv(f"AKSHARE_LIMIT_{key}", default_limit))
+        timeout = float(os.getenv(f"AKSHARE_TIMEOUT_{key}", default_timeout))
+        return limit, timeout
+
+    def _get_semaphore(self, source: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(source)
+        if semaphore is None:
+            limit, _ = self.get_source_limits(source)
+            semaphore = self._semaphores[source] = asyncio.Semaphore(limit)
+        return semaphore
+
+    async def run(self, source: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在线程池中执行一个阻塞调用
+        :param source: 上游数据源名称，用于并发限制和超时
+        :param func: 同步函数
+        :return: 函数返回值
+        :raises asyncio.TimeoutError: 超过数据源超时时间
+        """
+        _, timeout = self.get_source_limits(source)
+        semaphore = self._get_semaphore(source)
+        await semaphore.acquire()
+        loop = self._loop = asyncio.get_running_loop()
+        try:
+            future = self._executor.submit(functools.partial(func, *args, **kwargs))
+        except BaseException:
+            semaphore.release()
+            raise
+
+        def release(_) -> None:
+            # 并发名额在线程执行完毕（或未开始即被取消）后才归还：超时后调用方不再等待，但线程仍在访问上游
+            try:
+                loop.call_soon_threadsafe(semaphore.release)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
+        future.add_done_callback(release)
+        return await asyncio.wait_for(asyncio.wrap_future(future, loop=loop), timeout)
+
+    def submit(self, source: str, func: Callable[..., Any], *args) -> None:
+        """
+        提交一个在后台执行的阻塞调用（如过期快照的后台刷新），不等待结果
+        与 run 一样受线程池大小和数据源并发数限制；可在任意线程中调用，事件循环尚未运行时直接提交到线程池
+        :param source: 上游数据源名称
+        :param func: 同步函数
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            self._executor.submit(func, *args)
+            return
+
+        def schedule() -> None:
+            task = asyncio.ensure_future(self.run(source, func, *args))
+            self._background.add(task)
+            task.add_done_callback(self._background_done)
+
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            schedule()
+        else:
+            loop.call_soon_threadsafe(schedule)
+
+    def _background_done(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if isinstance(error, asyncio.TimeoutError):
+            # 调用方不再等待，线程仍会执行完毕
+            logger.warning("后台调用超时，仍在线程池中执行")
+        elif error is not None:
+            logger.error(f"后台调用失败: {error}")
+
+    async def run_local(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        在本地任务线程池中执行一个不访问上游的阻塞调用（读取本地存储、计算派生数据等）
+        不占用上游数据源的并发名额，也不受其超时限制
+        :param func: 同步函数
+        :return: 函数返回值
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._local_executor, functools.partial(func, *args, **kwargs))
+
+    async def get_realtime_min_data(self, ticker: str, interval: str = '1') -> BarSeries:
+        """
+        获取实时分时数据，见 StockDataProvider.get_realtime_min_data
+        :param ticker: 股票或指数代码
+        :param interval: 分时间隔
+        :return: 标准化后的分时数据
+        """
+        cache_key = self._provider.get_min_cache_key(ticker, interval)
+        # 内存中的K线仍有效时直接在事件循环中返回；读取共享缓存、磁盘和访问上游都在线程池中执行
+        cached = intraday_bar_cache.get_fresh(cache_key)
+        if cached is not None:
+            return cached
+
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_min_data(ticker, interval, cache_key))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        else:
+            logger.debug(f"合并 {cache_key} 的并发分时数据请求")
+        # shield: 单个请求被取消时不影响其他等待同一结果的请求
+        return await asyncio.shield(task)
+
+    async def get_resampled_min_data(self, ticker: str, interval: str) -> BarSeries:
+        """
+        获取由缓存的1分钟K线聚合出的分钟K线，见 StockDataProvider.resample_min_bars
+        切换图表周期不会访问上游，同一版本的1分钟K线每个周期只聚合一次
+        :param ticker: 股票或指数代码
+        :param interval: 分时间隔 ('1', '5', '15', '30', '60')
+        :return: 标准化后的分时数据
+        """
+        bars = await self.get_realtime_min_data(ticker, interval='1')
+        if interval == '1':
+            return bars
+        cache_key = self._provider.get_min_cache_key(ticker, '1')
+        minutes = int(interval)
+        return intraday_bar_cache.get_derived(
+            cache_key, f"resample_{minutes}", lambda bars: self._provider.resample_min_bars(bars, minutes)
+        )
+
+    async def get_quote_stats(self, ticker: str) -> Optional[Dict[str, float]]:
+        """
+        获取由当日1分钟K线计算的报价字段，见 StockDataProvider.compute_quote_stats
+        同一版本的K线只计算一次，图表、报价和摘要接口共享同一份K线数据
+        :param ticker: 股票或指数代码
+        :return: 报价字段，无数据时返回None
+        """
+        await self.get_realtime_min_data(ticker, interval='1')
+        cache_key = self._provider.get_min_cache_key(ticker, '1')
+        return intraday_bar_cache.get_derived(cache_key, "quote", self._provider.compute_quote_stats)
+
+    async def get_daily_history(
+        self, ticker: str, start: Optional[date] = None, end: Optional[date] = None, period: str = "daily"
+    ) -> List[Dict[str, Any]]:
+        """
+        获取日线/周线/月线数据，见 StockDataProvider.get_daily_history
+        :param ticker: 股票或指数代码
+        :param start: 开始日期（含）
+        :param end: 结束日期（含）
+        :param period: 周期 (daily, weekly, monthly)
+        :return: 标准化后的K线数据
+        """
+        # 只有需要与上游同步时才占用上游的并发名额（日线接口均来自东方财富），读取本地存储在本地任务线程池中执行
+        clean_ticker, is_index = self.standardize_ticker(ticker)
+        if await self.run_local(self._provider.needs_daily_sync, clean_ticker):
+            await self.run("eastmoney", self._provider.sync_daily_history, clean_ticker, is_index)
+        return await self.run_local(self._provider.get_daily_history, ticker, start, end, period, sync=False)
+
+    def get_min_data_version(self, ticker: str) -> Optional[Tuple[int, Optional[str], int]]:
+        """
+        获取缓存的1分钟K线的数据版本（用于ETag），无缓存时返回None
+        :param ticker: 股票或指数代码
+        :return: (缓存版本, 最新K线时间, K线数量)
+        """
+        entry = intraday_bar_cache.get(self._provider.get_min_cache_key(ticker, '1'))
+        if entry is None:
+            return None
+        return entry.version, entry.last_timestamp, len(entry.bars)
+
+    def get_daily_version(self, ticker: str) -> Tuple[int, float]:
+        """获取本地日线数据的版本（用于ETag），见 StockDataProvider.get_daily_version"""
+        return self._provider.get_daily_version(ticker)
+
+    async def _fetch_min_data(self, ticker: str, interval: str, cache_key: Tuple[str, str]) -> BarSeries:
+        """
+        从上游获取分时数据并合并到缓存，多个数据源之间使用对冲请求
+        先在本地任务线程池中查询共享缓存和磁盘缓存，仍然没有有效的K线时才访问上游；
+        多个工作进程同时需要刷新时只由获得刷新锁的进程访问上游，其余进程等待后读取共享的K线
+        """
+        window_start = self._provider.get_min_window_start()
+        cached, since = await self.run_local(intraday_bar_cache.lookup, cache_key, window_start)
+        if cached is not None:
+            return cached
+
+        async with refresh_lock(shared_bar_key(cache_key)) as leader:
+            if not leader:
+                cached, since = await self.run_local(intraday_bar_cache.lookup, cache_key, window_start)
+                if cached is not None:
+                    return cached
+            return await self._fetch_min_data_from_sources(ticker, interval, cache_key, since)
+
+    async def _fetch_min_data_from_sources(
+        self, ticker: str, interval: str, cache_key: Tuple[str, str], since: Optional[str]
+    ) -> BarSeries:
+        """依次（对冲）请求各数据源，全部失败时返回已缓存的旧数据"""
+
+        async def attempt(source: Dict[str, Any]) -> Optional[BarSeries]:
+            df = await self.run(source["source"], source["handler"])
+            # 合并时会写入磁盘缓存和共享缓存后端，在本地任务线程池中执行
+            return await self.run_local(self._provider.merge_min_result, cache_key, source, df, since)
+
+        sources = self._provider.get_min_data_sources(ticker, interval, since=since)
+        result = await self.hedged(f"{ticker} 的分时数据", sources, attempt)
+        if result is not None:
+            return result
+
+        # 上游全部失败时返回已缓存的旧数据
+        return intraday_bar_cache.get_bars(cache_key)
+
+    def get_hedge_delay(self, name: str) -> Optional[float]:
+        """
+        获取对冲请求的延迟：主数据源超过该时间未返回时启动下一个数据源
+        可通过 AKSHARE_HEDGE_DELAY_<NAME>（如 AKSHARE_HEDGE_DELAY_STOCK_ZH_A_HIST_MIN_EM）
+        或 AKSHARE_HEDGE_DELAY 配置，设置 AKSHARE_HEDGE=0 时关闭对冲、按顺序尝试
+        :param name: 主数据源名称
+        :return: 延迟秒数，关闭对冲时返回None
+        """
+        if os.getenv("AKSHARE_HEDGE", "1") == "0":
+            return None
+        default = os.getenv("AKSHARE_HEDGE_DELAY", str(DEFAULT_HEDGE_DELAY))
+        return float(os.getenv(f"AKSHARE_HEDGE_DELAY_{name.upper()}", default))
+
+    async def hedged(
+        self,
+        label: str,
+        sources: List[Dict[str, Any]],
+        attempt: Callable[[Dict[str, Any]], Awaitable[Optional[Any]]],
+    ) -> Optional[Any]:
+        """
+        按健康度对多个数据源发起对冲请求
+        数据源先按熔断器健康评分排序（熔断中的排在最后），当前数据源超过对冲延迟仍未返回（或已失败）时
+        启动下一个数据源，取第一个有效结果并取消其余请求。
+        :param label: 请求描述（用于日志）
+        :param sources: 数据源列表，需包含 name 字段
+        :param attempt: 对单个数据源发起请求，返回None表示结果无效
+        :return: 第一个有效结果，全部失败时返回None
+        """
+        pending: Dict[asyncio.Task, Dict[str, Any]] = {}
+        remaining = circuit_breakers.order(list(sources))
+        all_errors = []
+
+        async def timed(source: Dict[str, Any]) -> Optional[Any]:
+            histogram = source_latency.get(source["name"])
+            started = time.monotonic()
+            try:
+                result = await attempt(source)
+            except Exception:
+                histogram.observe_error()
+                raise
+            if result is None:
+                histogram.observe_error()
+            else:
+                histogram.observe(time.monotonic() - started)
+            return result
+
+        def launch_next() -> None:
+            if remaining:
+                source = remaining.pop(0)
+                logger.info(f"尝试从 {source['name']} 获取{label}")
+                pending[asyncio.ensure_future(timed(source))] = source
+
+        launch_next()
+        try:
+            while pending:
+                delay = None
+                if remaining:
+                    # 以最早启动、仍在进行的数据源决定对冲延迟
+                    delay = self.get_hedge_delay(next(iter(pending.values()))["name"])
+                done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    logger.info(f"{label}: 超过 {delay}s 未返回，启动对冲请求")
+                    launch_next()
+                    continue
+
+                for task in done:
+                    source = pending.pop(task)
+                    try:
+                        result = task.result()
+                        if result is not None:
+                            return result
+                        all_errors.append(f"{source['name']} 返回的数据无效")
+                    except asyncio.TimeoutError:
+                        error_msg = f"从 {source['name']} 获取数据超时"
+                        logger.warning(error_msg)
+                        all_errors.append(error_msg)
+                    except Exception as e:
+                        error_msg = f"从 {source['name']} 获取数据时出错: {str(e)}"
+                        logger.error(error_msg, exc_info=True)
+                        all_errors.append(error_msg)
+                    # 失败后立即尝试下一个数据源
+                    if not pending:
+                        launch_next()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if all_errors:
+            logger.error(f"所有数据源都失败: {'; '.join(all_errors)}")
+        return None
+
+    async def get_market_snapshot(self) -> pd.DataFrame:
+        """
+        获取A股全市场行情快照（只读，共享数据）
+        :return: 全市场行情DataFrame
+        """
+        return await self._get_snapshot(market_snapshot)
+
+    async def get_index_snapshot(self) -> pd.DataFrame:
+        """
+        获取中国股票指数行情快照（只读，共享数据）
+        :return: 全部指数行情DataFrame
+        """
+        return await self._get_snapshot(index_snapshot)
+
+    async def _get_snapshot(self, snapshot: MarketSnapshotCache) -> pd.DataFrame:
+        """已有快照时直接在事件循环中返回（过期时由快照缓存在后台刷新），无快照时才在线程池中加载"""
+        data = snapshot.get_nowait()
+        if data is not None:
+            return data
+        return await self.run(snapshot.source, snapshot.get)
+
+    async def get_snapshot_derived(
+        self, snapshot: MarketSnapshotCache, name: str, compute: Callable[[pd.DataFrame], Any]
+    ) -> Any:
+        """
+        获取由行情快照计算出的派生数据，见 MarketSnapshotCache.get_derived
+        :param snapshot: 行情快照缓存 (market_snapshot, index_snapshot)
+        :param name: 派生数据名称
+        :param compute: 计算函数
+        :return: 派生数据
+        """
+        value = snapshot.get_derived_nowait(name)
+        if value is not None:
+            return value
+        if not snapshot.loaded:
+            # 无快照：加载快照需要访问上游
+            return await self.run(snapshot.source, snapshot.get_derived, name, compute)
+        # 当前快照版本尚未计算：只是本地计算，不占用上游的并发名额
+        return await self.run_local(snapshot.get_derived, name, compute)
+
+
+# 创建全局异步数据提供者实例
+async_stock_data_provider = AsyncStockDataProvider(stock_data_provider)
+
+# 过期行情快照的后台刷新与其他上游调用共用线程池和数据源并发限制
+use_refresh_submitter(async_stock_data_provider.submit)
@@ -0,0 +1,314 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from itertools import groupby
+from typing import Any, Callable, Dict, Optional, Tuple
+from .bar_series import BarSeries
+from .cache_backend import cache_get, cache_set
+from .disk_cache import disk_cache
+from .logger import get_logger
+from .trading_calendar import current_session, is_session_complete, is_trading_time
+
+logger = get_logger(__name__)
+
+# 磁盘缓存中分时K线的数据源名称
+DISK_SOURCE = "intraday"
+
+BarKey = Tuple[str, str]
+
+
+def shared_bar_key(key: BarKey) -> str:
+    """分时K线在共享缓存后端中的键（同时用作刷新锁的名称）"""
+    return f"bars:{key[0]}:{key[1]}"
+
+
+class BarCacheEntry:
+    """单个 (代码, 周期) 的分时K线缓存"""
+
+    __slots__ = ("bars", "fetched_at", "version", "derived")
+
+    def __init__(self):
+        self.bars = BarSeries()
+        self.fetched_at = 0.0
+        self.version = 0
+        # 由K线计算出的派生数据 {名称: (计算时的版本, 值)}
+        self.derived: Dict[str, Tuple[int, Any]] = {}
+
+    @property
+    def last_timestamp(self) -> Optional[str]:
+        """最后一根K线的时间"""
+        return self.bars.last_date
+
+    @property
+    def size_bytes(self) -> int:
+        return self.bars.nbytes
+
+
+class IntradayBarCache:
+    """
+    分时K线缓存，按 (代码, 周期) 保存已下载的K线
+
+    - 刷新时只需获取最后一根缓存K线之后的数据，再与已有数据合并去重
+    - 按LRU淘汰，同时限制条目数和估算内存占用
+    - 按交易日写入磁盘缓存，冷启动时从磁盘恢复，之后只需增量获取最后一根K线之后的数据
+    - 每次更新后发布到共享缓存后端，其他工作进程的缓存过期时优先使用共享的K线
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        off_hours_ttl: Optional[float] = None,
+    ):
+        """
+        :param max_entries: 最大缓存条目数
+        :param max_bytes: 最大估算内存占用（字节）
+        :param ttl: 交易时间内缓存的有效期（秒），过期后触发增量刷新
+        :param off_hours_ttl: 非交易时间的有效期（秒）
+        """
+        self.max_entries = max_entries or int(os.getenv("BAR_CACHE_MAX_ENTRIES", "500"))
+        self.max_bytes = max_bytes or int(os.getenv("BAR_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        self.ttl = ttl if ttl is not None else float(os.getenv("BAR_CACHE_TTL_SECONDS", "5"))
+        self.off_hours_ttl = (
+            off_hours_ttl if off_hours_ttl is not None
+            else float(os.getenv("BAR_CACHE_OFF_HOURS_TTL_SECONDS", "300"))
+        )
+
+        self._entries: "OrderedDict[BarKey, BarCacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.incremental_refreshes = 0
+        self.evictions = 0
+        self.shared_loads = 0
+
+    def get(self, key: BarKey) -> Optional[BarCacheEntry]:
+        """获取缓存条目并标记为最近使用"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def is_fresh(self, entry: Optional[BarCacheEntry]) -> bool:
+        """缓存条目是否仍在有效期内"""
+        if entry is None or not entry.bars:
+            return False
+        ttl = self.ttl if is_trading_time() else self.off_hours_ttl
+        return time.monotonic() - entry.fetched_at < ttl
+
+    def get_fresh(self, key: BarKey) -> Optional[BarSeries]:
+        """
+        只在内存中查询仍在有效期内的K线（不读取共享缓存和磁盘，可在事件循环中调用）
+        :param key: (代码, 周期)
+        :return: 有效的缓存K线，没有时返回None，由调用方在线程中执行 lookup
+        """
+        entry = self.get(key)
+        if not self.is_fresh(entry):
+            return None
+        self.hits += 1
+        return entry.bars
+
+    def lookup(
+        self, key: BarKey, window_start: Optional[str] = None
+    ) -> Tuple[Optional[BarSeries], Optional[str]]:
+        """
+        查询缓存并确定增量刷新的起点，内存中的K线过期时先使用其他工作进程共享的K线，没有时再从磁盘缓存恢复
+        :param key: (代码, 周期)
+        :param window_start: 窗口起始时间，从磁盘恢复时丢弃更早的K线
+        :return: (有效的缓存K线, 增量起始时间)；缓存有效时直接返回K线，无需访问上游
+        """
+        entry = self.get(key)
+        if not self.is_fresh(entry):
+            entry = self._load_shared(key, entry)
+        if entry is None and window_start is not None:
+            entry = self._load_from_disk(key, window_start)
+        if self.is_fresh(entry):
+            self.hits += 1
+            return entry.bars, None
+
+        self.misses += 1
+        return None, entry.last_timestamp if entry is not None else None
+
+    def get_bars(self, key: BarKey) -> BarSeries:
+        """获取缓存K线（不检查有效期），无缓存时返回空序列"""
+        entry = self.get(key)
+        return entry.bars if entry is not None else BarSeries(symbol=key[0], interval=key[1])
+
+    def get_derived(self, key: BarKey, name: str, compute: Callable[[BarSeries], Any]) -> Any:
+        """
+        获取由缓存K线计算出的派生数据，同一版本的K线只计算一次
+        :param key: (代码, 周期)
+        :param name: 派生数据名称
+        :param compute: 计算函数，参数为完整K线序列
+        :return: 派生数据；无缓存时直接对空序列计算
+        """
+        entry = self.get(key)
+        if entry is None:
+            return compute(BarSeries(symbol=key[0], interval=key[1]))
+
+        cached = entry.derived.get(name)
+        if cached is not None and cached[0] == entry.version:
+            return cached[1]
+
+        version, bars = entry.version, entry.bars
+        value = compute(bars)
+        entry.derived[name] = (version, value)
+        return value
+
+    def _load_shared(self, key: BarKey, entry: Optional[BarCacheEntry]) -> Optional[BarCacheEntry]:
+        """
+        使用其他工作进程发布到共享缓存后端的K线（比当前缓存新时才替换）
+        :param key: (代码, 周期)
+        :param entry: 当前缓存条目
+        :return: 替换后的缓存条目；共享缓存中没有更新的数据时返回原条目
+        """
+        shared = cache_get(shared_bar_key(key))
+        if shared is None:
+            return entry
+        published_at, bars = shared
+        age = max(0.0, time.time() - published_at)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and age >= time.monotonic() - entry.fetched_at:
+                return entry
+            if entry is None:
+                entry = self._entries[key] = BarCacheEntry()
+            old_size = entry.size_bytes
+            entry.bars = bars
+            entry.version += 1
+            entry.fetched_at = time.monotonic() - age
+            self.shared_loads += 1
+            self._total_bytes += entry.size_bytes - old_size
+            self._evict()
+        logger.debug(f"使用共享缓存中的分时K线: {key}，已存在: {age:.1f}s")
+        return entry
+
+    def _load_from_disk(self, key: BarKey, window_start: str) -> Optional[BarCacheEntry]:
+        """
+        从磁盘缓存恢复窗口内的K线
+        :param key: (代码, 周期)
+        :param window_start: 窗口起始时间 'YYYY-MM-DD HH:MM:SS'
+        :return: 恢复的缓存条目，磁盘中没有数据时返回None
+        """
+        stored = disk_cache.get_since(DISK_SOURCE, key[0], key[1], window_start[:10])
+        records = [bar for entry in stored for bar in json.loads(entry.payload)]
+        bars = BarSeries.from_records(records, *key).since(window_start)
+        if not bars:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry
+            entry = self._entries[key] = BarCacheEntry()
+            entry.bars = bars
+            entry.version = 1
+            # 最新交易日已定稿且仍是当前交易日时不会再有新K线，直接视为有效；否则从最后一根K线之后增量获取
+            session = current_session().isoformat()
+            if stored[-1].complete and stored[-1].trade_day == session:
+                entry.fetched_at = time.monotonic()
+            self._total_bytes += entry.size_bytes
+            self._evict()
+        logger.debug(f"从磁盘缓存恢复分时K线: {key}，条数: {len(bars)}")
+        return entry
+
+    def _persist(self, key: BarKey, bars: BarSeries) -> None:
+        """
+        按交易日把K线写入磁盘缓存（已定稿的交易日不会被覆盖）
+        :param key: (代码, 周期)
+        :param bars: 需要写入的交易日的完整K线
+        """
+        for day, day_bars in groupby(bars.to_records(), key=lambda bar: bar["date"][:10]):
+            payload = json.dumps(list(day_bars), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            complete = is_session_complete(date.fromisoformat(day))
+            disk_cache.put(DISK_SOURCE, key[0], key[1], day, payload, complete)
+
+    def touch(self, key: BarKey) -> None:
+        """上游确认没有新K线时，刷新缓存的有效期"""
+        published_at = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry.fetched_at = time.monotonic()
+            bars = entry.bars
+        cache_set(shared_bar_key(key), (published_at, bars))
+
+    def merge(self, key: BarKey, new_bars: BarSeries, window_start: Optional[str] = None) -> BarSeries:
+        """
+        合并新获取的K线，生成新的序列（已发布的序列保持不变，持有旧序列的请求不受影响）
+        :param key: (代码, 周期)
+        :param new_bars: 新获取的K线（按时间升序）
+        :param window_start: 窗口起始时间，早于该时间的K线会被丢弃
+        :return: 合并后的完整K线序列
+        """
+        # 发布时间取在本地时间戳之前，本进程读到自己发布的K线时不会把它当作更新的数据
+        published_at = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = BarCacheEntry()
+            else:
+                self._entries.move_to_end(key)
+                self.incremental_refreshes += 1
+
+            old_size = entry.size_bytes
+            bars = entry.bars
+            if new_bars:
+                # 新数据第一根K线及之后的缓存K线可能尚未走完，以新数据为准（二分查找切分点，切片不复制）
+                bars = BarSeries.concat([bars[:bars.index_at(new_bars.dates[0])], new_bars])
+
+            if window_start is not None:
+                bars = bars.since(window_start)
+
+            if not bars.equals(entry.bars):
+                bars.symbol, bars.interval = key
+                entry.bars = bars
+                entry.version += 1
+            entry.fetched_at = time.monotonic()
+
+            self._total_bytes += entry.size_bytes - old_size
+            self._evict()
+            merged = entry.bars
+
+        cache_set(shared_bar_key(key), (published_at, merged))
+        if new_bars:
+            # 只重写新数据涉及的交易日
+            first_day = new_bars.dates[0].astype("M8[D]")
+            self._persist(key, merged.since(first_day))
+        return merged
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "incremental_refreshes": self.incremental_refreshes,
+            "evictions": self.evictions,
+            "shared_loads": self.shared_loads,
+        }
+
+    def _evict(self) -> None:
+        """按LRU淘汰超出上限的条目（调用方需持有锁）"""
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            key, entry = self._entries.popitem(last=False)
+            self._total_bytes -= entry.size_bytes
+            self.evictions += 1
+            logger.debug(f"淘汰分时缓存: {key}")
+
+
+# 创建全局分时K线缓存实例
+intraday_bar_cache = IntradayBarCache()
@@ -0,0 +1,282 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+import numpy as np
+import pandas as pd
+
+# K线数值列（输出记录时的字段顺序：date 之后依次为这些列）
+BAR_FIELDS = ("open", "close", "high", "low", "volume")
+
+# 时间精度：秒（北京时间，不带时区）
+DATE_DTYPE = "M8[s]"
+
+# append 预留空间时的最小容量
+MIN_CAPACITY = 16
+
+
+def to_datetime64(value: Union[str, np.datetime64]) -> np.datetime64:
+    """将 'YYYY-MM-DD HH:MM:SS' 格式的时间转换为秒精度的datetime64"""
+    return np.datetime64(value, "s") if isinstance(value, np.datetime64) else np.datetime64(str(value).replace(" ", "T"), "s")
+
+
+def format_date(date: np.datetime64) -> str:
+    """将datetime64格式化为 'YYYY-MM-DD HH:MM:SS'"""
+    return str(date).replace("T", " ")
+
+
+def format_dates(dates: np.ndarray) -> List[str]:
+    """将datetime64数组格式化为 'YYYY-MM-DD HH:MM:SS' 字符串列表"""
+    return [date.replace("T", " ") for date in np.datetime_as_string(dates, unit="s").tolist()]
+
+
+class BarSeries:
+    """
+    紧凑的分时K线序列，时间和各数值列分别保存为NumPy数组（代替逐条的 List[Dict]）
+
+    - append 按容量倍增预留空间，均摊O(1)
+    - 切片返回共享底层数组的视图，不复制数据；对视图 append 时先复制，不会改写原序列
+    - 最高/最低价、成交量加权均价、累计成交量等聚合均为向量化计算
+    - 输出逐条记录（JSON、推送）时才转换为字典，结果缓存在序列上
+
+    放入分时缓存后视为只读，多个请求共享同一对象；更新时由 concat 和切片生成新序列。
+    """
+
+    __slots__ = ("_dates", "_values", "_length", "_owns_buffer", "_records", "symbol", "interval")
+
+    def __init__(
+        self,
+        dates: Optional[np.ndarray] = None,
+        values: Optional[Dict[str, np.ndarray]] = None,
+        symbol: Optional[str] = None,
+        interval: Optional[str] = None,
+    ):
+        """
+        :param dates: 时间（按升序，秒精度datetime64）
+        :param values: {数值列: float64数组}，见 BAR_FIELDS，长度与dates一致
+        :param symbol: 代码
+        :param interval: 周期
+        """
+        self._dates = np.asarray(dates if dates is not None else [], dtype=DATE_DTYPE)
+        self._length = len(self._dates)
+        self._values = {
+            field: np.asarray(values[field], dtype="float64") if values is not None else np.empty(0, dtype="float64")
+            for field in BAR_FIELDS
+        }
+        self._owns_buffer = True
+        self._records: Optional[List[Dict[str, Any]]] = None
+        self.symbol = symbol
+        self.interval = interval
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, symbol: Optional[str] = None, interval: Optional[str] = None) -> "BarSeries":
+        """
+        由 convert_frame 转换后的分时数据构建（无法解析的时间所在行被丢弃）
+        :param frame: 包含 date 及 BAR_FIELDS 列的DataFrame
+        :return: K线序列
+        """
+        dates = pd.to_datetime(frame["date"], errors="coerce", format="ISO8601").to_numpy()
+        valid = ~np.isnat(dates)
+        return cls(
+            dates[valid].astype(DATE_DTYPE),
+            {field: frame[field].to_numpy(dtype="float64")[valid] for field in BAR_FIELDS},
+            symbol, interval,
+        )
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]], symbol: Optional[str] = None, interval: Optional[str] = None) -> "BarSeries":
+        """
+        由逐条记录构建（如磁盘缓存中的JSON）
+        :param records: [{date, open, close, high, low, volume}]
+        :return: K线序列
+        """
+        records = list(records)
+        return cls(
+            np.array([to_datetime64(record["date"]) for record in records], dtype=DATE_DTYPE),
+            {field: np.fromiter((record.get(field, 0.0) for record in records), "float64", len(records)) for field in BAR_FIELDS},
+            symbol, interval,
+        )
+
+    @classmethod
+    def concat(cls, parts: Iterable["BarSeries"]) -> "BarSeries":
+        """
+        按顺序拼接多个序列，生成新序列（元数据取第一个序列）
+        :param parts: K线序列
+        :return: 新序列
+        """
+        parts = list(parts)
+        if not parts:
+            return cls()
+        return cls(
+            np.concatenate([part.dates for part in parts]),
+            {field: np.concatenate([part[field] for part in parts]) for field in BAR_FIELDS},
+            parts[0].symbol, parts[0].interval,
+        )
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __repr__(self) -> str:
+        return f"BarSeries({self.symbol}, {self.interval}, {self._length} bars, {self.first_date} - {self.last_date})"
+
+    def __reduce__(self):
+        # 序列化时只保存有效部分（不含append预留的空间）
+        return BarSeries, (self.dates.copy(), {field: self[field].copy() for field in BAR_FIELDS}, self.symbol, self.interval)
+
+    @property
+    def dates(self) -> np.ndarray:
+        """时间数组（视图）"""
+        return self._dates[:self._length]
+
+    @property
+    def open(self) -> np.ndarray:
+        return self._values["open"][:self._length]
+
+    @property
+    def close(self) -> np.ndarray:
+        return self._values["close"][:self._length]
+
+    @property
+    def high(self) -> np.ndarray:
+        return self._values["high"][:self._length]
+
+    @property
+    def low(self) -> np.ndarray:
+        return self._values["low"][:self._length]
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self._values["volume"][:self._length]
+
+    @property
+    def first_date(self) -> Optional[str]:
+        """第一根K线的时间 'YYYY-MM-DD HH:MM:SS'"""
+        return format_date(self._dates[0]) if self._length else None
+
+    @property
+    def last_date(self) -> Optional[str]:
+        """最后一根K线的时间 'YYYY-MM-DD HH:MM:SS'"""
+        return format_date(self._dates[self._length - 1]) if self._length else None
+
+    @property
+    def nbytes(self) -> int:
+        """占用的内存（含append预留的空间）"""
+        return self._dates.nbytes + sum(values.nbytes for values in self._values.values())
+
+    def __getitem__(self, item: Union[int, slice, str]) -> Any:
+        """
+        - 整数：单根K线的记录 {date, open, close, high, low, volume}
+        - 切片：共享底层数组的视图序列
+        - 字段名：该列的数组（视图），如 series["close"]
+        """
+        if isinstance(item, str):
+            return self.dates if item == "date" else self._values[item][:self._length]
+        if isinstance(item, slice):
+            start, stop, step = item.indices(self._length)
+            view = BarSeries.__new__(BarSeries)
+            view._dates = self._dates[start:stop:step]
+            view._values = {field: values[start:stop:step] for field, values in self._values.items()}
+            view._length = len(view._dates)
+            view._owns_buffer = False
+            view._records = None
+            view.symbol, view.interval = self.symbol, self.interval
+            return view
+        if item < 0:
+            item += self._length
+        if not 0 <= item < self._length:
+            raise IndexError("K线序列下标越界")
+        return self.to_records()[item]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.to_records())
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """
+        转换为逐条记录（Yahoo Finance兼容格式），结果缓存在序列上，调用方不得修改
+        :return: [{date, open, close, high, low, volume}]
+        """
+        if self._records is None:
+            columns = [format_dates(self.dates)] + [self[field].tolist() for field in BAR_FIELDS]
+            names = ("date",) + BAR_FIELDS
+            self._records = [dict(zip(names, row)) for row in zip(*columns)]
+        return self._records
+
+    def append(self, date: Union[str, np.datetime64], open: float, close: float, high: float, low: float, volume: float) -> None:
+        """
+        在末尾追加一根K线（均摊O(1)），时间不得早于最后一根K线
+        只能在放入缓存之前调用；对切片视图追加时先复制为独立序列
+        """
+        if not self._owns_buffer or self._length == len(self._dates):
+            self._grow(max(MIN_CAPACITY, self._length * 2))
+        index = self._length
+        self._dates[index] = to_datetime64(date)
+        for field, value in zip(BAR_FIELDS, (open, close, high, low, volume)):
+            self._values[field][index] = value
+        self._length += 1
+        self._records = None
+
+    def _grow(self, capacity: int) -> None:
+        """重新分配容量为capacity的数组并复制有效数据"""
+        dates = np.empty(capacity, dtype=DATE_DTYPE)
+        dates[:self._length] = self.dates
+        values = {}
+        for field in BAR_FIELDS:
+            values[field] = np.empty(capacity, dtype="float64")
+            values[field][:self._length] = self[field]
+        self._dates, self._values, self._owns_buffer = dates, values, True
+
+    def index_at(self, date: Union[str, np.datetime64]) -> int:
+        """
+        第一根时间不早于date的K线的下标（二分查找）
+        :param date: 时间 'YYYY-MM-DD HH:MM:SS'
+        :return: 下标，所有K线都早于date时返回长度
+        """
+        return int(np.searchsorted(self.dates, to_datetime64(date), side="left"))
+
+    def since(self, date: Union[str, np.datetime64]) -> "BarSeries":
+        """时间不早于date的K线（视图）"""
+        return self[self.index_at(date):]
+
+    def last_day(self) -> "BarSeries":
+        """最后一个交易日的K线（视图）"""
+        if not self._length:
+            return self
+        day = self._dates[self._length - 1].astype("M8[D]")
+        return self.since(day.astype(DATE_DTYPE))
+
+    def equals(self, other: "BarSeries") -> bool:
+        """两个序列的时间和数值是否完全相同"""
+        return (
+            len(self) == len(other)
+            and np.array_equal(self.dates, other.dates)
+            and all(np.array_equal(self[field], other[field]) for field in BAR_FIELDS)
+        )
+
+    def day_high(self) -> Optional[float]:
+        """序列内的最高价（对 last_day() 的结果调用即为当日最高价），无数据时返回None"""
+        return float(self.high.max()) if self._length else None
+
+    def day_low(self) -> Optional[float]:
+        """序列内的最低价，无数据时返回None"""
+        return float(self.low.min()) if self._length else None
+
+    def total_volume(self) -> float:
+        """序列内的总成交量"""
+        return float(self.volume.sum())
+
+    def cumulative_volume(self) -> np.ndarray:
+        """逐根累计成交量"""
+        return np.cumsum(self.volume)
+
+    def vwap(self) -> Optional[float]:
+        """
+        成交量加权均价，以 (最高+最低+收盘)/3 作为每根K线的典型价格
+        :return: 均价，无成交量时返回None
+        """
+        total = self.volume.sum()
+        if not self._length or total <= 0:
+            return None
+        typical = (self.high + self.low + self.close) / 3
+        return float(np.dot(typical, self.volume) / total)
+
+
+def as_records(bars: Union[BarSeries, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """将K线序列转换为逐条记录（日线等已是记录列表时原样返回）"""
+    return bars.to_records() if isinstance(bars, BarSeries) else bars
@@ -0,0 +1,348 @@
+import asyncio
+import os
+import pickle
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# 缓存后端：local（默认，进程内）或 redis（多个工作进程共享，需要安装redis包）
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "local").lower()
+
+# Redis 连接地址和键前缀（多个服务共用同一个Redis时用前缀区分）
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+CACHE_KEY_PREFIX = os.getenv("CACHE_KEY_PREFIX", "stocks:")
+
+# 共享数据的默认保存时间（秒）；是否仍然有效由各缓存按自己的TTL判断，这里只决定何时从后端删除
+CACHE_BACKEND_TTL_SECONDS = float(os.getenv("CACHE_BACKEND_TTL_SECONDS", str(24 * 3600)))
+
+# 刷新锁的过期时间（持有者崩溃后自动释放）和等待其他工作进程刷新的最长时间（秒）
+CACHE_LOCK_TTL_SECONDS = float(os.getenv("CACHE_LOCK_TTL_SECONDS", "30"))
+CACHE_LOCK_POLL_SECONDS = float(os.getenv("CACHE_LOCK_POLL_SECONDS", "0.05"))
+
+
+class LocalCacheBackend:
+    """
+    进程内缓存后端（默认）
+
+    值按引用保存，不做序列化；锁只在当前进程内互斥。
+    数据本来就在各缓存自身中，cache_get/cache_set 不会重复保存到这里（见 shared），只使用其中的锁。
+    """
+
+    name = "local"
+    # 是否在工作进程之间共享数据
+    shared = False
+
+    def __init__(self):
+        self._values: Dict[str, Tuple[float, Any]] = {}
+        self._locks: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, key: str) -> Any:
+        """
+        读取共享数据
+        :param key: 键
+        :return: 值，不存在或已过期时返回None
+        """
+        with self._lock:
+            item = self._values.get(key)
+            if item is not None and item[0] <= time.monotonic():
+                del self._values[key]
+                item = None
+        if item is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return item[1]
+
+    def set(self, key: str, value: Any, ttl: float = CACHE_BACKEND_TTL_SECONDS) -> None:
+        """
+        写入共享数据
+        :param key: 键
+        :param value: 值（调用方不得再原地修改）
+        :param ttl: 保存时间（秒）
+        """
+        with self._lock:
+            self._values[key] = (time.monotonic() + ttl, value)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._values.pop(key, None)
+
+    def acquire_lock(self, name: str, ttl: float) -> Optional[str]:
+        """
+        尝试获取锁（不等待）
+        :param name: 锁名称
+        :param ttl: 锁的过期时间（秒）
+        :return: 获取成功时返回持有者令牌，否则返回None
+        """
+        now = time.monotonic()
+        with self._lock:
+            held = self._locks.get(name)
+            if held is not None and held[0] > now:
+                return None
+            token = uuid.uuid4().hex
+            self._locks[name] = (now + ttl, token)
+            return token
+
+    def release_lock(self, name: str, token: str) -> None:
+        """释放锁（只释放自己持有的锁，过期后被他人获取的锁不受影响）"""
+        with self._lock:
+            held = self._locks.get(name)
+            if held is not None and held[1] == token:
+                del self._locks[name]
+
+    def is_locked(self, name: str) -> bool:
+        with self._lock:
+            held = self._locks.get(name)
+            return held is not None and held[0] > time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """后端统计"""
+        return {
+            "backend": self.name,
+            "keys": len(self._values),
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+
+class RedisCacheBackend:
+    """
+    Redis 缓存后端，多个工作进程（或多台机器）共享行情快照和分时K线
+
+    - 值使用pickle序列化，按 CACHE_KEY_PREFIX 加前缀保存
+    - 锁使用 SET NX PX 获取，释放时通过 WATCH/MULTI 比较令牌后删除，只删除自己持有的锁
+    - Redis 不可用时读取视为未命中、写入被丢弃、锁视为获取成功，各进程退回到各自访问上游
+    """
+
+    name = "redis"
+    shared = True
+
+    def __init__(self, url: str = CACHE_REDIS_URL, client: Any = None, prefix: str = CACHE_KEY_PREFIX):
+        """
+        :param url: Redis 连接地址
+        :param client: 已创建的客户端（如 fakeredis.FakeRedis），指定后忽略url
+        :param prefix: 键前缀
+        """
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self._client = client
+        self.prefix = prefix
+
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _record_error(self, action: str, error: Exception) -> None:
+        self.errors += 1
+        logger.warning(f"Redis缓存{action}失败: {error}")
+
+    def get(self, key: str) -> Any:
+        try:
+            raw = self._client.get(self.prefix + key)
+        except Exception as e:
+            self._record_error("读取", e)
+            return None
+        if raw is None:
+            self.misses += 1
+            return None
+        try:
+            value = pickle.loads(raw)
+        except Exception as e:
+            self._record_error("反序列化", e)
+            return None
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: float = CACHE_BACKEND_TTL_SECONDS) -> None:
+        try:
+            payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            self._client.set(self.prefix + key, payload, px=max(1, int(ttl * 1000)))
+        except Exception as e:
+            self._record_error("写入", e)
+
+    def delete(self, key: str) -> None:
+        try:
+            self._client.delete(self.prefix + key)
+        except Exception as e:
+            self._record_error("删除", e)
+
+    def acquire_lock(self, name: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        try:
+            acquired = self._client.set(self.prefix + "lock:" + name, token, nx=True, px=max(1, int(ttl * 1000)))
+        except Exception as e:
+            self._record_error("加锁", e)
+            return token
+        return token if acquired else None
+
+    def release_lock(self, name: str, token: str) -> None:
+        from redis.exceptions import WatchError
+
+        key = self.prefix + "lock:" + name
+        try:
+            with self._client.pipeline() as pipe:
+                pipe.watch(key)
+                held = pipe.get(key)
+                if held is not None and held.decode() == token:
+                    pipe.multi()
+                    pipe.delete(key)
+                    pipe.execute()
+                else:
+                    pipe.unwatch()
+        except WatchError:
+            # 比较之后锁被修改（已过期并被他人获取），不再删除
+            pass
+        except Exception as e:
+            self._record_error("解锁", e)
+
+    def is_locked(self, name: str) -> bool:
+        try:
+            return bool(self._client.exists(self.prefix + "lock:" + name))
+        except Exception as e:
+            self._record_error("查询锁", e)
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+        }
+
+
+class RefreshLock:
+    """
+    跨工作进程的刷新锁，保证同一时刻只有一个工作进程刷新某个键
+
+    进入时立即尝试获取锁：获取成功返回True，由当前进程刷新并在退出时释放；
+    否则等待持有者释放（或超时）后返回False，调用方应重新读取共享缓存，仍然没有数据时再自行刷新。
+    同时支持 with（在线程中使用）和 async with（在事件循环中使用），
+    在事件循环中使用共享后端（Redis）时，加锁、查询和解锁都在线程中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, backend: Any, name: str, ttl: float = CACHE_LOCK_TTL_SECONDS, wait_timeout: Optional[float] = None):
+        """
+        :param backend: 缓存后端
+        :param name: 锁名称（通常与共享数据的键相同）
+        :param ttl: 锁的过期时间（秒）
+        :param wait_timeout: 等待其他工作进程刷新的最长时间（秒），默认与ttl相同
+        """
+        self._backend = backend
+        self.name = name
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout if wait_timeout is not None else ttl
+        self._token: Optional[str] = None
+
+    def __enter__(self) -> bool:
+        self._token = self._backend.acquire_lock(self.name, self.ttl)
+        if self._token is not None:
+            refresh_lock_stats["acquired"] += 1
+            return True
+        refresh_lock_stats["contended"] += 1
+        deadline = time.monotonic() + self.wait_timeout
+        while self._backend.is_locked(self.name) and time.monotonic() < deadline:
+            time.sleep(CACHE_LOCK_POLL_SECONDS)
+        return False
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self._token is not None:
+            self._backend.release_lock(self.name, self._token)
+            self._token = None
+
+    async def _call(self, func: Callable[..., Any], *args: Any) -> Any:
+        """调用后端方法：共享后端需要网络往返，在线程中执行；进程内后端直接调用"""
+        if self._backend.shared:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def __aenter__(self) -> bool:
+        self._token = await self._call(self._backend.acquire_lock, self.name, self.ttl)
+        if self._token is not None:
+            refresh_lock_stats["acquired"] += 1
+            return True
+        refresh_lock_stats["contended"] += 1
+        deadline = time.monotonic() + self.wait_timeout
+        while await self._call(self._backend.is_locked, self.name) and time.monotonic() < deadline:
+            await asyncio.sleep(CACHE_LOCK_POLL_SECONDS)
+        return False
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        if self._token is not None:
+            token, self._token = self._token, None
+            await self._call(self._backend.release_lock, self.name, token)
+
+
+# 刷新锁统计：acquired 获取成功次数，contended 等待其他工作进程刷新的次数
+refresh_lock_stats: Dict[str, int] = {"acquired": 0, "contended": 0}
+
+
+def create_cache_backend(kind: str = CACHE_BACKEND) -> Any:
+    """
+    按配置创建缓存后端
+    :param kind: local 或 redis
+    :return: 缓存后端
+    """
+    if kind == "redis":
+        logger.info(f"使用Redis缓存后端: {CACHE_REDIS_URL}")
+        return RedisCacheBackend()
+    return LocalCacheBackend()
+
+
+# 全局缓存后端（行情快照、分时K线和证券列表通过它在工作进程之间共享）
+cache_backend = create_cache_backend()
+
+
+def use_cache_backend(backend: Any) -> None:
+    """
+    替换全局缓存后端（如测试时使用 fakeredis）
+    :param backend: 缓存后端
+    """
+    global cache_backend
+    cache_backend = backend
+
+
+def cache_get(key: str) -> Any:
+    """
+    从当前缓存后端读取共享数据
+    :param key: 键
+    :return: 值，不存在或后端不在工作进程之间共享时返回None
+    """
+    if not cache_backend.shared:
+        return None
+    return cache_backend.get(key)
+
+
+def cache_set(key: str, value: Any, ttl: float = CACHE_BACKEND_TTL_SECONDS) -> None:
+    """
+    把共享数据写入当前缓存后端（后端不在工作进程之间共享时忽略）
+    :param key: 键
+    :param value: 值（调用方不得再原地修改）
+    :param ttl: 保存时间（秒）
+    """
+    if cache_backend.shared:
+        cache_backend.set(key, value, ttl)
+
+
+def refresh_lock(name: str, ttl: float = CACHE_LOCK_TTL_SECONDS, wait_timeout: Optional[float] = None) -> RefreshLock:
+    """
+    创建当前缓存后端上的刷新锁，见 RefreshLock
+    :param name: 锁名称
+    :param ttl: 锁的过期时间（秒）
+    :param wait_timeout: 等待其他工作进程刷新的最长时间（秒）
+    :return: 刷新锁
+    """
+    return RefreshLock(cache_backend, name, ttl, wait_timeout)
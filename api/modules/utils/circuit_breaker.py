@@ -0,0 +1,207 @@
+import functools
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    单个上游数据源的熔断器
+
+    - closed: 正常调用，统计滚动时间窗口内的错误率
+    - open: 错误率超过阈值后熔断，直接拒绝调用，冷却时间过后进入half_open
+    - half_open: 只放行一个探测请求，成功则恢复closed，失败则重新open
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: Optional[float] = None,
+        min_calls: Optional[int] = None,
+        error_threshold: Optional[float] = None,
+        open_seconds: Optional[float] = None,
+    ):
+        """
+        :param name: 数据源名称（akshare接口名）
+        :param window_seconds: 统计错误率的滚动窗口（秒）
+        :param min_calls: 窗口内至少有多少次调用才会判断熔断
+        :param error_threshold: 触发熔断的错误率 (0~1)
+        :param open_seconds: 熔断后的冷却时间（秒）
+        """
+        self.name = name
+        self.window_seconds = window_seconds or float(os.getenv("BREAKER_WINDOW_SECONDS", "60"))
+        self.min_calls = min_calls or int(os.getenv("BREAKER_MIN_CALLS", "5"))
+        self.error_threshold = error_threshold or float(os.getenv("BREAKER_ERROR_THRESHOLD", "0.5"))
+        self.open_seconds = open_seconds or float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        # 滚动窗口内的调用结果 (时间, 是否成功)
+        self._events: deque = deque()
+        self._lock = threading.Lock()
+
+        # 成功调用耗时的指数移动平均（秒）
+        self.latency_ewma: Optional[float] = None
+        self.rejected = 0
+
+    def allow_request(self) -> bool:
+        """当前是否允许调用上游"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self.rejected += 1
+                    return False
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+                logger.info(f"熔断器 {self.name} 进入半开状态，放行探测请求")
+            # half_open: 同一时间只放行一个探测请求
+            if self._probe_in_flight:
+                self.rejected += 1
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def record_success(self, latency: float) -> None:
+        """记录一次成功调用"""
+        with self._lock:
+            self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+            if self.state != CLOSED:
+                logger.info(f"熔断器 {self.name} 探测成功，恢复正常")
+                self.state = CLOSED
+                self._events.clear()
+                self._probe_in_flight = False
+            self._append(True)
+
+    def record_failure(self) -> None:
+        """记录一次失败调用"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trip("探测请求失败")
+                return
+            self._append(False)
+            total = len(self._events)
+            if total >= self.min_calls and self._error_rate() >= self.error_threshold:
+                self._trip(f"错误率 {self._error_rate():.0%}（{total} 次调用）")
+
+    def error_rate(self) -> float:
+        """滚动窗口内的错误率"""
+        with self._lock:
+            self._expire()
+            return self._error_rate()
+
+    def health_score(self) -> float:
+        """
+        健康评分，数值越小越健康，用于数据源排序
+        熔断中的数据源排在最后；其余按错误率和成功耗时综合排序
+        """
+        if self.state == OPEN and time.monotonic() - self._opened_at < self.open_seconds:
+            return float("inf")
+        latency = self.latency_ewma if self.latency_ewma is not None else 1.0
+        # 错误率每增加10%相当于多1秒耗时
+        return self.error_rate() * 10 + latency
+
+    def snapshot(self) -> Dict[str, Any]:
+        """熔断器状态"""
+        with self._lock:
+            self._expire()
+            return {
+                "state": self.state,
+                "calls": len(self._events),
+                "error_rate": round(self._error_rate(), 4),
+                "latency_ewma_seconds": round(self.latency_ewma, 4) if self.latency_ewma is not None else None,
+                "rejected": self.rejected,
+            }
+
+    def _append(self, ok: bool) -> None:
+        self._events.append((time.monotonic(), ok))
+        self._expire()
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.window_seconds
+        while self._events and self._events[0][0] < cutoff:
+            self._events.popleft()
+
+    def _error_rate(self) -> float:
+        if not self._events:
+            return 0.0
+        failures = sum(1 for _, ok in self._events if not ok)
+        return failures / len(self._events)
+
+    def _trip(self, reason: str) -> None:
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+        logger.warning(f"熔断器 {self.name} 已熔断（{reason}），{self.open_seconds:.0f}s 内跳过该数据源")
+
+
+class CircuitBreakerRegistry:
+    """按数据源名称管理熔断器"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(name, CircuitBreaker(name))
+        return breaker
+
+    def order(self, sources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        按健康评分对数据源排序（稳定排序，评分相同时保持原有优先级）
+        :param sources: 数据源列表，需包含 name 字段
+        :return: 排序后的数据源列表
+        """
+        if len(sources) < 2:
+            return sources
+        return sorted(sources, key=lambda source: self.get(source["name"]).health_score())
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: breaker.snapshot() for name, breaker in sorted(self._breakers.items())}
+
+
+# 全局熔断器注册表
+circuit_breakers = CircuitBreakerRegistry()
+
+
+def circuit_breaker(name: str):
+    """
+    为数据源调用添加熔断保护的装饰器
+    被装饰的函数返回None或抛出异常都视为失败；熔断期间直接返回None，不访问上游
+    :param name: 数据源名称（akshare接口名）
+    """
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            breaker = circuit_breakers.get(name)
+            if not breaker.allow_request():
+                logger.info(f"数据源 {name} 熔断中，跳过调用")
+                return None
+
+            started = time.monotonic()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                breaker.record_failure()
+                raise
+            if result is None:
+                breaker.record_failure()
+            else:
+                breaker.record_success(time.monotonic() - started)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,86 @@
+import json
+from typing import Any, Dict, List, Union
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+from .bar_series import BarSeries, format_dates
+
+try:
+    import orjson
+except ImportError:  # 未安装orjson时回退到标准库json
+    orjson = None
+
+# K线数值列
+BAR_VALUE_COLUMNS = ("open", "close", "high", "low", "volume")
+
+# 价格列（差分编码时按最小价格变动单位转为整数）
+BAR_PRICE_COLUMNS = ("open", "close", "high", "low")
+
+# A股价格精度：0.01元，编码时乘以该系数后取整
+PRICE_SCALE = 100
+
+# akshare返回的时间为北京时间，转换为UTC时间戳时减去的秒数
+CHINA_UTC_OFFSET_SECONDS = 8 * 3600
+
+
+def bars_to_columns(bars: Union[BarSeries, List[Dict[str, Any]]], delta: bool = False) -> Dict[str, Any]:
+    """
+    将K线转换为列式结构，省去每条记录重复的字段名；分时K线序列直接使用其中的数组，不逐条转换
+    :param bars: 分时K线序列，或标准化后的K线列表 (date, open, close, high, low, volume)
+    :param delta: 是否差分编码：时间转为UTC秒级时间戳、价格乘以 PRICE_SCALE 取整，
+                  两者都只保留首个值和之后的逐项差值，客户端累加还原
+    :return: {"columns": {字段: 数组}, "encoding": 编码说明}
+    """
+    if not bars:
+        columns: Dict[str, Any] = {"date": [], **{column: [] for column in BAR_VALUE_COLUMNS}}
+        return {"columns": columns, "encoding": None}
+
+    if isinstance(bars, BarSeries):
+        dates = bars.dates
+        columns = {"date": format_dates(dates) if not delta else None}
+        columns.update((column, bars[column]) for column in BAR_VALUE_COLUMNS)
+    else:
+        columns = {"date": [bar["date"] for bar in bars]}
+        for column in BAR_VALUE_COLUMNS:
+            columns[column] = np.fromiter((bar[column] for bar in bars), dtype="float64", count=len(bars))
+        dates = pd.to_datetime(columns["date"]).to_numpy().astype("M8[s]") if delta else None
+
+    if not delta:
+        return {"columns": columns, "encoding": None}
+
+    timestamps = dates.astype("int64") - CHINA_UTC_OFFSET_SECONDS
+    columns["date"] = _delta(timestamps)
+    for column in BAR_PRICE_COLUMNS:
+        columns[column] = _delta(np.rint(columns[column] * PRICE_SCALE).astype("int64"))
+    return {
+        "columns": columns,
+        "encoding": {"date": "delta_unix_seconds", "price": "delta", "price_scale": PRICE_SCALE},
+    }
+
+
+def _delta(values: np.ndarray) -> np.ndarray:
+    """差分编码：首个值保持不变，其余为与前一个值的差"""
+    encoded = values.copy()
+    encoded[1:] = np.diff(values)
+    return encoded
+
+
+class ColumnarJSONResponse(JSONResponse):
+    """
+    使用orjson序列化的JSON响应，可直接序列化numpy数组（不需要先转为Python列表）
+    未安装orjson时回退到标准库json
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_to_builtin).encode("utf-8")
+
+
+def _to_builtin(value: Any) -> Any:
+    """标准库json无法序列化的numpy类型"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"无法序列化的类型: {type(value)}")
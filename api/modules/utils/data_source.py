@@ -0,0 +1,165 @@
+import hashlib
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import pandas as pd
+from .logger import get_logger
+from .metrics import record_akshare_result
+
+logger = get_logger(__name__)
+
+# 数据源后端：akshare（默认，访问上游）、record（访问上游并把结果录制到夹具目录）、replay（只从夹具目录回放）
+DATA_SOURCE = os.getenv("DATA_SOURCE", "akshare").lower()
+
+# 录制和回放使用的夹具目录
+DATA_SOURCE_FIXTURES = os.getenv("DATA_SOURCE_FIXTURES", os.path.join("data", "fixtures"))
+
+# 回放时模拟的上游耗时（毫秒），格式 "最小值,最大值"，默认不等待
+DATA_SOURCE_REPLAY_LATENCY_MS = os.getenv("DATA_SOURCE_REPLAY_LATENCY_MS", "")
+
+# 匹配夹具时忽略的参数：随请求时间变化的时间窗口（回放时使用录制时的窗口）
+VOLATILE_ARGUMENTS = ("start_date", "end_date")
+
+
+def fixture_keys(function: str, kwargs: Dict[str, Any]) -> List[str]:
+    """
+    夹具文件名，按匹配优先级排列：
+    完整参数（不含时间窗口） -> 只匹配 symbol -> 只匹配函数名
+    :param function: akshare函数名
+    :param kwargs: 调用参数（数据源只使用关键字参数）
+    :return: 不含扩展名的文件名列表
+    """
+    stable = {name: value for name, value in kwargs.items() if name not in VOLATILE_ARGUMENTS}
+    keys = []
+    if stable:
+        digest = hashlib.blake2b(repr(sorted(stable.items())).encode("utf-8"), digest_size=8).hexdigest()
+        keys.append(f"{function}__{digest}")
+    if "symbol" in stable:
+        keys.append(f"{function}__symbol_{stable['symbol']}")
+    keys.append(function)
+    return keys
+
+
+class AkshareSource:
+    """直接调用akshare（每次调用时再取函数，便于替换或打补丁）"""
+
+    def call(self, function: str, **kwargs: Any) -> Any:
+        import akshare as ak
+        return getattr(ak, function)(**kwargs)
+
+
+class RecordingSource:
+    """调用上游数据源，并把每次返回的DataFrame保存到夹具目录，供 ReplaySource 回放"""
+
+    def __init__(self, inner: Any, root: str):
+        """
+        :param inner: 实际数据源
+        :param root: 夹具目录
+        """
+        self.inner = inner
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def call(self, function: str, **kwargs: Any) -> Any:
+        result = self.inner.call(function, **kwargs)
+        if isinstance(result, pd.DataFrame) and not result.empty:
+            with self._lock:
+                for key in fixture_keys(function, kwargs):
+                    result.to_pickle(os.path.join(self.root, f"{key}.pkl"))
+            logger.debug(f"已录制 {function}({kwargs})，条数: {len(result)}")
+        return result
+
+
+class ReplaySource:
+    """
+    从夹具目录回放录制的DataFrame，不访问网络
+    夹具按 fixture_keys 的优先级匹配，同一文件只读取一次；没有匹配的夹具时抛出异常，
+    与上游调用失败的处理方式一致
+    """
+
+    def __init__(self, root: str, latency_ms: Optional[tuple] = None):
+        """
+        :param root: 夹具目录
+        :param latency_ms: 模拟上游耗时范围（毫秒）(最小值, 最大值)
+        """
+        self.root = root
+        self.latency_ms = latency_ms
+        self._frames: Dict[str, Optional[pd.DataFrame]] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.misses = 0
+
+    def _load(self, key: str) -> Optional[pd.DataFrame]:
+        with self._lock:
+            if key not in self._frames:
+                path = os.path.join(self.root, f"{key}.pkl")
+                self._frames[key] = pd.read_pickle(path) if os.path.exists(path) else None
+            return self._frames[key]
+
+    def call(self, function: str, **kwargs: Any) -> Any:
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(random.uniform(*self.latency_ms) / 1000)
+        for key in fixture_keys(function, kwargs):
+            frame = self._load(key)
+            if frame is not None:
+                # 返回副本，调用方可以安全修改
+                return frame.copy()
+        self.misses += 1
+        raise LookupError(f"没有 {function}({kwargs}) 的回放数据，夹具目录: {self.root}")
+
+
+def _parse_latency(value: str) -> Optional[tuple]:
+    if not value:
+        return None
+    parts = [float(part) for part in value.split(",")]
+    return (parts[0], parts[-1])
+
+
+def create_data_source(kind: str = DATA_SOURCE, root: str = DATA_SOURCE_FIXTURES) -> Any:
+    """
+    按配置创建数据源后端
+    :param kind: akshare, record 或 replay
+    :param root: 夹具目录
+    :return: 提供 call(function, **kwargs) 的数据源
+    """
+    if kind == "replay":
+        logger.info(f"使用回放数据源，夹具目录: {root}")
+        return ReplaySource(root, _parse_latency(DATA_SOURCE_REPLAY_LATENCY_MS))
+    if kind == "record":
+        logger.info(f"使用录制数据源，夹具目录: {root}")
+        return RecordingSource(AkshareSource(), root)
+    return AkshareSource()
+
+
+# 全局数据源（StockDataProvider 的全部上游调用都经过这里）
+data_source = create_data_source()
+
+
+def use_data_source(source: Any) -> None:
+    """
+    替换全局数据源（基准测试等场景在导入服务后切换到回放数据）
+    :param source: 提供 call(function, **kwargs) 的数据源
+    """
+    global data_source
+    data_source = source
+
+
+def call_source(function: str, **kwargs: Any) -> Any:
+    """
+    通过当前数据源调用akshare函数，按akshare函数名记录调用次数、耗时、失败次数和返回数据量指标
+    :param function: akshare函数名
+    :param kwargs: 参数
+    :return: 返回数据
+    """
+    started = time.perf_counter()
+    try:
+        result = data_source.call(function, **kwargs)
+    except Exception:
+        record_akshare_result(function, time.perf_counter() - started, error=True)
+        raise
+    record_akshare_result(function, time.perf_counter() - started, result)
+    return result
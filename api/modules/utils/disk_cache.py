@@ -0,0 +1,191 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class DiskEntry(NamedTuple):
+    """磁盘缓存条目"""
+    trade_day: str
+    payload: bytes
+    # 写入时的Unix时间戳
+    fetched_at: float
+    # 所属交易日是否已定稿（定稿后不再覆盖）
+    complete: bool
+
+
+class DiskCache:
+    """
+    进程内缓存之下的磁盘缓存层（SQLite）
+
+    按 (数据源, 代码, 周期, 交易日) 保存原始数据，无服务器部署冷启动时从本地磁盘恢复，
+    不必重新下载全市场行情和分时K线。已定稿交易日的数据写入后不再被覆盖。
+
+    存储目录可通过环境变量 DISK_CACHE_DIR 配置，默认为系统临时目录下的 stocks-cache；
+    设置 DISK_CACHE_ENABLED=0 时关闭，所有读写直接返回。
+    """
+
+    def __init__(self, root: Optional[str] = None, retention_days: Optional[int] = None):
+        """
+        :param root: 存储目录
+        :param retention_days: 保留最近多少天的数据，更早的在启动时清理
+        """
+        self.enabled = os.getenv("DISK_CACHE_ENABLED", "1") != "0"
+        self.root = root or os.getenv("DISK_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "stocks-cache")
+        self.path = os.path.join(self.root, "cache.sqlite3")
+        self.retention_days = (
+            retention_days if retention_days is not None
+            else int(os.getenv("DISK_CACHE_RETENTION_DAYS", "30"))
+        )
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """获取当前线程的数据库连接（首次使用时建表并清理过期数据）；无法打开数据库时关闭磁盘缓存"""
+        if not self.enabled:
+            return None
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+
+        try:
+            conn = self._open()
+        except (sqlite3.Error, OSError) as e:
+            # 只读文件系统或目录无权限时每次访问都会失败，直接关闭磁盘缓存，只使用内存缓存
+            self.enabled = False
+            self.errors += 1
+            logger.warning(f"磁盘缓存目录不可用，已关闭磁盘缓存: {self.root}, {e}")
+            return None
+        self._local.conn = conn
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        """创建目录并打开数据库"""
+        os.makedirs(self.root, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            # WAL模式下读写互不阻塞，多个工作进程可以共享同一个文件
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._init_lock:
+                if not self._initialized:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS entries ("
+                        " source TEXT NOT NULL, symbol TEXT NOT NULL, interval TEXT NOT NULL, trade_day TEXT NOT NULL,"
+                        " payload BLOB NOT NULL, fetched_at REAL NOT NULL, complete INTEGER NOT NULL,"
+                        " PRIMARY KEY (source, symbol, interval, trade_day))"
+                    )
+                    cutoff = (date.today() - timedelta(days=self.retention_days)).isoformat()
+                    conn.execute("DELETE FROM entries WHERE trade_day < ?", (cutoff,))
+                    self._initialized = True
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    def _record_error(self, action: str, error: Exception) -> None:
+        self.errors += 1
+        logger.warning(f"磁盘缓存{action}失败: {error}")
+
+    def get(self, source: str, symbol: str, interval: str, trade_day: str) -> Optional[DiskEntry]:
+        """
+        读取单个交易日的数据
+        :param source: 数据源
+        :param symbol: 代码（全市场数据使用 "*"）
+        :param interval: 周期
+        :param trade_day: 交易日 YYYY-MM-DD
+        :return: 缓存条目，不存在时返回None
+        """
+        entries = self._select(
+            "SELECT trade_day, payload, fetched_at, complete FROM entries"
+            " WHERE source = ? AND symbol = ? AND interval = ? AND trade_day = ?",
+            (source, symbol, interval, trade_day),
+        )
+        return entries[0] if entries else None
+
+    def get_since(self, source: str, symbol: str, interval: str, since_day: str) -> List[DiskEntry]:
+        """
+        读取某交易日及之后的全部数据
+        :param source: 数据源
+        :param symbol: 代码
+        :param interval: 周期
+        :param since_day: 起始交易日 YYYY-MM-DD（含）
+        :return: 按交易日升序的缓存条目
+        """
+        return self._select(
+            "SELECT trade_day, payload, fetched_at, complete FROM entries"
+            " WHERE source = ? AND symbol = ? AND interval = ? AND trade_day >= ? ORDER BY trade_day",
+            (source, symbol, interval, since_day),
+        )
+
+    def _select(self, sql: str, params: tuple) -> List[DiskEntry]:
+        try:
+            conn = self._connect()
+            if conn is None:
+                return []
+            rows = conn.execute(sql, params).fetchall()
+        except (sqlite3.Error, OSError) as e:
+            self._record_error("读取", e)
+            return []
+        if rows:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return [DiskEntry(row[0], row[1], row[2], bool(row[3])) for row in rows]
+
+    def put(
+        self, source: str, symbol: str, interval: str, trade_day: str, payload: bytes, complete: bool
+    ) -> None:
+        """
+        写入单个交易日的数据；该交易日已定稿的数据不会被覆盖
+        :param source: 数据源
+        :param symbol: 代码
+        :param interval: 周期
+        :param trade_day: 交易日 YYYY-MM-DD
+        :param payload: 序列化后的数据
+        :param complete: 该交易日是否已定稿
+        """
+        try:
+            conn = self._connect()
+            if conn is None:
+                return
+            conn.execute(
+                "INSERT INTO entries (source, symbol, interval, trade_day, payload, fetched_at, complete)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (source, symbol, interval, trade_day) DO UPDATE SET"
+                " payload = excluded.payload, fetched_at = excluded.fetched_at, complete = excluded.complete"
+                " WHERE entries.complete = 0",
+                (source, symbol, interval, trade_day, payload, time.time(), int(complete)),
+            )
+            self.writes += 1
+        except (sqlite3.Error, OSError) as e:
+            self._record_error("写入", e)
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "errors": self.errors,
+        }
+
+
+# 创建全局磁盘缓存实例
+disk_cache = DiskCache()
@@ -0,0 +1,59 @@
+from typing import Any, Dict, Iterable, List, Optional
+import pandas as pd
+
+
+def convert_frame(
+    df: pd.DataFrame,
+    columns: Dict[str, str],
+    text_columns: Iterable[str] = (),
+    required: Optional[Iterable[str]] = None,
+    fill_value: float = 0.0,
+    text_defaults: Optional[Dict[str, Any]] = None,
+) -> Optional[pd.DataFrame]:
+    """
+    按列映射批量转换akshare返回的DataFrame（重命名、数值转换、缺失值填充）
+    :param df: 原始数据
+    :param columns: 目标列名 -> 源列名，输出列按此顺序排列
+    :param text_columns: 保留原值、不做数值转换的目标列
+    :param required: 必须存在的源列，缺失任一列时返回None；默认为全部源列
+    :param fill_value: 数值列缺失（列不存在或值为NaN）时的填充值
+    :param text_defaults: 文本列缺失时的填充值 {目标列: 值}
+    :return: 转换后的DataFrame，源列缺失时返回None
+    """
+    required = list(columns.values()) if required is None else list(required)
+    if any(col not in df.columns for col in required):
+        return None
+
+    text_columns = set(text_columns)
+    text_defaults = text_defaults or {}
+
+    numeric = {}
+    text = {}
+    for target, source in columns.items():
+        if target in text_columns:
+            default = text_defaults.get(target)
+            if source in df.columns:
+                series = df[source]
+                text[target] = series.fillna(default) if default is not None else series
+            else:
+                text[target] = default
+        elif source in df.columns:
+            numeric[target] = pd.to_numeric(df[source], errors="coerce")
+        else:
+            numeric[target] = fill_value
+
+    # 数值列统一转为float并一次性填充缺失值
+    result = pd.DataFrame(numeric, index=df.index).astype("float64").fillna(fill_value)
+    for target, values in text.items():
+        result[target] = values
+    return result[list(columns.keys())]
+
+
+def frame_to_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """将转换后的DataFrame输出为逐条记录（Yahoo Finance兼容格式）"""
+    return frame.to_dict("records")
+
+
+def frame_to_columns(frame: pd.DataFrame) -> Dict[str, List[Any]]:
+    """将转换后的DataFrame输出为列式结构 {列名: 值列表}"""
+    return {column: frame[column].tolist() for column in frame.columns}
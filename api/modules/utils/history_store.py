@@ -0,0 +1,200 @@
+import os
+import tempfile
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional
+import numpy as np
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# 日线记录格式（定长，按日期升序追加写入）
+HISTORY_DTYPE = np.dtype([
+    ("date", "<M8[D]"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+
+class HistoryStore:
+    """
+    本地日线历史数据存储
+
+    每个代码一个只追加的二进制文件，内容为 HISTORY_DTYPE 定长记录，按日期升序排列。
+    读取时使用内存映射，按日期二分查找出区间后只复制需要的部分，
+    长周期图表（如10年日线）直接从本地磁盘读取，不需要重新下载。
+
+    存储目录可通过环境变量 HISTORY_STORE_DIR 配置，默认为系统临时目录下的 stocks-history，
+    首次写入时才创建（导入模块时不访问磁盘）。
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        """
+        :param root: 存储目录
+        """
+        self.root = root or os.getenv("HISTORY_STORE_DIR") or os.path.join(tempfile.gettempdir(), "stocks-history")
+        self._root_created = False
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        # 每个代码最近一次与上游同步的时间（monotonic）
+        self._synced_at: Dict[str, float] = {}
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.root, f"{symbol}.bin")
+
+    def lock(self, symbol: str) -> threading.Lock:
+        """获取代码对应的写锁（同一代码同一时刻只有一个线程同步）"""
+        lock = self._locks.get(symbol)
+        if lock is None:
+            with self._locks_guard:
+                lock = self._locks.setdefault(symbol, threading.Lock())
+        return lock
+
+    def count(self, symbol: str) -> int:
+        """已存储的记录数"""
+        try:
+            return os.path.getsize(self._path(symbol)) // HISTORY_DTYPE.itemsize
+        except OSError:
+            return 0
+
+    def read(self, symbol: str, start: Optional[date] = None, end: Optional[date] = None) -> np.ndarray:
+        """
+        读取日期区间内的日线记录
+        :param symbol: 标准化后的代码
+        :param start: 开始日期（含），默认不限
+        :param end: 结束日期（含），默认不限
+        :return: HISTORY_DTYPE 结构化数组（独立副本）
+        """
+        n = self.count(symbol)
+        if n == 0:
+            return np.empty(0, dtype=HISTORY_DTYPE)
+
+        # 只映射完整记录，写入中的半条记录不会被读到
+        records = np.memmap(self._path(symbol), dtype=HISTORY_DTYPE, mode="r", shape=(n,))
+        lo = 0 if start is None else int(np.searchsorted(records["date"], np.datetime64(start, "D"), side="left"))
+        hi = n if end is None else int(np.searchsorted(records["date"], np.datetime64(end, "D"), side="right"))
+        result = np.array(records[lo:hi])
+        del records
+        return result
+
+    def last_date(self, symbol: str) -> Optional[np.datetime64]:
+        """最新一条记录的日期，无数据时返回None"""
+        n = self.count(symbol)
+        return self._read_date_at(symbol, n - 1) if n else None
+
+    def _read_date_at(self, symbol: str, index: int) -> np.datetime64:
+        with open(self._path(symbol), "rb") as f:
+            f.seek(index * HISTORY_DTYPE.itemsize)
+            record = np.frombuffer(f.read(HISTORY_DTYPE.itemsize), dtype=HISTORY_DTYPE)
+        return record["date"][0]
+
+    def append(self, symbol: str, records: np.ndarray) -> int:
+        """
+        追加日线记录，只写入晚于已有最新日期的部分（调用方需持有 lock(symbol)）
+        :param symbol: 标准化后的代码
+        :param records: HISTORY_DTYPE 结构化数组，按日期升序
+        :return: 实际写入的条数
+        """
+        path = self._path(symbol)
+        # 上次写入中断留下的半条记录直接截掉，保证文件始终按记录对齐
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size % HISTORY_DTYPE.itemsize:
+            logger.warning(f"{symbol} 的历史数据文件末尾有不完整记录，已截断")
+            with open(path, "r+b") as f:
+                f.truncate(size - size % HISTORY_DTYPE.itemsize)
+
+        last = self.last_date(symbol)
+        if last is not None:
+            records = records[records["date"] > last]
+        if len(records) == 0:
+            return 0
+
+        if not self._root_created:
+            os.makedirs(self.root, exist_ok=True)
+            self._root_created = True
+        with open(path, "ab") as f:
+            f.write(np.ascontiguousarray(records, dtype=HISTORY_DTYPE).tobytes())
+        logger.info(f"{symbol} 追加日线 {len(records)} 条，最新日期: {records['date'][-1]}")
+        return len(records)
+
+    def mark_synced(self, symbol: str) -> None:
+        """记录一次与上游的同步"""
+        self._synced_at[symbol] = time.monotonic()
+
+    def synced_within(self, symbol: str, seconds: float) -> bool:
+        """最近 seconds 秒内是否已与上游同步过"""
+        synced_at = self._synced_at.get(symbol)
+        return synced_at is not None and time.monotonic() - synced_at < seconds
+
+    def stats(self) -> Dict[str, Any]:
+        """存储统计"""
+        names = os.listdir(self.root) if os.path.isdir(self.root) else []
+        files: List[str] = [name for name in names if name.endswith(".bin")]
+        total_bytes = sum(os.path.getsize(os.path.join(self.root, name)) for name in files)
+        return {
+            "root": self.root,
+            "symbols": len(files),
+            "bytes": total_bytes,
+            "records": total_bytes // HISTORY_DTYPE.itemsize,
+        }
+
+
+# 创建全局历史数据存储实例
+history_store = HistoryStore()
+
+
+def resample_history(records: np.ndarray, period: str) -> np.ndarray:
+    """
+    将日线聚合为周线或月线（向量化，按周一/月初分组，日期取该周期内第一个交易日）
+    :param records: HISTORY_DTYPE 日线，按日期升序
+    :param period: 周期 (daily, weekly, monthly)
+    :return: 聚合后的 HISTORY_DTYPE 数组
+    """
+    if period == "daily" or len(records) == 0:
+        return records
+
+    dates = records["date"]
+    if period == "weekly":
+        # 1970-01-01 为周四，(天数 + 3) % 7 即周一为0的星期序号
+        days = dates.astype("int64")
+        keys = days - (days + 3) % 7
+    elif period == "monthly":
+        keys = dates.astype("M8[M]").astype("int64")
+    else:
+        raise ValueError(f"不支持的周期: {period}")
+
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:] - 1, len(records) - 1]
+
+    result = np.empty(len(starts), dtype=HISTORY_DTYPE)
+    result["date"] = dates[starts]
+    result["open"] = records["open"][starts]
+    result["close"] = records["close"][ends]
+    result["high"] = np.maximum.reduceat(records["high"], starts)
+    result["low"] = np.minimum.reduceat(records["low"], starts)
+    result["volume"] = np.add.reduceat(records["volume"], starts)
+    return result
+
+
+def history_to_quotes(records: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    将日线记录转换为与分时数据相同格式的字典列表
+    :param records: HISTORY_DTYPE 数组
+    :return: [{date: 'YYYY-MM-DD', open, close, high, low, volume}]
+    """
+    if len(records) == 0:
+        return []
+    columns = {
+        "date": np.datetime_as_string(records["date"], unit="D").tolist(),
+        "open": records["open"].tolist(),
+        "close": records["close"].tolist(),
+        "high": records["high"].tolist(),
+        "low": records["low"].tolist(),
+        "volume": records["volume"].tolist(),
+    }
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
@@ -0,0 +1,97 @@
+import hashlib
+import os
+from typing import Any, Dict, Optional, Tuple
+from fastapi import Request, Response
+from .trading_calendar import (
+    PHASE_AUCTION,
+    PHASE_CLOSED,
+    PHASE_HOLIDAY,
+    PHASE_LUNCH,
+    PHASE_SESSION,
+    market_phase,
+    seconds_until_next_phase,
+)
+
+# 各市场阶段的缓存时间 (max-age, stale-while-revalidate)，单位秒
+PHASE_CACHE_SECONDS: Dict[str, Tuple[int, int]] = {
+    PHASE_SESSION: (5, 10),
+    PHASE_AUCTION: (5, 10),
+    PHASE_LUNCH: (60, 300),
+    PHASE_CLOSED: (300, 3600),
+    PHASE_HOLIDAY: (3600, 86400),
+}
+
+# 进程标识：数据版本号只在单个进程内递增，ETag中加入进程标识避免不同实例或重启后误判为未修改
+PROCESS_ID = os.urandom(4).hex()
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    由请求参数和缓存数据版本生成强ETag
+    :param parts: 参与计算的值（请求参数、数据版本等）
+    :return: 带引号的ETag
+    """
+    digest = hashlib.blake2b(repr((PROCESS_ID,) + parts).encode("utf-8"), digest_size=12).hexdigest()
+    return f'"{digest}"'
+
+
+def cache_control(phase: Optional[str] = None) -> str:
+    """
+    按市场阶段生成Cache-Control：交易时间内缓存很短，午休、收盘后和节假日缓存更久，
+    但不超过下一个阶段开始的时间（如开盘前的缓存不会延续到开盘之后）
+    :param phase: 市场阶段，默认取当前阶段
+    :return: Cache-Control 头的值
+    """
+    max_age, stale = PHASE_CACHE_SECONDS.get(phase or market_phase(), PHASE_CACHE_SECONDS[PHASE_SESSION])
+    max_age = max(1, min(max_age, int(seconds_until_next_phase())))
+    return f"public, max-age={max_age}, s-maxage={max_age}, stale-while-revalidate={stale}"
+
+
+def etag_matches(request: Optional[Request], etag: str) -> bool:
+    """
+    请求的 If-None-Match 是否包含该ETag
+    :param request: 请求（内部调用时为None）
+    :param etag: 当前ETag
+    """
+    if request is None:
+        return False
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(",")]
+    # If-None-Match 使用弱比较，忽略 W/ 前缀
+    return "*" in candidates or etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+
+def conditional_response(
+    request: Optional[Request], response: Optional[Response], *parts: Any
+) -> Optional[Response]:
+    """
+    为行情接口设置 ETag 和 Cache-Control，客户端缓存仍有效时返回304
+    :param request: 请求（内部调用时为None，此时不做任何处理）
+    :param response: FastAPI注入的响应对象，用于设置响应头
+    :param parts: 生成ETag的值，见 make_etag
+    :return: 304响应；需要返回完整内容时返回None
+    """
+    if request is None or response is None:
+        return None
+
+    headers = {"ETag": make_etag(*parts), "Cache-Control": cache_control()}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def apply_cache_headers(target: Response, source: Optional[Response]) -> Response:
+    """
+    将注入响应对象上已设置的缓存头复制到直接返回的响应上（直接返回Response时FastAPI不会合并注入对象的响应头）
+    :param target: 实际返回的响应
+    :param source: FastAPI注入的响应对象
+    :return: target
+    """
+    if source is not None:
+        for name in ("etag", "cache-control"):
+            if name in source.headers:
+                target.headers[name] = source.headers[name]
+    return target
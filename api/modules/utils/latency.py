@@ -0,0 +1,101 @@
+import bisect
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# 默认分桶上界（秒），覆盖akshare接口从几十毫秒到数十秒的耗时
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class LatencyHistogram:
+    """固定分桶的耗时直方图"""
+
+    __slots__ = ("buckets", "counts", "count", "total", "errors", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # 最后一个桶统计超过最大上界的样本
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        """记录一次成功调用的耗时"""
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+
+    def observe_error(self) -> None:
+        """记录一次失败调用"""
+        with self._lock:
+            self.errors += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        估算分位数（取所在分桶的上界）
+        :param q: 分位 (0~1)
+        :return: 耗时上界（秒），无样本时返回None；超过最大分桶时返回无穷大
+        """
+        if self.count == 0:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def totals(self) -> Tuple[List[int], int, float]:
+        """
+        一致的计数快照
+        :return: (各分桶样本数, 样本数, 耗时总和)
+        """
+        with self._lock:
+            return list(self.counts), self.count, self.total
+
+    def snapshot(self) -> Dict[str, Any]:
+        """直方图统计"""
+        with self._lock:
+            counts = list(self.counts)
+            count, total, errors = self.count, self.total, self.errors
+        return {
+            "count": count,
+            "errors": errors,
+            "mean_seconds": round(total / count, 4) if count else None,
+            "p50_seconds": self.quantile(0.5),
+            "p95_seconds": self.quantile(0.95),
+            "p99_seconds": self.quantile(0.99),
+            "buckets": {
+                **{f"le_{bucket}": n for bucket, n in zip(self.buckets, counts)},
+                "le_inf": counts[-1],
+            },
+        }
+
+
+class LatencyRegistry:
+    """按名称管理耗时直方图（如每个akshare接口一个）"""
+
+    def __init__(self):
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> LatencyHistogram:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, LatencyHistogram())
+        return histogram
+
+    def items(self) -> List[Tuple[str, LatencyHistogram]]:
+        """按名称排序的全部直方图"""
+        return sorted(self._histograms.items())
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: histogram.snapshot() for name, histogram in sorted(self._histograms.items())}
+
+
+# 上游数据源耗时统计，用于调整对冲请求的延迟
+source_latency = LatencyRegistry()
@@ -1,54 +1,192 @@
+import atexit
+import functools
+import json
 import logging
 import os
+import queue
+import threading
+import time
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 
-# 创建logs目录（如果不存在）
-log_dir = "logs"
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir)
+# 日志级别，LOG_LEVEL 设置全局级别，LOG_LEVELS 按logger名称单独设置（如 "akshare=DEBUG,api.modules.stock_chart=WARNING"）
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = {
+    name.strip(): level.strip().upper()
+    for name, _, level in (item.partition("=") for item in os.getenv("LOG_LEVELS", "").split(","))
+    if name.strip() and level.strip()
+}
+
+# 日志格式：text（默认）或 json（每行一个JSON对象，便于日志系统采集）
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+
+# 每个调试日志调用位置每秒最多输出的条数，超出的丢弃并在下一条中注明；0表示不限制
+LOG_DEBUG_PER_SECOND = int(os.getenv("LOG_DEBUG_PER_SECOND", "5"))
+
+# 日志文件目录，设置 LOG_TO_FILE=0 时只输出到控制台（如只读文件系统的无服务器环境）
+log_dir = os.getenv("LOG_DIR", "logs")
+LOG_TO_FILE = os.getenv("LOG_TO_FILE", "1") != "0"
 
 # 生成日志文件名（按日期）
 current_date = datetime.now().strftime("%Y-%m-%d")
 log_file = os.path.join(log_dir, f"akshare_{current_date}.log")
 
-# 创建日志格式器
-formatter = logging.Formatter(
-    '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 
-# 创建文件处理器
-file_handler = logging.FileHandler(log_file, encoding='utf-8')
-file_handler.setFormatter(formatter)
+class DeferredFileHandler(logging.FileHandler):
+    """
+    首次写日志时才创建目录和打开文件的文件处理器（在后台日志线程中执行，不在导入时访问磁盘）
+    目录无法创建或文件无法打开时只提示一次，之后丢弃文件日志，控制台日志不受影响
+    """
+
+    def __init__(self, filename: str):
+        super().__init__(filename, encoding='utf-8', delay=True)
+        self._failed = False
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if self._failed:
+            return
+        if self.stream is None:
+            try:
+                os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+                self.stream = self._open()
+            except OSError as e:
+                self._failed = True
+                console_handler.stream.write(f"无法写入日志文件 {self.baseFilename}: {e}，只输出到控制台\n")
+                return
+        super().emit(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """结构化日志：每条记录输出为一行JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DebugRateLimitFilter(logging.Filter):
+    """
+    调试日志限流
+
+    按调用位置（文件和行号）统计，每秒超过 per_second 条的DEBUG日志直接丢弃，
+    不进入日志队列；被丢弃的条数附加在该位置下一条输出的日志后面。
+    """
+
+    def __init__(self, per_second: int):
+        super().__init__()
+        self.per_second = per_second
+        # {(文件, 行号): [窗口开始时间, 窗口内条数, 已丢弃条数]}
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.per_second <= 0:
+            return True
+        now = time.monotonic()
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= 1.0:
+                dropped = site[2] if site is not None else 0
+                self._sites[key] = [now, 1, 0]
+            elif site[1] < self.per_second:
+                site[1] += 1
+                dropped = 0
+            else:
+                site[2] += 1
+                return False
+        if dropped:
+            record.msg = f"{record.getMessage()} (同一位置已省略 {dropped} 条调试日志)"
+            record.args = None
+        return True
+
+
+# 创建日志格式器
+if LOG_FORMAT == "json":
+    formatter = JsonFormatter()
+else:
+    formatter = logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
 
 # 创建控制台处理器
 console_handler = logging.StreamHandler()
 console_handler.setFormatter(formatter)
 
+# 创建文件处理器（首次写日志时才打开文件）
+file_handler = DeferredFileHandler(log_file)
+file_handler.setFormatter(formatter)
+handlers = (file_handler, console_handler) if LOG_TO_FILE else (console_handler,)
+
+# 业务线程只把日志记录放入队列，格式化和文件/控制台写入由后台线程完成
+log_queue = queue.SimpleQueue()
+queue_handler = QueueHandler(log_queue)
+queue_handler.addFilter(DebugRateLimitFilter(LOG_DEBUG_PER_SECOND))
+queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+queue_listener.start()
+
+
+def stop_logging() -> None:
+    """停止后台日志线程，写出队列中剩余的日志"""
+    global queue_listener
+    if queue_listener is not None:
+        queue_listener.stop()
+        queue_listener = None
+
+
+atexit.register(stop_logging)
+
+
+def get_log_level(name: str) -> int:
+    """
+    获取logger的日志级别：LOG_LEVELS 中最长匹配的名称前缀，否则为 LOG_LEVEL
+    :param name: logger名称
+    :return: 日志级别
+    """
+    matched = max(
+        (prefix for prefix in LOG_LEVELS if name == prefix or name.startswith(prefix + ".")),
+        key=len,
+        default=None,
+    )
+    level = logging.getLevelName(LOG_LEVELS[matched] if matched is not None else LOG_LEVEL)
+    # 无法识别的级别名称回退到INFO
+    return level if isinstance(level, int) else logging.INFO
+
+
 # 创建logger
 def get_logger(name):
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
-    
+    logger.setLevel(get_log_level(name))
+
     # 避免重复添加处理器
     if not logger.handlers:
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
-    
+        logger.addHandler(queue_handler)
+
     return logger
 
-# 创建一个用于记录akshare调用的装饰器
+# 创建一个用于记录akshare调用的装饰器（指标按akshare函数名在 data_source.call_source 中记录）
 def log_akshare_call(func):
+    logger = get_logger("akshare")
+
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        logger = get_logger("akshare")
         logger.info(f"调用akshare函数: {func.__name__}")
-        logger.debug(f"参数: args={args}, kwargs={kwargs}")
         try:
             result = func(*args, **kwargs)
-            logger.debug(f"返回结果类型: {type(result)}")
-            if hasattr(result, 'shape'):
-                logger.debug(f"数据形状: {result.shape}")
-            return result
         except Exception as e:
             logger.error(f"调用出错: {str(e)}", exc_info=True)
             raise
-    return wrapper 
\ No newline at end of file
+        # 只在开启调试日志时计算结果描述，不记录完整参数
+        if logger.isEnabledFor(logging.DEBUG):
+            shape = getattr(result, 'shape', None)
+            logger.debug(f"{func.__name__} 返回 {type(result).__name__}" + (f", 数据形状: {shape}" if shape is not None else ""))
+        return result
+    return wrapper
@@ -0,0 +1,360 @@
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Callable, Dict, Optional, Tuple
+import pandas as pd
+from .cache_backend import cache_get, cache_set, refresh_lock
+from .disk_cache import disk_cache
+from .logger import get_logger
+from .stock_data_provider import stock_data_provider
+from .trading_calendar import current_session, is_session_complete, is_trading_time
+
+logger = get_logger(__name__)
+
+# 后台刷新的提交函数 (数据源, 函数, *参数)，由异步数据提供者注册，见 use_refresh_submitter
+_refresh_submitter: Optional[Callable[..., None]] = None
+_fallback_executor: Optional[ThreadPoolExecutor] = None
+
+
+def use_refresh_submitter(submitter: Callable[..., None]) -> None:
+    """
+    注册后台刷新的提交函数，使过期快照的后台刷新与其他上游调用一样受线程池大小和数据源并发数限制
+    :param submitter: 提交函数 (数据源, 函数, *参数)，不等待结果
+    """
+    global _refresh_submitter
+    _refresh_submitter = submitter
+
+
+def _submit_refresh(source: str, func: Callable[..., None], *args: Any) -> None:
+    """提交后台刷新；尚未注册提交函数时使用单线程的备用线程池"""
+    global _fallback_executor
+    if _refresh_submitter is not None:
+        _refresh_submitter(source, func, *args)
+        return
+    if _fallback_executor is None:
+        _fallback_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot-refresh")
+    _fallback_executor.submit(func, *args)
+
+
+class MarketSnapshotCache:
+    """
+    全市场行情快照缓存（进程级）
+
+    - 交易时间与非交易时间分别使用不同的TTL
+    - 同一时刻只有一个刷新请求访问上游（single-flight），其余请求等待该次结果
+    - 已有数据过期时，后台刷新期间直接返回旧数据（stale-while-revalidate）
+    - 每次刷新后写入磁盘缓存，冷启动时先从磁盘恢复；所属交易日已定稿的快照在下一个交易日开始前不再刷新
+    - 每次刷新后发布到共享缓存后端，多个工作进程之间通过刷新锁保证只有一个进程访问上游，其余进程读取共享结果
+
+    注意：返回的DataFrame为所有请求共享，调用方不得原地修改。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fetcher: Callable[[], Optional[pd.DataFrame]],
+        source: str = "eastmoney",
+        ttl: Optional[float] = None,
+        off_hours_ttl: Optional[float] = None,
+        wait_timeout: Optional[float] = None,
+    ):
+        """
+        :param name: 缓存名称（用于日志和统计）
+        :param fetcher: 获取完整快照的函数，返回None或空表视为失败
+        :param source: 上游数据源名称，用于并发限制和超时
+        :param ttl: 交易时间内的有效期（秒）
+        :param off_hours_ttl: 非交易时间的有效期（秒）
+        :param wait_timeout: 无缓存时等待进行中刷新的最长时间（秒）
+        """
+        self.name = name
+        self._fetcher = fetcher
+        self.source = source
+        self.ttl = ttl if ttl is not None else float(os.getenv("SNAPSHOT_TTL_SECONDS", "10"))
+        self.off_hours_ttl = (
+            off_hours_ttl if off_hours_ttl is not None
+            else float(os.getenv("SNAPSHOT_OFF_HOURS_TTL_SECONDS", "600"))
+        )
+        self.wait_timeout = (
+            wait_timeout if wait_timeout is not None
+            else float(os.getenv("SNAPSHOT_WAIT_TIMEOUT_SECONDS", "30"))
+        )
+
+        self._lock = threading.Lock()
+        self._refreshing: Optional[threading.Event] = None
+        self._data: Optional[pd.DataFrame] = None
+        self._fetched_at = 0.0
+        # 当前快照所属的交易日，以及获取时该交易日是否已定稿
+        self._session: Optional[date] = None
+        self._complete = False
+        self._last_error: Optional[str] = None
+        # 由快照计算出的派生数据 {名称: (计算时的版本, 值)}
+        self._derived: Dict[str, Tuple[int, Any]] = {}
+
+        # 统计计数
+        self.version = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+        self.disk_loads = 0
+        self.shared_loads = 0
+
+    @property
+    def shared_key(self) -> str:
+        """共享缓存后端中的键（同时用作刷新锁的名称）"""
+        return f"snapshot:{self.name}"
+
+    def current_ttl(self) -> float:
+        """根据是否为交易时间返回当前生效的TTL"""
+        return self.ttl if is_trading_time() else self.off_hours_ttl
+
+    def age(self) -> Optional[float]:
+        """当前快照的存活时间（秒），无数据时返回None"""
+        if self._data is None:
+            return None
+        return time.monotonic() - self._fetched_at
+
+    def is_fresh(self) -> bool:
+        """当前快照是否仍然有效（调用方需持有锁）"""
+        if time.monotonic() - self._fetched_at < self.current_ttl():
+            return True
+        # 已定稿交易日的快照不会再变化，直到下一个交易日开始
+        return self._complete and self._session == current_session()
+
+    @property
+    def loaded(self) -> bool:
+        """是否已有快照（无论是否过期）"""
+        return self._data is not None
+
+    def get_nowait(self) -> Optional[pd.DataFrame]:
+        """
+        不等待地获取行情快照：已有数据时直接返回（已过期时在后台触发刷新），无数据时返回None
+        不访问上游、共享缓存和磁盘，可在事件循环中调用
+        :return: 全市场行情DataFrame（只读）
+        """
+        with self._lock:
+            return self._get_cached()
+
+    def _get_cached(self) -> Optional[pd.DataFrame]:
+        """返回已有的快照，已过期时在后台触发一次刷新（调用方需持有锁）"""
+        data = self._data
+        if data is None:
+            return None
+        if self.is_fresh():
+            self.hits += 1
+            return data
+
+        # 已过期：返回旧数据，并在后台触发一次刷新
+        self.stale_hits += 1
+        if self._refreshing is None:
+            event = self._refreshing = threading.Event()
+            try:
+                _submit_refresh(self.source, self._refresh, event)
+            except Exception as e:
+                self._refreshing = None
+                event.set()
+                logger.error(f"{self.name} 提交后台刷新失败: {e}")
+        return data
+
+    def get(self) -> pd.DataFrame:
+        """
+        获取行情快照
+        :return: 全市场行情DataFrame（只读）
+        """
+        with self._lock:
+            data = self._get_cached()
+            if data is not None:
+                return data
+
+            # 无数据：由第一个请求负责刷新，其余请求等待
+            self.misses += 1
+            event = self._refreshing
+            is_leader = event is None
+            if is_leader:
+                event = self._refreshing = threading.Event()
+
+        if is_leader:
+            if self._load_shared(require_fresh=False) or self._load_from_disk():
+                # 从共享缓存或磁盘恢复后按有效期处理：仍有效时直接返回，已过期时返回旧数据并在后台刷新
+                with self._lock:
+                    self._refreshing = None
+                event.set()
+                return self.get()
+            self._refresh(event)
+        elif not event.wait(self.wait_timeout):
+            raise TimeoutError(f"等待{self.name}行情快照刷新超时")
+
+        data = self._data
+        if data is None:
+            raise Exception(f"获取{self.name}行情快照失败: {self._last_error}")
+        return data
+
+    def get_derived(self, name: str, compute: Callable[[pd.DataFrame], Any]) -> Any:
+        """
+        获取由当前快照计算出的派生数据，每个快照版本只计算一次
+        :param name: 派生数据名称
+        :param compute: 计算函数，参数为当前快照（只读）
+        :return: 派生数据
+        """
+        self.get()
+        with self._lock:
+            data, version = self._data, self.version
+        cached = self._derived.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        value = compute(data)
+        self._derived[name] = (version, value)
+        return value
+
+    def get_derived_nowait(self, name: str) -> Any:
+        """
+        不等待地获取当前快照版本已计算好的派生数据（可在事件循环中调用）
+        :param name: 派生数据名称
+        :return: 派生数据；无快照或当前版本尚未计算时返回None
+        """
+        if self.get_nowait() is None:
+            return None
+        cached = self._derived.get(name)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        return None
+
+    def invalidate(self) -> None:
+        """使当前快照立即过期，下次访问时触发刷新"""
+        with self._lock:
+            self._fetched_at = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        age = self.age()
+        return {
+            "name": self.name,
+            "version": self.version,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "disk_loads": self.disk_loads,
+            "shared_loads": self.shared_loads,
+            "errors": self.errors,
+            "age_seconds": round(age, 3) if age is not None else None,
+            "ttl_seconds": self.current_ttl(),
+            "rows": len(self._data) if self._data is not None else 0,
+            "last_error": self._last_error,
+        }
+
+    def _load_from_disk(self) -> bool:
+        """
+        从磁盘缓存恢复当前交易日的快照（冷启动时调用）
+        :return: 是否恢复成功
+        """
+        session = current_session()
+        entry = disk_cache.get(self.name, "*", "spot", session.isoformat())
+        if entry is None:
+            return False
+        try:
+            df = pickle.loads(entry.payload)
+        except Exception as e:
+            logger.warning(f"{self.name} 磁盘缓存数据无法读取: {e}")
+            return False
+
+        with self._lock:
+            if self._data is not None:
+                return True
+            # 按写入时间换算存活时间，过期的数据仍可先返回，同时触发后台刷新
+            self._adopt(df, time.time() - entry.fetched_at, session, entry.complete)
+            self.disk_loads += 1
+        logger.info(f"{self.name} 行情快照已从磁盘缓存恢复，条数: {len(df)}")
+        return True
+
+    def _adopt(self, df: pd.DataFrame, age: float, session: date, complete: bool) -> None:
+        """使用其他来源（共享缓存、磁盘）的快照替换当前快照（调用方需持有锁）"""
+        self._data = df
+        self._fetched_at = time.monotonic() - max(0.0, age)
+        self._session, self._complete = session, complete
+        self.version += 1
+
+    def _load_shared(self, require_fresh: bool = True) -> bool:
+        """
+        使用其他工作进程发布到共享缓存后端的快照
+        :param require_fresh: 是否只接受仍在有效期内的快照
+        :return: 是否使用了共享快照
+        """
+        shared = cache_get(self.shared_key)
+        if shared is None:
+            return False
+        published_at, session, complete, df = shared
+        age = time.time() - published_at
+        with self._lock:
+            # 共享快照不比当前快照新（如本进程自己发布的），不需要替换
+            if self._data is not None and age >= time.monotonic() - self._fetched_at:
+                return False
+            fresh = age < self.current_ttl() or (complete and session == current_session())
+            if require_fresh and not fresh:
+                return False
+            self._adopt(df, age, session, complete)
+            self.shared_loads += 1
+        logger.debug(f"{self.name} 使用共享缓存中的行情快照，已存在: {age:.1f}s")
+        return True
+
+    def _refresh(self, event: threading.Event) -> None:
+        """
+        执行一次刷新，完成后唤醒所有等待者
+        其他工作进程已发布有效的快照时直接使用；否则获取刷新锁，只由持有锁的进程访问上游
+        """
+        try:
+            if self._load_shared():
+                return
+            with refresh_lock(self.shared_key, wait_timeout=self.wait_timeout) as leader:
+                if not leader and self._load_shared():
+                    return
+                self._fetch()
+        finally:
+            with self._lock:
+                self._refreshing = None
+            event.set()
+
+    def _fetch(self) -> None:
+        """访问上游获取快照，并写入磁盘缓存和共享缓存后端"""
+        started = time.monotonic()
+        try:
+            session = current_session()
+            complete = is_session_complete(session)
+            df = self._fetcher()
+            if df is None or df.empty:
+                raise Exception("获取到的数据为空")
+
+            # 发布时间取在本地时间戳之前，本进程读到自己发布的快照时不会把它当作更新的数据
+            published_at = time.time()
+            with self._lock:
+                self._data = df
+                self._fetched_at = time.monotonic()
+                self._session, self._complete = session, complete
+                self._last_error = None
+                self.version += 1
+                self.refreshes += 1
+            logger.info(
+                f"{self.name} 行情快照已刷新，条数: {len(df)}，耗时: {time.monotonic() - started:.2f}s"
+            )
+            cache_set(self.shared_key, (published_at, session, complete, df))
+            disk_cache.put(
+                self.name, "*", "spot", session.isoformat(),
+                pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL), complete,
+            )
+        except Exception as e:
+            with self._lock:
+                self._last_error = str(e)
+                self.errors += 1
+            logger.error(f"{self.name} 行情快照刷新失败: {e}")
+
+
+# 沪深京A股全市场行情快照（东方财富）
+market_snapshot = MarketSnapshotCache("stock_zh_a_spot_em", stock_data_provider.get_stock_spot_em, source="eastmoney")
+
+# 中国股票指数行情快照（新浪）
+index_snapshot = MarketSnapshotCache("stock_zh_index_spot_sina", stock_data_provider.get_index_spot_sina, source="sina")
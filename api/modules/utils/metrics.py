@@ -0,0 +1,233 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from .latency import DEFAULT_BUCKETS, LatencyHistogram
+
+# 接口耗时分桶上界（秒），接口多数命中缓存，比akshare调用快得多
+HTTP_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prometheus 文本格式的 Content-Type
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 标签（按名称排序的 (名称, 值) 元组）
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class MetricFamily(NamedTuple):
+    """一组同名指标（由采集函数在导出时生成）"""
+    name: str
+    # counter, gauge 或 histogram
+    type: str
+    help: str
+    # [(标签, 值)]；histogram 的值为 LatencyHistogram
+    samples: List[Tuple[Dict[str, Any], Any]]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    text = ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return f"{{{text}}}" if text else ""
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return "NaN"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    进程内指标注册表，导出为 Prometheus 文本格式
+
+    计数器和直方图由调用方直接记录；缓存、熔断器等已有统计通过采集函数在导出时读取，
+    不在热路径上重复计数。
+    """
+
+    def __init__(self):
+        # {名称: (类型, 说明, 直方图分桶)}
+        self._meta: Dict[str, Tuple[str, str, Tuple[float, ...]]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, LatencyHistogram]] = {}
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str) -> None:
+        """声明计数器"""
+        self._meta[name] = ("counter", help, ())
+        self._counters.setdefault(name, {})
+
+    def histogram(self, name: str, help: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """声明耗时直方图"""
+        self._meta[name] = ("histogram", help, buckets)
+        self._histograms.setdefault(name, {})
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        """
+        计数器加值
+        :param name: 计数器名称（需先通过 counter 声明）
+        :param value: 增加的值
+        :param labels: 标签
+        """
+        key = _label_key(labels)
+        series = self._counters[name]
+        with self._lock:
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        """
+        记录一次耗时
+        :param name: 直方图名称（需先通过 histogram 声明）
+        :param seconds: 耗时（秒）
+        :param labels: 标签
+        """
+        key = _label_key(labels)
+        series = self._histograms[name]
+        histogram = series.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = series.setdefault(key, LatencyHistogram(self._meta[name][2]))
+        histogram.observe(seconds)
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        """
+        注册采集函数，导出时调用
+        :param collector: 返回 MetricFamily 列表的函数
+        """
+        self._collectors.append(collector)
+
+    def families(self) -> List[MetricFamily]:
+        """当前全部指标"""
+        with self._lock:
+            families = [
+                MetricFamily(name, "counter", self._meta[name][1], [(dict(key), value) for key, value in series.items()])
+                for name, series in self._counters.items()
+            ]
+            families += [
+                MetricFamily(name, "histogram", self._meta[name][1], [(dict(key), value) for key, value in series.items()])
+                for name, series in self._histograms.items()
+            ]
+        for collector in self._collectors:
+            families.extend(collector())
+        return families
+
+    def render(self) -> str:
+        """
+        导出为 Prometheus 文本格式
+        :return: 指标文本
+        """
+        lines: List[str] = []
+        for family in self.families():
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.type}")
+            for labels, value in family.samples:
+                label_items = tuple(sorted((name, str(v)) for name, v in labels.items()))
+                if family.type == "histogram":
+                    lines.extend(_render_histogram(family.name, label_items, value))
+                else:
+                    lines.append(f"{family.name}{_format_labels(label_items)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _render_histogram(name: str, labels: LabelKey, histogram: LatencyHistogram) -> List[str]:
+    """直方图导出为累计分桶、总和与样本数"""
+    counts, count, total = histogram.totals()
+    lines = []
+    cumulative = 0
+    for bucket, bucket_count in zip(histogram.buckets + (float("inf"),), counts):
+        cumulative += bucket_count
+        bucket_labels = labels + (("le", _format_value(float(bucket))),)
+        lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+    lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return lines
+
+
+# 全局指标注册表
+metrics = MetricsRegistry()
+
+metrics.counter("akshare_calls_total", "akshare接口调用次数")
+metrics.counter("akshare_errors_total", "akshare接口调用失败次数（抛出异常或返回空结果）")
+metrics.counter("akshare_rows_total", "akshare接口返回的数据行数")
+metrics.counter("akshare_bytes_total", "akshare接口返回数据的内存大小（字节）")
+metrics.histogram("akshare_call_duration_seconds", "akshare接口调用耗时")
+metrics.counter("http_requests_total", "接口请求次数")
+metrics.histogram("http_request_duration_seconds", "接口耗时（到响应头发出为止）", HTTP_BUCKETS)
+
+
+def record_akshare_result(function: str, seconds: float, result: Any = None, error: bool = False) -> None:
+    """
+    记录一次akshare调用
+    :param function: 函数名
+    :param seconds: 耗时（秒）
+    :param result: 返回结果（DataFrame时统计行数和内存大小）
+    :param error: 是否抛出异常
+    """
+    metrics.inc("akshare_calls_total", function=function)
+    metrics.observe("akshare_call_duration_seconds", seconds, function=function)
+    if error or result is None:
+        metrics.inc("akshare_errors_total", function=function)
+        return
+    if hasattr(result, "memory_usage"):
+        metrics.inc("akshare_rows_total", len(result), function=function)
+        # 不做深度统计：对象列只计指针大小，避免遍历全部字符串
+        metrics.inc("akshare_bytes_total", int(result.memory_usage(index=True, deep=False).sum()), function=function)
+    elif isinstance(result, (list, tuple)):
+        metrics.inc("akshare_rows_total", len(result), function=function)
+
+
+class MetricsMiddleware:
+    """
+    记录每个路由的请求数、状态码和耗时的ASGI中间件
+    路由使用路径模板（如 /api/py/stock/chart），未匹配的路径统一记为 unmatched，避免标签数量无限增长；
+    耗时记到响应头发出为止，SSE等长连接不会被计为慢请求
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        recorded = False
+
+        def record(status: int) -> None:
+            nonlocal recorded
+            if recorded:
+                return
+            recorded = True
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            metrics.inc("http_requests_total", method=method, route=path, status=status)
+            metrics.observe("http_request_duration_seconds", time.perf_counter() - started, method=method, route=path)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            record(500)
+            raise
+
+
+def hit_ratio(hits: int, misses: int) -> Optional[float]:
+    """命中率，无访问时为None"""
+    total = hits + misses
+    return hits / total if total else None
@@ -0,0 +1,202 @@
+import asyncio
+import heapq
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from .async_data_provider import async_stock_data_provider
+from .logger import get_logger
+from .market_snapshot import market_snapshot
+from .screener_engine import compute_screener_data
+from .stock_data_provider import stock_data_provider
+from .trading_calendar import (
+    PHASE_AUCTION,
+    PHASE_CLOSED,
+    PHASE_HOLIDAY,
+    PHASE_LUNCH,
+    PHASE_SESSION,
+    market_phase,
+    seconds_until_next_phase,
+    set_trade_dates,
+)
+
+logger = get_logger(__name__)
+
+# 各市场阶段的默认预取间隔（秒），可通过 PREFETCH_<PHASE>_SECONDS 配置
+DEFAULT_PHASE_INTERVALS: Dict[str, float] = {
+    PHASE_SESSION: 5.0,
+    PHASE_AUCTION: 15.0,
+    PHASE_LUNCH: 1800.0,
+    PHASE_CLOSED: 3600.0,
+    PHASE_HOLIDAY: 3600.0,
+}
+
+# 交易日历的刷新间隔和加载失败后的重试间隔（秒）
+TRADE_CALENDAR_REFRESH_SECONDS = 24 * 3600
+TRADE_CALENDAR_RETRY_SECONDS = 3600
+
+
+class HotTickerTracker:
+    """
+    热门代码统计
+
+    每次访问计1分，分数按半衰期指数衰减，近期访问多的代码排在前面。
+    """
+
+    def __init__(self, half_life: Optional[float] = None, max_entries: int = 5000):
+        """
+        :param half_life: 分数半衰期（秒）
+        :param max_entries: 最多跟踪的代码数量，超过时淘汰分数最低的一半
+        """
+        self.half_life = half_life or float(os.getenv("PREFETCH_HOT_HALF_LIFE_SECONDS", "600"))
+        self.max_entries = max_entries
+        # {代码: (分数, 更新时间)}
+        self._scores: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def _decayed(self, score: float, updated_at: float, now: float) -> float:
+        return score * 0.5 ** ((now - updated_at) / self.half_life)
+
+    def record(self, ticker: str) -> None:
+        """记录一次访问"""
+        now = time.monotonic()
+        with self._lock:
+            score, updated_at = self._scores.get(ticker, (0.0, now))
+            self._scores[ticker] = (self._decayed(score, updated_at, now) + 1.0, now)
+            if len(self._scores) > self.max_entries:
+                keep = heapq.nlargest(
+                    self.max_entries // 2,
+                    self._scores.items(),
+                    key=lambda item: self._decayed(item[1][0], item[1][1], now),
+                )
+                self._scores = dict(keep)
+
+    def top(self, n: int) -> List[str]:
+        """
+        获取最热门的代码
+        :param n: 数量
+        :return: 按热度降序排列的代码
+        """
+        now = time.monotonic()
+        with self._lock:
+            items = list(self._scores.items())
+        ranked = heapq.nlargest(n, items, key=lambda item: self._decayed(item[1][0], item[1][1], now))
+        return [ticker for ticker, _ in ranked]
+
+
+class MarketPrefetcher:
+    """
+    后台行情预取
+
+    在服务运行期间保持全市场行情快照、主要指数和最热门N个代码的1分钟K线为最新，
+    用户请求直接命中缓存。预取间隔按A股交易日历调整：连续竞价期间频繁刷新，
+    午休、盘后和节假日只在阶段切换时刷新一次后空闲等待。
+    """
+
+    def __init__(self, hot_tickers: HotTickerTracker, hot_count: Optional[int] = None):
+        """
+        :param hot_tickers: 热门代码统计
+        :param hot_count: 预取的热门代码数量
+        """
+        self.hot_tickers = hot_tickers
+        self.hot_count = hot_count if hot_count is not None else int(os.getenv("PREFETCH_HOT_TICKERS", "20"))
+        self._index_tickers: List[str] = []
+        self._task: Optional[asyncio.Task] = None
+        self._calendar_due_at = 0.0
+        self.runs = 0
+        self.last_run: Optional[Dict[str, Any]] = None
+
+    def get_phase_interval(self, phase: str) -> float:
+        """
+        获取某市场阶段的预取间隔
+        :param phase: 市场阶段
+        :return: 秒数
+        """
+        default = DEFAULT_PHASE_INTERVALS.get(phase, 1800.0)
+        return float(os.getenv(f"PREFETCH_{phase.upper()}_SECONDS", default))
+
+    def start(self, index_tickers: List[str]) -> None:
+        """
+        在当前事件循环中启动预取任务（设置 PREFETCH_ENABLED=0 时不启动）
+        :param index_tickers: 需要保持最新的指数代码
+        """
+        if os.getenv("PREFETCH_ENABLED", "1") == "0":
+            logger.info("后台行情预取已关闭")
+            return
+        if self._task is not None and not self._task.done():
+            return
+        self._index_tickers = list(index_tickers)
+        self._task = asyncio.ensure_future(self._run())
+
+    def stop(self) -> None:
+        """停止预取任务"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._refresh_calendar()
+                await self.prefetch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"后台行情预取失败: {e}", exc_info=True)
+
+            # 阶段切换时立即刷新一次（如午休开始、收盘），其余时间按当前阶段的间隔等待
+            phase = market_phase()
+            delay = min(self.get_phase_interval(phase), seconds_until_next_phase())
+            await asyncio.sleep(max(delay, 1.0))
+
+    async def _refresh_calendar(self) -> None:
+        """每天从上游加载一次交易日历，用于识别节假日"""
+        if time.monotonic() < self._calendar_due_at:
+            return
+        self._calendar_due_at = time.monotonic() + TRADE_CALENDAR_RETRY_SECONDS
+        df = await async_stock_data_provider.run("sina", stock_data_provider.get_trade_dates)
+        if df is None or df.empty or "trade_date" not in df.columns:
+            logger.warning("未能获取交易日历，节假日按交易日处理")
+            return
+        set_trade_dates(df["trade_date"].tolist())
+        self._calendar_due_at = time.monotonic() + TRADE_CALENDAR_REFRESH_SECONDS
+        logger.info(f"交易日历已加载，交易日数量: {len(df)}")
+
+    async def prefetch_once(self) -> Dict[str, Any]:
+        """
+        执行一次预取：行情快照（及筛选器排名、行业索引）、主要指数和热门代码的1分钟K线
+        :return: 本次预取的统计
+        """
+        started = time.monotonic()
+        hot = [ticker for ticker in self.hot_tickers.top(self.hot_count) if ticker not in self._index_tickers]
+        tickers = self._index_tickers + hot
+
+        results = await asyncio.gather(
+            async_stock_data_provider.get_snapshot_derived(
+                market_snapshot, "screener_data", compute_screener_data
+            ),
+            async_stock_data_provider.get_index_snapshot(),
+            *(async_stock_data_provider.get_realtime_min_data(ticker, '1') for ticker in tickers),
+            return_exceptions=True,
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        for error in errors:
+            logger.warning(f"预取数据失败: {error}")
+
+        self.runs += 1
+        self.last_run = {
+            "phase": market_phase(),
+            "tickers": len(tickers),
+            "hot_tickers": hot,
+            "errors": len(errors),
+            "seconds": round(time.monotonic() - started, 3),
+        }
+        logger.debug(f"后台行情预取完成: {self.last_run}")
+        return self.last_run
+
+
+# 全局热门代码统计（图表、报价接口访问时记录）
+hot_tickers = HotTickerTracker()
+
+# 全局后台行情预取任务
+market_prefetcher = MarketPrefetcher(hot_tickers)
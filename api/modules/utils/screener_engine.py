@@ -0,0 +1,181 @@
+import os
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+import numpy as np
+import pandas as pd
+from .frame_mapper import convert_frame, frame_to_records
+from .logger import get_logger
+from .sector_index import SectorIndex, build_sector_index, match_sectors, sector_positions
+
+logger = get_logger(__name__)
+
+# 筛选器返回字段 -> 东方财富行情源列名
+SCREENER_COLUMNS = {
+    "symbol": "代码",
+    "shortName": "名称",
+    "regularMarketPrice": "最新价",
+    "regularMarketChange": "涨跌额",
+    "regularMarketChangePercent": "涨跌幅",
+    "regularMarketVolume": "成交量",
+    "regularMarketDayHigh": "最高",
+    "regularMarketDayLow": "最低",
+    "regularMarketOpen": "开盘",
+    "regularMarketPreviousClose": "昨收",
+    "trailingPE": "市盈率-动态",
+    "marketCap": "总市值",
+    "averageDailyVolume3Month": "成交量",
+    "sector": "所处行业",
+}
+
+# 每个内置筛选器预先计算的条数，可通过 SCREENER_TOP_N 配置
+SCREENER_TOP_N = int(os.getenv("SCREENER_TOP_N", "200"))
+
+# 未知筛选类型使用的默认筛选器
+DEFAULT_SCREENER = "most_actives"
+
+
+class ScreenerSpec(NamedTuple):
+    """内置筛选器定义"""
+    # 排序列（源列名）
+    column: str
+    # 是否降序
+    descending: bool
+    # 过滤条件，返回布尔Series；None表示不过滤
+    condition: Optional[Callable[[pd.DataFrame], pd.Series]] = None
+    # 行业名称正则，只保留匹配行业的股票（通过行业索引筛选）；None表示不限行业
+    sectors: Optional[str] = None
+
+
+class ScreenerData(NamedTuple):
+    """由行情快照预先计算的筛选数据（每个快照版本计算一次，见 compute_screener_data）"""
+    # {筛选类型: 筛选器返回格式的股票列表}
+    rankings: Dict[str, List[Dict[str, Any]]]
+    # 行业索引
+    sectors: SectorIndex
+
+
+def _small_cap(df: pd.DataFrame) -> pd.Series:
+    """总市值小于300亿"""
+    return pd.to_numeric(df["总市值"], errors="coerce") < 30000000000
+
+
+# 计算机、通信、电子行业为主的科技股
+TECH_SECTORS = "计算机|通信|电子|科技|互联网"
+
+
+# 内置筛选器
+BUILTIN_SCREENERS: Dict[str, ScreenerSpec] = {
+    "all_stocks": ScreenerSpec("代码", descending=False),
+    "most_actives": ScreenerSpec("成交额", descending=True),
+    "day_gainers": ScreenerSpec("涨跌幅", descending=True),
+    "day_losers": ScreenerSpec("涨跌幅", descending=False),
+    "small_cap_gainers": ScreenerSpec("涨跌幅", descending=True, condition=_small_cap),
+    "growth_technology_stocks": ScreenerSpec("涨跌幅", descending=True, sectors=TECH_SECTORS),
+}
+
+
+def top_k(df: pd.DataFrame, column: str, n: int, descending: bool = True) -> pd.DataFrame:
+    """
+    按某列取前n条（部分选择，不对全表排序）
+    :param df: 行情数据
+    :param column: 排序列（按数值比较，代码列也按数值比较）
+    :param n: 条数
+    :param descending: 是否降序
+    :return: 排好序的前n条
+    """
+    values = pd.to_numeric(df[column], errors="coerce")
+    index = values.nlargest(n).index if descending else values.nsmallest(n).index
+    return df.loc[index]
+
+
+def rank_screener(
+    df: pd.DataFrame,
+    screener: str,
+    n: int,
+    index: Optional[SectorIndex] = None,
+    sectors: Optional[List[str]] = None,
+) -> pd.DataFrame:
+    """
+    计算单个内置筛选器的前n条
+    :param df: 东方财富A股行情快照
+    :param screener: 筛选类型，未知类型使用默认筛选器
+    :param n: 条数
+    :param index: 该快照的行业索引，未提供且需要按行业筛选时临时构建
+    :param sectors: 只在这些行业中筛选
+    :return: 筛选并排序后的行情数据
+    """
+    spec = BUILTIN_SCREENERS.get(screener, BUILTIN_SCREENERS[DEFAULT_SCREENER])
+    if spec.sectors is not None or sectors:
+        if index is None:
+            index = build_sector_index(df)
+        positions = None
+        if sectors:
+            positions = sector_positions(index, sectors)
+        if spec.sectors is not None:
+            matched = sector_positions(index, match_sectors(index, spec.sectors))
+            positions = matched if positions is None else np.intersect1d(positions, matched, assume_unique=True)
+        df = df.iloc[positions]
+    if spec.condition is not None:
+        df = df[spec.condition(df)]
+    return top_k(df, spec.column, n, spec.descending)
+
+
+def compute_screener_rankings(
+    df: pd.DataFrame, index: Optional[SectorIndex] = None
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    一次性计算全部内置筛选器的前 SCREENER_TOP_N 条（每个快照版本只计算一次）
+    :param df: 东方财富A股行情快照（只读）
+    :param index: 该快照的行业索引
+    :return: {筛选类型: 筛选器返回格式的股票列表}
+    """
+    if index is None:
+        index = build_sector_index(df)
+    rankings: Dict[str, List[Dict[str, Any]]] = {}
+    for name in BUILTIN_SCREENERS:
+        try:
+            rankings[name] = to_screener_quotes(rank_screener(df, name, SCREENER_TOP_N, index))
+        except KeyError as e:
+            # 行情源缺少筛选需要的列
+            logger.warning(f"筛选器 {name} 缺少必要列: {e}")
+            rankings[name] = []
+    return rankings
+
+
+def compute_screener_data(df: pd.DataFrame) -> ScreenerData:
+    """
+    构建行业索引并计算内置筛选器排名，两者共用一次行业分组
+    :param df: 东方财富A股行情快照（只读）
+    :return: 筛选数据
+    """
+    index = build_sector_index(df)
+    return ScreenerData(compute_screener_rankings(df, index), index)
+
+
+def to_screener_quotes(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    将行情数据批量转换为筛选器返回格式
+    :param df: 东方财富A股行情数据（已筛选、排序）
+    :return: 股票列表
+    """
+    frame = convert_frame(
+        df,
+        SCREENER_COLUMNS,
+        text_columns=("symbol", "shortName", "sector"),
+        required=("代码", "名称"),
+        text_defaults={"sector": "未知"},
+    )
+    if frame is None:
+        raise Exception(f"行情数据缺少必要列，现有列: {df.columns.tolist()}")
+
+    # 格式化代码（添加市场前缀）
+    codes = frame["symbol"].astype(str)
+    frame["symbol"] = np.select(
+        [codes.str.startswith(("0", "3")), codes.str.startswith("6")],
+        ["sz" + codes, "sh" + codes],
+        default=codes,
+    )
+    # 涨跌幅转换为小数
+    frame["regularMarketChangePercent"] = frame["regularMarketChangePercent"] / 100
+    frame["currency"] = "CNY"
+
+    return frame_to_records(frame)
@@ -0,0 +1,336 @@
+import os
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# 查询字段 -> 东方财富行情源列名（数值字段）
+QUERY_NUMERIC_FIELDS = {
+    "price": "最新价",
+    "regularMarketPrice": "最新价",
+    "change": "涨跌额",
+    "regularMarketChange": "涨跌额",
+    "changePct": "涨跌幅",
+    "regularMarketChangePercent": "涨跌幅",
+    "volume": "成交量",
+    "regularMarketVolume": "成交量",
+    "amount": "成交额",
+    "high": "最高",
+    "regularMarketDayHigh": "最高",
+    "low": "最低",
+    "regularMarketDayLow": "最低",
+    "open": "开盘",
+    "regularMarketOpen": "开盘",
+    "prevClose": "昨收",
+    "regularMarketPreviousClose": "昨收",
+    "pe": "市盈率-动态",
+    "trailingPE": "市盈率-动态",
+    "pb": "市净率",
+    "marketCap": "总市值",
+    "floatCap": "流通市值",
+    "turnover": "换手率",
+    "amplitude": "振幅",
+    "volumeRatio": "量比",
+}
+
+# 查询字段 -> 东方财富行情源列名（文本字段）
+QUERY_TEXT_FIELDS = {
+    "symbol": "代码",
+    "name": "名称",
+    "shortName": "名称",
+    "sector": "所处行业",
+}
+
+# 未指定 limit 时的返回条数和允许的最大条数
+QUERY_DEFAULT_LIMIT = 50
+QUERY_MAX_LIMIT = int(os.getenv("SCREENER_QUERY_MAX_LIMIT", "500"))
+
+# 编译结果缓存的查询数量
+QUERY_CACHE_SIZE = int(os.getenv("SCREENER_QUERY_CACHE_SIZE", "256"))
+
+# 比较运算符
+_COMPARATORS: Dict[str, Callable[[np.ndarray, float], np.ndarray]] = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "=": np.equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+# 数值后缀（万、亿）
+_NUMBER_UNITS = {"万": 1e4, "亿": 1e8}
+
+_TOKEN_PATTERN = re.compile(
+    r"""
+    \s*(?:
+        (?P<number>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?[万亿]?)
+      | (?P<string>"[^"]*"|'[^']*')
+      | (?P<op><=|>=|==|!=|<|>|=|~)
+      | (?P<paren>[(),])
+      | (?P<sign>[-+])
+      | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+    )
+    """,
+    re.VERBOSE,
+)
+
+
+class QuerySyntaxError(ValueError):
+    """筛选查询语法错误"""
+
+
+class ScreenerFrame(NamedTuple):
+    """查询使用的行情列（每个快照版本转换一次，见 build_screener_frame）"""
+    # 原始行情快照
+    df: pd.DataFrame
+    # {源列名: float64数组}，缺失或无法转换的值为NaN
+    numeric: Dict[str, np.ndarray]
+    # {源列名: 字符串Series}
+    text: Dict[str, pd.Series]
+
+
+class CompiledQuery(NamedTuple):
+    """编译后的筛选查询"""
+    # 查询原文
+    source: str
+    # 计算布尔掩码的函数；None表示不过滤
+    mask: Optional[Callable[[ScreenerFrame], np.ndarray]]
+    # 排序键 [(源列名, 是否降序)]
+    sort: List[Tuple[str, bool]]
+    # 返回条数
+    limit: int
+
+
+def build_screener_frame(df: pd.DataFrame) -> ScreenerFrame:
+    """
+    将行情快照的查询字段一次性转换为numpy数组，之后的查询只做向量运算
+    :param df: 东方财富A股行情快照（只读）
+    :return: 查询使用的行情列
+    """
+    numeric = {
+        column: pd.to_numeric(df[column], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        for column in set(QUERY_NUMERIC_FIELDS.values())
+        if column in df.columns
+    }
+    text = {
+        column: df[column].astype(str)
+        for column in set(QUERY_TEXT_FIELDS.values())
+        if column in df.columns
+    }
+    return ScreenerFrame(df, numeric, text)
+
+
+def _tokenize(query: str) -> List[Tuple[str, str]]:
+    """
+    词法分析
+    :param query: 查询原文
+    :return: [(类型, 值)]
+    """
+    tokens = []
+    position = 0
+    query = query.strip()
+    while position < len(query):
+        match = _TOKEN_PATTERN.match(query, position)
+        if match is None or match.end() == position:
+            raise QuerySyntaxError(f"无法识别的字符: {query[position:].lstrip()[:10]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        # 关键字不区分大小写
+        if kind == "word" and value.lower() in ("and", "or", "not", "sort", "limit", "contains"):
+            kind, value = "keyword", value.lower()
+        tokens.append((kind, value))
+        position = match.end()
+    return tokens
+
+
+def _parse_number(value: str) -> float:
+    unit = _NUMBER_UNITS.get(value[-1], 1.0)
+    if unit != 1.0:
+        value = value[:-1]
+    return float(value) * unit
+
+
+class _Parser:
+    """
+    递归下降解析器，语法：
+        query      := [expr] ["sort" sort_key ("," sort_key)*] ["limit" number]
+        expr       := and_expr ("or" and_expr)*
+        and_expr   := not_expr ("and" not_expr)*
+        not_expr   := "not" not_expr | "(" expr ")" | comparison
+        comparison := field op number | field ("=" | "!=" | "~" | "contains") string
+        sort_key   := ["-" | "+"] field
+    """
+
+    def __init__(self, tokens: List[Tuple[str, str]]):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self) -> Tuple[Optional[str], Optional[str]]:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None, None
+
+    def take(self, kind: Optional[str] = None, value: Optional[str] = None) -> str:
+        token_kind, token_value = self.peek()
+        if token_kind is None:
+            raise QuerySyntaxError("查询意外结束")
+        if (kind is not None and token_kind != kind) or (value is not None and token_value != value):
+            raise QuerySyntaxError(f"位置 {self.position + 1} 需要 {value or kind}，实际为 {token_value!r}")
+        self.position += 1
+        return token_value
+
+    def at_keyword(self, value: str) -> bool:
+        return self.peek() == ("keyword", value)
+
+    def parse(self) -> Tuple[Optional[Callable], List[Tuple[str, bool]], int]:
+        mask = None
+        if self.peek()[0] is not None and not self.at_keyword("sort") and not self.at_keyword("limit"):
+            mask = self.parse_or()
+
+        sort: List[Tuple[str, bool]] = []
+        if self.at_keyword("sort"):
+            self.take()
+            sort.append(self.parse_sort_key())
+            while self.peek() == ("paren", ","):
+                self.take()
+                sort.append(self.parse_sort_key())
+
+        limit = QUERY_DEFAULT_LIMIT
+        if self.at_keyword("limit"):
+            self.take()
+            limit = int(_parse_number(self.take("number")))
+            if limit <= 0:
+                raise QuerySyntaxError("limit 必须大于0")
+
+        if self.peek()[0] is not None:
+            raise QuerySyntaxError(f"多余的内容: {self.peek()[1]!r}")
+        return mask, sort, min(limit, QUERY_MAX_LIMIT)
+
+    def parse_or(self) -> Callable:
+        operands = [self.parse_and()]
+        while self.at_keyword("or"):
+            self.take()
+            operands.append(self.parse_and())
+        if len(operands) == 1:
+            return operands[0]
+        return lambda frame: np.logical_or.reduce([operand(frame) for operand in operands])
+
+    def parse_and(self) -> Callable:
+        operands = [self.parse_not()]
+        while self.at_keyword("and"):
+            self.take()
+            operands.append(self.parse_not())
+        if len(operands) == 1:
+            return operands[0]
+        return lambda frame: np.logical_and.reduce([operand(frame) for operand in operands])
+
+    def parse_not(self) -> Callable:
+        if self.at_keyword("not"):
+            self.take()
+            operand = self.parse_not()
+            return lambda frame: ~operand(frame)
+        if self.peek() == ("paren", "("):
+            self.take()
+            expr = self.parse_or()
+            self.take("paren", ")")
+            return expr
+        return self.parse_comparison()
+
+    def parse_comparison(self) -> Callable:
+        field = self.take("word")
+        kind, op = self.peek()
+        if kind == "keyword" and op == "contains":
+            kind, op = "op", "~"
+        elif kind != "op":
+            raise QuerySyntaxError(f"字段 {field} 之后需要比较运算符")
+        self.position += 1
+
+        if field in QUERY_NUMERIC_FIELDS and op != "~":
+            column = QUERY_NUMERIC_FIELDS[field]
+            compare = _COMPARATORS[op]
+            value = _parse_number(self.take("number"))
+            # NaN与任何值比较都为False，缺失数据的股票不会被选中
+            return lambda frame: compare(_numeric_column(frame, column), value)
+
+        if field in QUERY_TEXT_FIELDS and op in ("=", "==", "!=", "~"):
+            column = QUERY_TEXT_FIELDS[field]
+            value = self.take("string")[1:-1]
+            if op == "~":
+                return lambda frame: _text_column(frame, column).str.contains(value, regex=False).to_numpy()
+            matched = (lambda frame: (_text_column(frame, column) == value).to_numpy())
+            if op == "!=":
+                return lambda frame: ~matched(frame)
+            return matched
+
+        if field not in QUERY_NUMERIC_FIELDS and field not in QUERY_TEXT_FIELDS:
+            raise QuerySyntaxError(f"未知字段: {field}")
+        raise QuerySyntaxError(f"字段 {field} 不支持运算符 {op}")
+
+    def parse_sort_key(self) -> Tuple[str, bool]:
+        descending = False
+        if self.peek()[0] == "sign":
+            descending = self.take() == "-"
+        field = self.take("word")
+        if field in QUERY_NUMERIC_FIELDS:
+            return QUERY_NUMERIC_FIELDS[field], descending
+        if field in QUERY_TEXT_FIELDS:
+            return QUERY_TEXT_FIELDS[field], descending
+        raise QuerySyntaxError(f"未知排序字段: {field}")
+
+
+def _numeric_column(frame: ScreenerFrame, column: str) -> np.ndarray:
+    values = frame.numeric.get(column)
+    if values is None:
+        raise KeyError(column)
+    return values
+
+
+def _text_column(frame: ScreenerFrame, column: str) -> pd.Series:
+    values = frame.text.get(column)
+    if values is None:
+        raise KeyError(column)
+    return values
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_query(query: str) -> CompiledQuery:
+    """
+    编译筛选查询，如 "pe<20 and marketCap>1e10 sort -changePct limit 50"
+    相同查询只编译一次
+    :param query: 查询原文
+    :return: 编译后的查询
+    :raises QuerySyntaxError: 语法错误或未知字段
+    """
+    mask, sort, limit = _Parser(_tokenize(query)).parse()
+    return CompiledQuery(query, mask, sort, limit)
+
+
+def run_query(frame: ScreenerFrame, compiled: CompiledQuery) -> pd.DataFrame:
+    """
+    在行情快照上执行编译后的查询
+    :param frame: 查询使用的行情列
+    :param compiled: 编译后的查询
+    :return: 筛选、排序并截取后的行情数据
+    :raises KeyError: 行情源缺少查询用到的列
+    """
+    if compiled.mask is not None:
+        positions = np.flatnonzero(compiled.mask(frame))
+    else:
+        positions = np.arange(len(frame.df))
+
+    if compiled.sort:
+        # np.lexsort 以最后一个键为主键；降序数值取负，NaN排在最后
+        keys = []
+        for column, descending in reversed(compiled.sort):
+            if column in frame.numeric:
+                values = frame.numeric[column][positions]
+                keys.append(-values if descending else values)
+            else:
+                codes = pd.factorize(_text_column(frame, column).to_numpy()[positions], sort=True)[0]
+                keys.append(-codes if descending else codes)
+        positions = positions[np.lexsort(keys)]
+
+    return frame.df.iloc[positions[:compiled.limit]]
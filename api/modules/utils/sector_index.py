@@ -0,0 +1,94 @@
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple
+import numpy as np
+import pandas as pd
+
+# 行情源中的行业列
+SECTOR_COLUMN = "所处行业"
+
+# 行业为空时归入的分类
+UNKNOWN_SECTOR = "未知"
+
+
+class SectorIndex(NamedTuple):
+    """行业索引（每个快照版本构建一次，见 build_sector_index）"""
+    # {行业: 该行业股票在快照中的行位置}
+    positions: Dict[str, np.ndarray]
+    # 各行业汇总统计，按成交额降序
+    stats: List[Dict[str, Any]]
+
+
+def _numeric(df: pd.DataFrame, column: str) -> pd.Series:
+    if column not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[column], errors="coerce")
+
+
+def build_sector_index(df: pd.DataFrame) -> SectorIndex:
+    """
+    构建行业 -> 行位置的索引，并用一次分组计算各行业统计
+    :param df: 东方财富A股行情快照（只读）
+    :return: 行业索引；行情源没有行业列时为空索引
+    """
+    if SECTOR_COLUMN not in df.columns or df.empty:
+        return SectorIndex({}, [])
+
+    sectors = df[SECTOR_COLUMN].astype("string").str.strip().replace("", pd.NA).fillna(UNKNOWN_SECTOR)
+    change = _numeric(df, "涨跌幅")
+    values = pd.DataFrame({
+        "change": change.to_numpy(),
+        "advancers": (change > 0).to_numpy(),
+        "decliners": (change < 0).to_numpy(),
+        "turnover": _numeric(df, "成交额").to_numpy(),
+        "marketCap": _numeric(df, "总市值").to_numpy(),
+    })
+    grouped = values.groupby(sectors.to_numpy(), sort=False)
+
+    positions = {str(sector): rows for sector, rows in grouped.indices.items()}
+    aggregated = grouped.agg(
+        count=("change", "size"),
+        averageChange=("change", "mean"),
+        advancers=("advancers", "sum"),
+        decliners=("decliners", "sum"),
+        turnover=("turnover", "sum"),
+        marketCap=("marketCap", "sum"),
+    ).sort_values("turnover", ascending=False)
+
+    stats = [
+        {
+            "sector": str(sector),
+            "count": int(row.count),
+            # 与筛选器一致，涨跌幅转换为小数
+            "averageChangePercent": None if pd.isna(row.averageChange) else float(row.averageChange) / 100,
+            "advancers": int(row.advancers),
+            "decliners": int(row.decliners),
+            "turnover": float(row.turnover),
+            "marketCap": float(row.marketCap),
+        }
+        for sector, row in zip(aggregated.index, aggregated.itertuples(index=False))
+    ]
+    return SectorIndex(positions, stats)
+
+
+def match_sectors(index: SectorIndex, pattern: str) -> List[str]:
+    """
+    查找名称匹配正则的行业（只在行业名称上匹配，不扫描全部股票）
+    :param index: 行业索引
+    :param pattern: 正则表达式，如 "计算机|通信|电子"
+    :return: 匹配的行业
+    """
+    regex = re.compile(pattern)
+    return [sector for sector in index.positions if regex.search(sector)]
+
+
+def sector_positions(index: SectorIndex, sectors: Iterable[str]) -> np.ndarray:
+    """
+    获取若干行业的股票行位置
+    :param index: 行业索引
+    :param sectors: 行业名称，不存在的行业忽略
+    :return: 升序的行位置
+    """
+    parts = [index.positions[sector] for sector in sectors if sector in index.positions]
+    if not parts:
+        return np.empty(0, dtype="int64")
+    return np.sort(np.concatenate(parts))
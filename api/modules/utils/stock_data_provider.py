@@ -1,14 +1,66 @@
-import akshare as ak
+import os
+import time
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional, Any, Tuple, Callable
 from ..utils.logger import get_logger, log_akshare_call
+from .bar_cache import intraday_bar_cache, shared_bar_key
+from .bar_series import BarSeries
+from .cache_backend import refresh_lock
+from .circuit_breaker import circuit_breaker, circuit_breakers
+from .data_source import call_source
+from .frame_mapper import convert_frame
+from .history_store import HISTORY_DTYPE, history_store, history_to_quotes, resample_history
+from .trading_calendar import MORNING_OPEN, china_now, last_completed_session
 
 logger = get_logger(__name__)
 
+# 分时数据列映射：标准字段 -> akshare源列名
+STOCK_MIN_EM_COLUMNS = {
+    "date": "时间",
+    "open": "开盘",
+    "close": "收盘",
+    "high": "最高",
+    "low": "最低",
+    "volume": "成交量",
+}
+STOCK_MIN_SINA_COLUMNS = {
+    "date": "day",
+    "open": "open",
+    "close": "close",
+    "high": "high",
+    "low": "low",
+    "volume": "volume",
+}
+INDEX_MIN_EM_COLUMNS = STOCK_MIN_EM_COLUMNS
+
+# 日线数据列映射（东方财富个股与指数日线列名一致）
+DAILY_EM_COLUMNS = {
+    "date": "日期",
+    "open": "开盘",
+    "close": "收盘",
+    "high": "最高",
+    "low": "最低",
+    "volume": "成交量",
+}
+
+# 可由1分钟K线聚合得到的分钟周期
+RESAMPLE_MINUTES = (5, 15, 30, 60)
+
+# 上午连续竞价时段 09:30-11:30 的分钟数（下午 13:00-15:00 相同）
+MORNING_SESSION_MINUTES = 120
+
+# 首次同步日线时下载的起始日期
+HISTORY_START_DATE = "19900101"
+
 class StockDataProvider:
     """股票数据提供者，负责从不同数据源获取数据并处理转换"""
     
+    def __init__(self):
+        # 交易中的当日日线（未定稿，不写入历史数据存储） {代码: (获取时间, 记录)}
+        self._live_daily: Dict[str, Tuple[float, np.ndarray]] = {}
+    
     @staticmethod
     def standardize_ticker(ticker: str) -> Tuple[str, bool]:
         """
@@ -71,17 +123,76 @@ class StockDataProvider:
             
         return start_date, end_date, period
     
+    @staticmethod
+    def get_min_window_start() -> str:
+        """分时数据窗口的起始时间（24小时前），格式 'YYYY-MM-DD HH:MM:SS'"""
+        return (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S")
+    
     @staticmethod
     def format_date_str(date: datetime) -> str:
         """格式化日期为字符串 YYYYMMDD 格式"""
         return date.strftime("%Y%m%d")
 
+    @circuit_breaker("stock_zh_a_spot_em")
+    @log_akshare_call
+    def get_stock_spot_em(self) -> Optional[pd.DataFrame]:
+        """
+        获取沪深京A股全市场实时行情（东方财富）
+        :return: 全市场行情数据
+        """
+        try:
+            return call_source("stock_zh_a_spot_em")
+        except Exception as e:
+            logger.error(f"获取A股实时行情失败(stock_zh_a_spot_em): {e}", exc_info=True)
+            return None
+
+    @circuit_breaker("stock_info_a_code_name")
+    @log_akshare_call
+    def get_stock_code_name(self) -> Optional[pd.DataFrame]:
+        """
+        获取沪深京A股代码和简称（交易所数据）
+        :return: 股票列表 (code, name)
+        """
+        try:
+            return call_source("stock_info_a_code_name")
+        except Exception as e:
+            logger.error(f"获取A股股票列表失败(stock_info_a_code_name): {e}", exc_info=True)
+            return None
+
+    @circuit_breaker("stock_zh_index_spot_sina")
+    @log_akshare_call
+    def get_index_spot_sina(self) -> Optional[pd.DataFrame]:
+        """
+        获取中国股票指数实时行情（新浪）
+        :return: 全部指数行情数据
+        """
+        try:
+            return call_source("stock_zh_index_spot_sina")
+        except Exception as e:
+            logger.error(f"获取指数实时行情失败(stock_zh_index_spot_sina): {e}", exc_info=True)
+            return None
+
+    @circuit_breaker("tool_trade_date_hist_sina")
+    @log_akshare_call
+    def get_trade_dates(self) -> Optional[pd.DataFrame]:
+        """
+        获取A股交易日历（新浪）
+        :return: 全部交易日 (trade_date)
+        """
+        try:
+            return call_source("tool_trade_date_hist_sina")
+        except Exception as e:
+            logger.error(f"获取交易日历失败(tool_trade_date_hist_sina): {e}", exc_info=True)
+            return None
+
+    @circuit_breaker("stock_zh_a_hist_min_em")
     @log_akshare_call
-    def get_stock_min_em(self, symbol: str, period: str = '1') -> Optional[pd.DataFrame]:
+    def get_stock_min_em(self, symbol: str, period: str = '1', start_time: Optional[str] = None) -> Optional[pd.DataFrame]:
         """
         获取股票分时数据（东方财富）
         :param symbol: 股票代码 (如 '600519' 或 'sh600519')
         :param period: 分时周期 ('1', '5', '15', '30', '60')
+        :param start_time: 开始时间 'YYYY-MM-DD HH:MM:SS'，默认为24小时前
         :return: 分时数据
         """
         try:
@@ -93,12 +204,12 @@ class StockDataProvider:
                 
             # 使用东方财富的分时历史数据接口
             # 注意：start_date和end_date格式需要为'YYYY-MM-DD HH:MM:SS'
-            start_time = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S")
+            start_time = start_time or self.get_min_window_start()
             end_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
             logger.debug(f"获取股票 {symbol}(处理后:{clean_symbol}) 的分时数据，周期：{period}，开始时间：{start_time}，结束时间：{end_time}")
             
-            return ak.stock_zh_a_hist_min_em(
+            return call_source("stock_zh_a_hist_min_em",
                 symbol=clean_symbol, 
                 period=period,
                 start_date=start_time, 
@@ -109,6 +220,7 @@ class StockDataProvider:
             logger.error(f"获取股票分时数据失败(stock_zh_a_hist_min_em): '{symbol}'", exc_info=True)
             return None
     
+    @circuit_breaker("stock_zh_a_minute")
     @log_akshare_call
     def get_stock_min_sina(self, symbol: str, period: str = '1') -> Optional[pd.DataFrame]:
         """
@@ -130,16 +242,18 @@ class StockDataProvider:
                 formatted_symbol = f"sz{symbol}"
                 
             logger.debug(f"尝试使用stock_zh_a_minute获取 {symbol}(处理后:{formatted_symbol}) 的分时数据")
-            return ak.stock_zh_a_minute(symbol=formatted_symbol, period=period)
+            return call_source("stock_zh_a_minute", symbol=formatted_symbol, period=period)
         except Exception as e:
             logger.error(f"获取股票分时数据失败(stock_zh_a_minute): '{symbol}'", exc_info=True)
             return None
     
+    @circuit_breaker("index_zh_a_hist_min_em")
     @log_akshare_call
-    def get_index_min_sina(self, symbol: str, period: str = '1') -> Optional[pd.DataFrame]:
+    def get_index_min_sina(self, symbol: str, period: str = '1', start_time: Optional[str] = None) -> Optional[pd.DataFrame]:
         """
         获取指数分时数据
         :param symbol: 指数代码 (如 'sh000016', 'sh000300' 或 '000016', '000300')
+        :param start_time: 开始时间 'YYYY-MM-DD HH:MM:SS'，默认为24小时前
         :return: 分时数据
         """
         try:
@@ -151,12 +265,11 @@ class StockDataProvider:
                 clean_symbol = symbol
                 
             # 使用东方财富指数分钟数据API
-            now = datetime.now()
-            start_date = (now - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
-            end_date = now.strftime('%Y-%m-%d %H:%M:%S')
+            start_date = start_time or self.get_min_window_start()
+            end_date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
             logger.debug(f"尝试使用index_zh_a_hist_min_em获取 {symbol}(处理后:{clean_symbol}) 的分时数据，时间范围: {start_date} 至 {end_date}")
-            return ak.index_zh_a_hist_min_em(
+            return call_source("index_zh_a_hist_min_em",
                 symbol=clean_symbol, 
                 period=period, 
                 start_date=start_date, 
@@ -166,41 +279,208 @@ class StockDataProvider:
             logger.error(f"获取指数分时数据失败(index_zh_a_hist_min_em): {e}", exc_info=True)
             return None
     
-    def get_realtime_min_data(self, ticker: str, interval: str = '1') -> List[Dict[str, Any]]:
+    @circuit_breaker("stock_zh_a_hist")
+    @log_akshare_call
+    def get_stock_daily(self, symbol: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """
+        获取股票日线数据（东方财富，不复权）
+        不复权数据在除权除息后不会改变历史价格，可以安全地增量追加到本地存储
+        :param symbol: 股票代码 (如 '600519' 或 'sh600519')
+        :param start_date: 开始日期 'YYYYMMDD'
+        :param end_date: 结束日期 'YYYYMMDD'
+        :return: 日线数据
+        """
+        try:
+            clean_symbol = symbol[2:] if symbol.startswith(('sh', 'sz')) else symbol
+            logger.debug(f"获取股票 {symbol} 的日线数据，时间范围: {start_date} 至 {end_date}")
+            return call_source("stock_zh_a_hist",
+                symbol=clean_symbol,
+                period="daily",
+                start_date=start_date,
+                end_date=end_date,
+                adjust=""
+            )
+        except Exception as e:
+            logger.error(f"获取股票日线数据失败(stock_zh_a_hist): '{symbol}'", exc_info=True)
+            return None
+    
+    @circuit_breaker("index_zh_a_hist")
+    @log_akshare_call
+    def get_index_daily(self, symbol: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """
+        获取指数日线数据（东方财富）
+        :param symbol: 指数代码 (如 'sh000300' 或 '000300')
+        :param start_date: 开始日期 'YYYYMMDD'
+        :param end_date: 结束日期 'YYYYMMDD'
+        :return: 日线数据
+        """
+        try:
+            clean_symbol = symbol[2:] if symbol.startswith(('sh', 'sz')) else symbol
+            logger.debug(f"获取指数 {symbol} 的日线数据，时间范围: {start_date} 至 {end_date}")
+            return call_source("index_zh_a_hist",
+                symbol=clean_symbol,
+                period="daily",
+                start_date=start_date,
+                end_date=end_date
+            )
+        except Exception as e:
+            logger.error(f"获取指数日线数据失败(index_zh_a_hist): '{symbol}'", exc_info=True)
+            return None
+    
+    def get_daily_history(
+        self, ticker: str, start: Optional[date] = None, end: Optional[date] = None, period: str = "daily",
+        sync: bool = True,
+    ) -> List[Dict[str, Any]]:
         """
-        获取实时分时数据，自动尝试多个数据源
+        获取日线/周线/月线数据
+        已定稿的日线保存在本地历史数据存储中，首次访问下载全部历史，之后每天只增量获取新的日线；
+        交易中的当日日线单独短暂缓存，不写入存储
         :param ticker: 股票或指数代码
-        :param interval: 分时间隔
-        :return: 标准化后的分时数据
+        :param start: 开始日期（含）
+        :param end: 结束日期（含）
+        :param period: 周期 (daily, weekly, monthly)
+        :param sync: 是否先与上游同步；为False时只读取本地数据（调用方已确认无需同步或已同步）
+        :return: 标准化后的K线数据 (date, open, close, high, low, volume)
         """
         clean_ticker, is_index = self.standardize_ticker(ticker)
+        if sync:
+            self.sync_daily_history(clean_ticker, is_index)
+        
+        records = history_store.read(clean_ticker, start, end)
+        live = self._live_daily.get(clean_ticker)
+        if live is not None and len(live[1]):
+            last = records["date"][-1] if len(records) else None
+            live_records = live[1] if last is None else live[1][live[1]["date"] > last]
+            if end is not None:
+                live_records = live_records[live_records["date"] <= np.datetime64(end, "D")]
+            records = np.concatenate([records, live_records])
+        
+        return history_to_quotes(resample_history(records, period))
+    
+    def get_daily_version(self, ticker: str) -> Tuple[int, float]:
+        """
+        获取本地日线数据的版本，已存储的日线或当日日线更新后版本随之变化
+        :param ticker: 股票或指数代码
+        :return: (已存储的日线条数, 当日日线的获取时间)
+        """
+        clean_ticker, _ = self.standardize_ticker(ticker)
+        live = self._live_daily.get(clean_ticker)
+        return history_store.count(clean_ticker), live[0] if live is not None else 0.0
+    
+    def needs_daily_sync(self, clean_ticker: str) -> bool:
+        """
+        本地日线是否需要与上游同步：缺少已定稿的日线，或交易时段内当日日线已过期
+        同步间隔可通过 HISTORY_SYNC_INTERVAL_SECONDS（补齐历史）和 HISTORY_LIVE_TTL_SECONDS（当日日线）配置
+        :param clean_ticker: 标准化后的代码
+        :return: 是否需要同步
+        """
+        sync_interval = float(os.getenv("HISTORY_SYNC_INTERVAL_SECONDS", "3600"))
+        live_ttl = float(os.getenv("HISTORY_LIVE_TTL_SECONDS", "30"))
+        
+        now = china_now()
+        completed = np.datetime64(last_completed_session(now), "D")
+        last = history_store.last_date(clean_ticker)
         
-        # 定义数据源列表，按优先级排序
-        data_sources = []
+        # 节假日上游没有新日线，靠同步间隔避免重复请求
+        need_history = (last is None or last < completed) and not history_store.synced_within(clean_ticker, sync_interval)
+        live = self._live_daily.get(clean_ticker)
+        need_live = (
+            now.weekday() < 5
+            and now.time() >= MORNING_OPEN
+            and np.datetime64(now.date(), "D") > completed
+            and (live is None or time.monotonic() - live[0] >= live_ttl)
+        )
+        return need_history or need_live
+    
+    def sync_daily_history(self, clean_ticker: str, is_index: bool) -> None:
+        """
+        将本地日线与上游同步：补齐缺失的已定稿日线，交易时段内刷新当日日线，见 needs_daily_sync
+        :param clean_ticker: 标准化后的代码
+        :param is_index: 是否为指数
+        """
+        with history_store.lock(clean_ticker):
+            if not self.needs_daily_sync(clean_ticker):
+                return
+            
+            now = china_now()
+            completed = np.datetime64(last_completed_session(now), "D")
+            last = history_store.last_date(clean_ticker)
+            
+            start_date = HISTORY_START_DATE if last is None else self.format_date_str(
+                (last + np.timedelta64(1, "D")).astype(datetime)
+            )
+            handler = self.get_index_daily if is_index else self.get_stock_daily
+            df = handler(clean_ticker, start_date, self.format_date_str(now))
+            if df is None:
+                return
+            
+            records = self._map_daily_records(df)
+            history_store.append(clean_ticker, records[records["date"] <= completed])
+            history_store.mark_synced(clean_ticker)
+            self._live_daily[clean_ticker] = (time.monotonic(), records[records["date"] > completed])
+    
+    def get_min_data_sources(self, ticker: str, interval: str = '1', since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        获取分时数据的数据源列表，按健康度排序（熔断中的数据源排在最后，其余按错误率和耗时排序）
+        :param ticker: 股票或指数代码
+        :param interval: 分时间隔
+        :param since: 增量获取的起始时间（含），不支持增量的数据源会返回完整数据
+        :return: 数据源列表 (name: 接口名, source: 上游数据源, handler: 获取函数, mapper: 映射函数)
+        """
+        clean_ticker, is_index = self.standardize_ticker(ticker)
         
         if is_index:
             # 指数数据源
-            data_sources = [
+            return [
                 {
                     "name": "index_zh_a_hist_min_em",
-                    "handler": lambda: self.get_index_min_sina(clean_ticker, period=interval),
+                    "source": "eastmoney",
+                    "handler": lambda: self.get_index_min_sina(clean_ticker, period=interval, start_time=since),
                     "mapper": self._map_index_min_sina
                 }
             ]
-        else:
-            # 股票数据源
-            data_sources = [
-                {
-                    "name": "stock_zh_a_hist_min_em",
-                    "handler": lambda: self.get_stock_min_em(clean_ticker, period=interval),
-                    "mapper": self._map_stock_min_em
-                },
-                {
-                    "name": "stock_zh_a_minute",
-                    "handler": lambda: self.get_stock_min_sina(clean_ticker, period=interval),
-                    "mapper": self._map_stock_min_sina
-                }
-            ]
+        
+        # 股票数据源
+        return circuit_breakers.order([
+            {
+                "name": "stock_zh_a_hist_min_em",
+                "source": "eastmoney",
+                "handler": lambda: self.get_stock_min_em(clean_ticker, period=interval, start_time=since),
+                "mapper": self._map_stock_min_em
+            },
+            {
+                "name": "stock_zh_a_minute",
+                "source": "sina",
+                "handler": lambda: self.get_stock_min_sina(clean_ticker, period=interval),
+                "mapper": self._map_stock_min_sina
+            }
+        ])
+    
+    def get_realtime_min_data(self, ticker: str, interval: str = '1') -> BarSeries:
+        """
+        获取实时分时数据，优先使用分时缓存，过期时只增量获取最新K线并自动尝试多个数据源
+        :param ticker: 股票或指数代码
+        :param interval: 分时间隔
+        :return: 标准化后的分时数据
+        """
+        cache_key = self.get_min_cache_key(ticker, interval)
+        cached, since = intraday_bar_cache.lookup(cache_key, self.get_min_window_start())
+        if cached is not None:
+            return cached
+        
+        # 多个工作进程同时需要刷新时只由获得刷新锁的进程访问上游，其余进程等待后读取共享的K线
+        with refresh_lock(shared_bar_key(cache_key)) as leader:
+            if not leader:
+                cached, since = intraday_bar_cache.lookup(cache_key, self.get_min_window_start())
+                if cached is not None:
+                    return cached
+            return self._fetch_min_data(ticker, interval, cache_key, since)
+    
+    def _fetch_min_data(
+        self, ticker: str, interval: str, cache_key: Tuple[str, str], since: Optional[str]
+    ) -> BarSeries:
+        """按顺序尝试各数据源获取分时数据并合并到缓存，全部失败时返回已缓存的旧数据"""
+        data_sources = self.get_min_data_sources(ticker, interval, since=since)
         
         # 尝试每个数据源
         all_errors = []
@@ -208,15 +488,9 @@ class StockDataProvider:
             try:
                 logger.info(f"尝试从 {source['name']} 获取 {ticker} 的分时数据")
                 df = source["handler"]()
-                
-                if df is not None and not df.empty:
-                    logger.info(f"成功从 {source['name']} 获取数据，条数: {len(df)}")
-                    # 使用映射函数转换数据格式
-                    result = source["mapper"](df)
-                    if result and len(result) > 0:
-                        return result
-                else:
-                    logger.warning(f"从 {source['name']} 获取的数据为空")
+                result = self.merge_min_result(cache_key, source, df, since)
+                if result is not None:
+                    return result
             except Exception as e:
                 error_msg = f"从 {source['name']} 获取数据时出错: {str(e)}"
                 logger.error(error_msg, exc_info=True)
@@ -225,103 +499,181 @@ class StockDataProvider:
         if all_errors:
             logger.error(f"所有数据源都失败: {'; '.join(all_errors)}")
         
-        return []
+        # 上游全部失败时返回已缓存的旧数据
+        return intraday_bar_cache.get_bars(cache_key)
     
-    def _map_stock_min_em(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
-        """映射东方财富分时数据格式"""
-        if df is None or df.empty:
-            return []
+    def get_min_cache_key(self, ticker: str, interval: str = '1') -> Tuple[str, str]:
+        """分时缓存的键 (标准化代码, 周期)"""
+        clean_ticker, _ = self.standardize_ticker(ticker)
+        return clean_ticker, interval
+    
+    def merge_min_result(
+        self,
+        cache_key: Tuple[str, str],
+        source: Dict[str, Any],
+        df: Optional[pd.DataFrame],
+        since: Optional[str],
+    ) -> Optional[BarSeries]:
+        """
+        处理单个数据源的返回结果，并合并到分时缓存
+        :param cache_key: 分时缓存的键
+        :param source: 数据源（见 get_min_data_sources）
+        :param df: 数据源返回的数据
+        :param since: 本次增量获取的起始时间
+        :return: 合并后的完整分时数据；结果无效时返回None，由调用方尝试下一个数据源
+        """
+        if df is not None and not df.empty:
+            logger.info(f"成功从 {source['name']} 获取数据，条数: {len(df)}")
+            # 使用映射函数转换数据格式
+            result = source["mapper"](df)
+            if result:
+                return intraday_bar_cache.merge(cache_key, result, self.get_min_window_start())
+        elif df is not None and since is not None:
+            # 增量获取时返回空表说明没有新的K线
+            logger.debug(f"{source['name']} 没有 {cache_key[0]} 在 {since} 之后的新数据")
+            intraday_bar_cache.touch(cache_key)
+            return intraday_bar_cache.get_bars(cache_key)
+        else:
+            logger.warning(f"从 {source['name']} 获取的数据为空")
+        return None
+    
+    @staticmethod
+    def resample_min_bars(bars: BarSeries, minutes: int) -> BarSeries:
+        """
+        将1分钟K线聚合为更长的分钟周期（向量化），按A股交易时段切分，与东方财富分钟K线的时间标签一致：
+        每根K线以结束时间为标签，午休不跨周期，如60分钟K线为 10:30、11:30、14:00、15:00
+        :param bars: 1分钟K线序列，按时间升序
+        :param minutes: 目标周期（分钟），需能整除上午时段的120分钟
+        :return: 聚合后的K线序列
+        """
+        if not bars:
+            return BarSeries(symbol=bars.symbol, interval=str(minutes))
+        if MORNING_SESSION_MINUTES % minutes:
+            raise ValueError(f"不支持的聚合周期: {minutes}")
         
-        quotes = []
-        try:
-            # 检查必要的列是否存在
-            required_cols = ["时间", "开盘", "收盘", "最高", "最低", "成交量"]
-            
-            if not all(col in df.columns for col in required_cols):
-                logger.warning(f"东方财富分时数据缺少必要列，现有列: {df.columns.tolist()}")
-                return []
-            
-            # 转换数据
-            for _, row in df.iterrows():
-                quote = {
-                    "date": row["时间"],
-                    "open": float(row["开盘"]),
-                    "close": float(row["收盘"]),
-                    "high": float(row["最高"]),
-                    "low": float(row["最低"]),
-                    "volume": float(row["成交量"]) if "成交量" in row else 0
-                }
-                quotes.append(quote)
-                
-            logger.debug(f"成功转换东方财富分时数据，条数: {len(quotes)}")
-            return quotes
-        except Exception as e:
-            logger.error(f"转换东方财富分时数据时出错: {str(e)}", exc_info=True)
-            return []
+        times = bars.dates
+        days = times.astype("M8[D]")
+        clock = (times - days).astype("int64") // 60
+        
+        # 换算为当日连续竞价的第几分钟：上午 0-120，下午 120-240；集合竞价和午休归入相邻时段
+        morning = np.clip(clock - (9 * 60 + 30), 0, MORNING_SESSION_MINUTES)
+        afternoon = np.clip(clock - 13 * 60, 0, MORNING_SESSION_MINUTES)
+        session_minute = np.where(clock < 13 * 60, morning, MORNING_SESSION_MINUTES + afternoon)
+        # 09:30的开盘K线并入第一个周期
+        bucket = np.maximum((session_minute + minutes - 1) // minutes, 1)
+        
+        keys = days.astype("int64") * 1000 + bucket
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        ends = np.r_[starts[1:] - 1, len(bars) - 1]
+        
+        # 周期结束时间换算回时钟时间
+        end_minute = bucket[starts] * minutes
+        label_clock = np.where(
+            end_minute <= MORNING_SESSION_MINUTES,
+            9 * 60 + 30 + end_minute,
+            13 * 60 + end_minute - MORNING_SESSION_MINUTES,
+        )
+        labels = days[starts].astype("M8[s]") + label_clock.astype("m8[m]")
+        
+        return BarSeries(
+            labels,
+            {
+                "open": bars.open[starts],
+                "close": bars.close[ends],
+                "high": np.maximum.reduceat(bars.high, starts),
+                "low": np.minimum.reduceat(bars.low, starts),
+                "volume": np.add.reduceat(bars.volume, starts),
+            },
+            bars.symbol, str(minutes),
+        )
     
-    def _map_stock_min_sina(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
-        """映射股票分钟数据格式(stock_zh_a_minute API)"""
+    @staticmethod
+    def compute_quote_stats(bars: BarSeries) -> Optional[Dict[str, float]]:
+        """
+        由当日分时数据计算报价字段（向量化聚合，不逐条扫描）
+        :param bars: 分时K线序列
+        :return: 报价字段 (price, previous_close, change, change_percent, day_high, day_low, open, volume)，无数据时返回None
+        """
+        if not bars:
+            return None
+        
+        # 计算涨跌幅
+        prev_close = float(bars.close[0])
+        current_price = float(bars.close[-1])
+        if prev_close > 0:
+            change = current_price - prev_close
+            change_percent = change / prev_close
+        else:
+            change = 0
+            change_percent = 0
+        
+        return {
+            "price": current_price,
+            "previous_close": prev_close,
+            "change": change,
+            "change_percent": change_percent,
+            "day_high": bars.day_high(),
+            "day_low": bars.day_low(),
+            "open": float(bars.open[0]),
+            "volume": bars.total_volume(),
+        }
+    
+    def _map_min_bars(self, df: pd.DataFrame, columns: Dict[str, str], label: str) -> BarSeries:
+        """
+        按列映射批量转换分时数据
+        :param df: akshare返回的分时数据
+        :param columns: 目标字段 -> 源列名，见 STOCK_MIN_EM_COLUMNS 等
+        :param label: 数据类型描述（用于日志）
+        :return: 标准化后的分时K线序列
+        """
         if df is None or df.empty:
-            return []
+            return BarSeries()
         
-        quotes = []
         try:
-            # 检查必要的列是否存在
-            required_cols = ["day", "open", "high", "low", "close", "volume"]
+            frame = convert_frame(df, columns, text_columns=("date",))
+            if frame is None:
+                logger.warning(f"{label}缺少必要列，现有列: {df.columns.tolist()}")
+                return BarSeries()
             
-            if not all(col in df.columns for col in required_cols):
-                logger.warning(f"股票分钟数据缺少必要列，现有列: {df.columns.tolist()}")
-                return []
-            
-            # 转换数据
-            for _, row in df.iterrows():
-                quote = {
-                    "date": row["day"],
-                    "open": float(row["open"]),
-                    "close": float(row["close"]),
-                    "high": float(row["high"]),
-                    "low": float(row["low"]),
-                    "volume": float(row["volume"]) if "volume" in row else 0
-                }
-                quotes.append(quote)
-                
-            logger.debug(f"成功转换股票分钟数据，条数: {len(quotes)}")
-            return quotes
+            bars = BarSeries.from_frame(frame)
+            logger.debug(f"成功转换{label}，条数: {len(bars)}")
+            return bars
         except Exception as e:
-            logger.error(f"转换股票分钟数据失败: {e}", exc_info=True)
-            return []
+            logger.error(f"转换{label}失败: {e}", exc_info=True)
+            return BarSeries()
+    
+    def _map_stock_min_em(self, df: pd.DataFrame) -> BarSeries:
+        """映射东方财富分时数据格式"""
+        return self._map_min_bars(df, STOCK_MIN_EM_COLUMNS, "东方财富分时数据")
     
-    def _map_index_min_sina(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def _map_stock_min_sina(self, df: pd.DataFrame) -> BarSeries:
+        """映射股票分钟数据格式(stock_zh_a_minute API)"""
+        return self._map_min_bars(df, STOCK_MIN_SINA_COLUMNS, "股票分钟数据")
+    
+    def _map_index_min_sina(self, df: pd.DataFrame) -> BarSeries:
         """映射指数分钟数据格式(index_zh_a_hist_min_em API)"""
-        if df is None or df.empty:
-            return []
+        return self._map_min_bars(df, INDEX_MIN_EM_COLUMNS, "指数分钟数据")
+
+    def _map_daily_records(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        将东方财富日线数据转换为历史数据存储的记录格式
+        :param df: stock_zh_a_hist / index_zh_a_hist 返回的日线数据
+        :return: HISTORY_DTYPE 数组，按日期升序且日期唯一
+        """
+        frame = convert_frame(df, DAILY_EM_COLUMNS, text_columns=("date",)) if not df.empty else None
+        if frame is None:
+            if not df.empty:
+                logger.warning(f"日线数据缺少必要列，现有列: {df.columns.tolist()}")
+            return np.empty(0, dtype=HISTORY_DTYPE)
         
-        quotes = []
-        try:
-            # 检查必要的列是否存在
-            required_cols = ["时间", "开盘", "收盘", "最高", "最低", "成交量"]
-            
-            if not all(col in df.columns for col in required_cols):
-                logger.warning(f"指数分钟数据缺少必要列，现有列: {df.columns.tolist()}")
-                return []
-            
-            # 转换数据
-            for _, row in df.iterrows():
-                quote = {
-                    "date": row["时间"],
-                    "open": float(row["开盘"]),
-                    "close": float(row["收盘"]),
-                    "high": float(row["最高"]),
-                    "low": float(row["最低"]),
-                    "volume": float(row["成交量"]) if "成交量" in row else 0
-                }
-                quotes.append(quote)
-                
-            logger.debug(f"成功转换指数分钟数据，条数: {len(quotes)}")
-            return quotes
-        except Exception as e:
-            logger.error(f"转换指数分钟数据失败: {e}", exc_info=True)
-            return []
+        records = np.empty(len(frame), dtype=HISTORY_DTYPE)
+        records["date"] = pd.to_datetime(frame["date"]).to_numpy().astype("M8[D]")
+        for column in ("open", "high", "low", "close", "volume"):
+            records[column] = frame[column].to_numpy()
+        
+        records.sort(order="date")
+        _, unique = np.unique(records["date"], return_index=True)
+        return records[unique]
 
 # 创建全局数据提供者实例
 stock_data_provider = StockDataProvider() 
\ No newline at end of file
@@ -0,0 +1,183 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from .logger import get_logger
+from .trading_calendar import is_trading_time
+
+logger = get_logger(__name__)
+
+# 订阅键 (代码, 周期)
+StreamKey = Tuple[str, str]
+
+# 推送事件 (事件类型, 数据)
+StreamEvent = Tuple[str, Dict[str, Any]]
+
+# 获取最新数据的协程函数：(代码, 周期) -> (K线列表, 报价)
+StreamFetcher = Callable[[str, str], Awaitable[Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]]]
+
+
+class StreamSubscriber:
+    """一个推送连接，可同时订阅多个代码，所有事件进入同一个队列"""
+
+    def __init__(self, max_queue: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.keys: Set[StreamKey] = set()
+
+
+class _TickerState:
+    """单个订阅键的轮询状态：最近一次推送的K线和报价"""
+
+    def __init__(self):
+        self.bars: List[Dict[str, Any]] = []
+        self.quote: Dict[str, Any] = {}
+        self.ready = False
+        self.subscribers: Set[StreamSubscriber] = set()
+        self.task: Optional[asyncio.Task] = None
+
+
+class StreamHub:
+    """
+    行情推送中心
+
+    每个 (代码, 周期) 在服务端只有一个轮询任务，结果分发给所有订阅者：
+    新订阅者先收到完整快照（snapshot），之后只收到新增或更新的K线（bars）和变化的报价字段（quote）。
+    最后一个订阅者离开时停止轮询。
+
+    轮询间隔可通过环境变量配置：
+    - STREAM_POLL_SECONDS: 交易时间内的轮询间隔
+    - STREAM_OFF_HOURS_POLL_SECONDS: 非交易时间的轮询间隔
+    """
+
+    def __init__(
+        self,
+        fetcher: StreamFetcher,
+        poll_interval: Optional[float] = None,
+        off_hours_poll_interval: Optional[float] = None,
+        max_queue: int = 100,
+    ):
+        """
+        :param fetcher: 获取最新K线和报价的协程函数
+        :param poll_interval: 交易时间内的轮询间隔（秒）
+        :param off_hours_poll_interval: 非交易时间的轮询间隔（秒）
+        :param max_queue: 每个订阅者最多积压的事件数，超过后丢弃积压并重新发送快照
+        """
+        self._fetcher = fetcher
+        self.poll_interval = (
+            poll_interval if poll_interval is not None
+            else float(os.getenv("STREAM_POLL_SECONDS", "3"))
+        )
+        self.off_hours_poll_interval = (
+            off_hours_poll_interval if off_hours_poll_interval is not None
+            else float(os.getenv("STREAM_OFF_HOURS_POLL_SECONDS", "60"))
+        )
+        self.max_queue = max_queue
+        self._states: Dict[StreamKey, _TickerState] = {}
+
+    def subscribe(self, keys: List[StreamKey]) -> StreamSubscriber:
+        """
+        创建订阅
+        :param keys: 订阅的 (代码, 周期) 列表
+        :return: 订阅者，从其 queue 中读取事件
+        """
+        subscriber = StreamSubscriber(self.max_queue)
+        for key in keys:
+            state = self._states.get(key)
+            if state is None:
+                state = self._states[key] = _TickerState()
+            state.subscribers.add(subscriber)
+            subscriber.keys.add(key)
+
+            if state.ready:
+                self._send(subscriber, self._snapshot_event(key, state))
+            if state.task is None or state.task.done():
+                state.task = asyncio.ensure_future(self._poll(key, state))
+                logger.info(f"启动 {key} 的行情推送轮询")
+        return subscriber
+
+    def unsubscribe(self, subscriber: StreamSubscriber) -> None:
+        """取消订阅，没有订阅者的代码停止轮询"""
+        for key in subscriber.keys:
+            state = self._states.get(key)
+            if state is None:
+                continue
+            state.subscribers.discard(subscriber)
+            if not state.subscribers:
+                if state.task is not None:
+                    state.task.cancel()
+                del self._states[key]
+                logger.info(f"停止 {key} 的行情推送轮询")
+        subscriber.keys.clear()
+
+    def close(self) -> None:
+        """停止所有轮询任务"""
+        for state in self._states.values():
+            if state.task is not None:
+                state.task.cancel()
+        self._states.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """推送统计"""
+        return {
+            "tickers": len(self._states),
+            "subscribers": sum(len(state.subscribers) for state in self._states.values()),
+        }
+
+    async def _poll(self, key: StreamKey, state: _TickerState) -> None:
+        """单个订阅键的轮询任务"""
+        ticker, interval = key
+        while state.subscribers:
+            try:
+                bars, quote = await self._fetcher(ticker, interval)
+                for event in self._diff(key, state, bars, quote or {}):
+                    for subscriber in list(state.subscribers):
+                        self._send(subscriber, event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"{key} 行情推送轮询失败: {e}", exc_info=True)
+
+            await asyncio.sleep(self.poll_interval if is_trading_time() else self.off_hours_poll_interval)
+
+    def _diff(
+        self, key: StreamKey, state: _TickerState, bars: List[Dict[str, Any]], quote: Dict[str, Any]
+    ) -> List[StreamEvent]:
+        """与上次推送的数据比较，返回需要推送的事件，并更新状态"""
+        if not state.ready:
+            state.bars, state.quote, state.ready = bars, quote, True
+            return [self._snapshot_event(key, state)]
+
+        events: List[StreamEvent] = []
+        if bars is not state.bars:
+            # 从上次最后一根K线（可能仍在更新）开始比较，只推送新增或变化的K线
+            last = state.bars[-1] if state.bars else None
+            last_date = last["date"] if last else ""
+            start = len(bars)
+            while start > 0 and bars[start - 1]["date"] >= last_date:
+                start -= 1
+            changed = [bar for bar in bars[start:] if bar != last]
+            if changed:
+                events.append(("bars", {"ticker": key[0], "interval": key[1], "bars": changed}))
+            state.bars = bars
+
+        delta = {field: value for field, value in quote.items() if state.quote.get(field) != value}
+        if delta:
+            events.append(("quote", {"ticker": key[0], "quote": delta}))
+            state.quote = quote
+        return events
+
+    @staticmethod
+    def _snapshot_event(key: StreamKey, state: _TickerState) -> StreamEvent:
+        return "snapshot", {"ticker": key[0], "interval": key[1], "bars": state.bars, "quote": state.quote}
+
+    def _send(self, subscriber: StreamSubscriber, event: StreamEvent) -> None:
+        """向订阅者发送事件；积压过多时丢弃积压并为其订阅的代码重新发送快照"""
+        try:
+            subscriber.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("推送订阅者积压过多，丢弃积压事件并重新发送快照")
+            while not subscriber.queue.empty():
+                subscriber.queue.get_nowait()
+            for key in subscriber.keys:
+                state = self._states.get(key)
+                if state is not None and state.ready:
+                    subscriber.queue.put_nowait(self._snapshot_event(key, state))
@@ -0,0 +1,241 @@
+import asyncio
+import bisect
+import heapq
+import os
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+# (代码, 名称, 交易所, 类型)
+SymbolRow = Tuple[str, str, str, str]
+
+# 匹配类型，数值越小排名越靠前
+MATCH_CODE_EXACT = 0
+MATCH_CODE_PREFIX = 1
+MATCH_NAME_EXACT = 2
+MATCH_NAME_PREFIX = 3
+MATCH_INITIALS_PREFIX = 4
+MATCH_NAME_SUBSTRING = 5
+MATCH_INITIALS_SUBSTRING = 6
+
+
+def get_name_initials(name: str) -> str:
+    """
+    获取名称的拼音首字母（如 贵州茅台 -> gzmt），未安装pypinyin时返回空字符串
+    :param name: 中文名称
+    :return: 小写拼音首字母
+    """
+    try:
+        from pypinyin import Style, lazy_pinyin
+    except ImportError:
+        return ""
+    parts = lazy_pinyin(name, style=Style.FIRST_LETTER)
+    return "".join(ch for ch in "".join(parts).lower() if ch.isalnum())
+
+
+class SymbolEntry:
+    """索引中的单个证券"""
+
+    __slots__ = ("symbol", "name", "exchange", "quote_type", "code", "name_key", "initials")
+
+    def __init__(self, symbol: str, name: str, exchange: str, quote_type: str):
+        self.symbol = symbol
+        self.name = name
+        self.exchange = exchange
+        self.quote_type = quote_type
+        # 用于匹配的小写代码（指数代码去掉sh/sz前缀后也可匹配）
+        self.code = symbol.lower()
+        self.name_key = name.lower()
+        self.initials = get_name_initials(name)
+
+
+class _IndexState:
+    """一次构建出的只读索引，刷新时整体替换"""
+
+    def __init__(self, rows: Iterable[SymbolRow]):
+        self.entries: List[SymbolEntry] = []
+        seen = set()
+        for symbol, name, exchange, quote_type in rows:
+            if not symbol or symbol in seen:
+                continue
+            seen.add(symbol)
+            self.entries.append(SymbolEntry(symbol, name, exchange, quote_type))
+
+        # 代码前缀查找：按代码排序后二分查找
+        code_keys = []
+        for i, entry in enumerate(self.entries):
+            code_keys.append((entry.code, i))
+            if entry.code[:2] in ("sh", "sz") and entry.code[2:].isdigit():
+                code_keys.append((entry.code[2:], i))
+        code_keys.sort()
+        self.code_keys = [key for key, _ in code_keys]
+        self.code_ids = [i for _, i in code_keys]
+
+        # 名称/拼音首字母子串查找：字符倒排索引，候选集取交集后再校验
+        self.char_index: Dict[str, Set[int]] = {}
+        for i, entry in enumerate(self.entries):
+            for ch in set(entry.name_key + entry.initials):
+                self.char_index.setdefault(ch, set()).add(i)
+
+
+class SymbolIndex:
+    """
+    内存证券代码索引，用于 /stock/search
+
+    支持代码前缀、名称子串和拼音首字母匹配，结果按匹配类型排序后返回前k条。
+    索引由后台任务定期重建，查询不访问网络。
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Awaitable[Optional[List[SymbolRow]]]],
+        static_symbols: Optional[List[SymbolRow]] = None,
+        refresh_interval: Optional[float] = None,
+    ):
+        """
+        :param loader: 加载证券列表的协程函数（会访问上游）
+        :param static_symbols: 固定加入索引的证券（如主要指数），上游失败时也可查询
+        :param refresh_interval: 后台重建间隔（秒）
+        """
+        self._loader = loader
+        self._static_symbols = list(static_symbols or [])
+        self.refresh_interval = (
+            refresh_interval if refresh_interval is not None
+            else float(os.getenv("SYMBOL_INDEX_REFRESH_SECONDS", str(6 * 3600)))
+        )
+        # 只含固定证券的初始索引在首次查询时构建（计算拼音首字母需要导入较重的pypinyin，不放在服务启动路径上）
+        self._state: Optional[_IndexState] = None
+        self._loaded = False
+        self._load_lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.built_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        """是否已成功从上游加载过证券列表"""
+        return self._loaded
+
+    @property
+    def state(self) -> _IndexState:
+        """当前索引"""
+        if self._state is None:
+            self._state = _IndexState(self._static_symbols)
+        return self._state
+
+    def __len__(self) -> int:
+        return len(self.state.entries)
+
+    async def refresh(self) -> bool:
+        """
+        从上游重新加载证券列表并重建索引
+        :return: 是否成功
+        """
+        started = time.monotonic()
+        try:
+            rows = await self._loader()
+        except Exception as e:
+            logger.error(f"加载证券列表失败: {e}", exc_info=True)
+            return False
+        if not rows:
+            logger.warning("加载到的证券列表为空，保留现有索引")
+            return False
+
+        # 计算拼音首字母和倒排索引是CPU密集操作，放到线程中执行
+        loop = asyncio.get_running_loop()
+        self._state = await loop.run_in_executor(None, _IndexState, self._static_symbols + list(rows))
+        self._loaded = True
+        self.built_at = time.time()
+        logger.info(f"证券代码索引已重建，条数: {len(self._state.entries)}，耗时: {time.monotonic() - started:.2f}s")
+        return True
+
+    async def ensure_loaded(self) -> bool:
+        """索引尚未加载时加载一次（并发调用方只会触发一次加载）"""
+        if self._loaded:
+            return True
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if self._loaded:
+                return True
+            return await self.refresh()
+
+    def ensure_loading(self) -> bool:
+        """
+        不等待上游：索引尚未加载成功时确保后台加载任务在运行（失败时由它重试），查询先使用现有索引
+        :return: 是否已就绪
+        """
+        if not self._loaded:
+            self.start_background_refresh()
+        return self._loaded
+
+    def start_background_refresh(self) -> None:
+        """在当前事件循环中启动后台任务：立即加载一次，之后按间隔定期重建"""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+
+        async def _run():
+            while True:
+                if not await self.ensure_loaded():
+                    # 加载失败时较快重试
+                    await asyncio.sleep(min(60.0, self.refresh_interval))
+                    continue
+                await asyncio.sleep(self.refresh_interval)
+                await self.refresh()
+
+        self._refresh_task = asyncio.ensure_future(_run())
+
+    def stop_background_refresh(self) -> None:
+        """停止后台重建任务"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    def search(self, query: str, limit: int = 20) -> List[SymbolEntry]:
+        """
+        搜索证券
+        :param query: 代码、名称或拼音首字母
+        :param limit: 最多返回条数
+        :return: 按相关度排序的证券列表
+        """
+        state = self.state
+        q = query.strip().lower()
+        if not q or limit <= 0:
+            return []
+
+        best: Dict[int, int] = {}
+
+        def _add(i: int, rank: int):
+            if rank < best.get(i, MATCH_INITIALS_SUBSTRING + 1):
+                best[i] = rank
+
+        # 代码前缀
+        lo = bisect.bisect_left(state.code_keys, q)
+        hi = bisect.bisect_right(state.code_keys, q + "\uffff")
+        for pos in range(lo, hi):
+            i = state.code_ids[pos]
+            _add(i, MATCH_CODE_EXACT if state.code_keys[pos] == q else MATCH_CODE_PREFIX)
+
+        # 名称、拼音首字母
+        postings = sorted((state.char_index.get(ch, ()) for ch in set(q)), key=len)
+        candidates = set(postings[0]).intersection(*postings[1:]) if postings[0] else ()
+        for i in candidates:
+            entry = state.entries[i]
+            if entry.name_key == q:
+                _add(i, MATCH_NAME_EXACT)
+            elif entry.name_key.startswith(q):
+                _add(i, MATCH_NAME_PREFIX)
+            elif entry.initials.startswith(q):
+                _add(i, MATCH_INITIALS_PREFIX)
+            elif q in entry.name_key:
+                _add(i, MATCH_NAME_SUBSTRING)
+            elif q in entry.initials:
+                _add(i, MATCH_INITIALS_SUBSTRING)
+
+        ranked = heapq.nsmallest(
+            limit,
+            best.items(),
+            key=lambda item: (item[1], len(state.entries[item[0]].name), state.entries[item[0]].code),
+        )
+        return [state.entries[i] for i, _ in ranked]
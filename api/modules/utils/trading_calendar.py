@@ -0,0 +1,156 @@
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable, Optional, Set
+
+# A股交易所使用北京时间（无夏令时），不依赖服务器所在时区
+CHINA_TZ = timezone(timedelta(hours=8))
+
+# 开盘集合竞价开始时间
+AUCTION_OPEN = time(9, 15)
+
+# A股连续竞价时段
+MORNING_OPEN = time(9, 30)
+MORNING_CLOSE = time(11, 30)
+AFTERNOON_OPEN = time(13, 0)
+AFTERNOON_CLOSE = time(15, 0)
+
+# 收盘后上游日线数据定稿的时间
+SESSION_SETTLED = time(15, 30)
+
+# 市场阶段
+PHASE_AUCTION = "auction"
+PHASE_SESSION = "session"
+PHASE_LUNCH = "lunch"
+PHASE_CLOSED = "closed"
+PHASE_HOLIDAY = "holiday"
+
+# 阶段切换的时间点（按时间升序）
+PHASE_BOUNDARIES = (AUCTION_OPEN, MORNING_OPEN, MORNING_CLOSE, AFTERNOON_OPEN, AFTERNOON_CLOSE)
+
+# 交易日历（由后台任务从上游加载），未加载或超出范围的日期只按周末判断
+_trade_dates: Optional[Set[date]] = None
+_trade_dates_last: Optional[date] = None
+
+
+def china_now() -> datetime:
+    """获取当前北京时间（不带时区信息，便于与akshare返回的时间字符串比较）"""
+    return datetime.now(CHINA_TZ).replace(tzinfo=None)
+
+
+def set_trade_dates(dates: Iterable[date]) -> None:
+    """
+    设置交易日历（如 tool_trade_date_hist_sina 返回的交易日）
+    :param dates: 全部交易日
+    """
+    global _trade_dates, _trade_dates_last
+    trade_dates = set(dates)
+    if trade_dates:
+        _trade_dates, _trade_dates_last = trade_dates, max(trade_dates)
+
+
+def is_trade_date(day: date) -> bool:
+    """
+    判断某日是否为交易日
+    :param day: 日期
+    :return: 是否为交易日（周末和已知的节假日返回False）
+    """
+    if day.weekday() >= 5:
+        return False
+    if _trade_dates is None or day > _trade_dates_last:
+        return True
+    return day in _trade_dates
+
+
+def is_trading_time(now: Optional[datetime] = None) -> bool:
+    """
+    判断当前是否处于A股交易时段
+    :param now: 北京时间，默认取当前时间
+    :return: 是否为交易时间
+    """
+    now = now or china_now()
+
+    # 周末和节假日休市
+    if not is_trade_date(now.date()):
+        return False
+
+    current = now.time()
+    return (
+        MORNING_OPEN <= current <= MORNING_CLOSE
+        or AFTERNOON_OPEN <= current <= AFTERNOON_CLOSE
+    )
+
+
+def last_completed_session(now: Optional[datetime] = None) -> date:
+    """
+    获取最近一个已收盘且数据已稳定的交易日
+    :param now: 北京时间，默认取当前时间
+    :return: 交易日日期
+    """
+    now = now or china_now()
+    day = now.date()
+    # 当日收盘后留出一段时间等待上游日线数据定稿
+    if not is_trade_date(day) or now.time() < SESSION_SETTLED:
+        day -= timedelta(days=1)
+    while not is_trade_date(day):
+        day -= timedelta(days=1)
+    return day
+
+
+def current_session(now: Optional[datetime] = None) -> date:
+    """
+    获取当前行情数据所属的交易日：交易日集合竞价开始后为当天，否则为上一个交易日
+    :param now: 北京时间，默认取当前时间
+    :return: 交易日日期
+    """
+    now = now or china_now()
+    day = now.date()
+    if not is_trade_date(day) or now.time() < AUCTION_OPEN:
+        day -= timedelta(days=1)
+    while not is_trade_date(day):
+        day -= timedelta(days=1)
+    return day
+
+
+def is_session_complete(day: date, now: Optional[datetime] = None) -> bool:
+    """
+    判断某交易日的行情是否已定稿（收盘且数据已稳定，之后不会再变化）
+    :param day: 交易日
+    :param now: 北京时间，默认取当前时间
+    :return: 是否已定稿
+    """
+    return day <= last_completed_session(now)
+
+
+def market_phase(now: Optional[datetime] = None) -> str:
+    """
+    获取当前市场阶段
+    :param now: 北京时间，默认取当前时间
+    :return: auction(集合竞价), session(连续竞价), lunch(午休), closed(盘前/盘后), holiday(周末/节假日)
+    """
+    now = now or china_now()
+    if not is_trade_date(now.date()):
+        return PHASE_HOLIDAY
+
+    current = now.time()
+    if AUCTION_OPEN <= current < MORNING_OPEN:
+        return PHASE_AUCTION
+    if MORNING_OPEN <= current < MORNING_CLOSE or AFTERNOON_OPEN <= current < AFTERNOON_CLOSE:
+        return PHASE_SESSION
+    if MORNING_CLOSE <= current < AFTERNOON_OPEN:
+        return PHASE_LUNCH
+    return PHASE_CLOSED
+
+
+def seconds_until_next_phase(now: Optional[datetime] = None) -> float:
+    """
+    距离下一个阶段切换时间点的秒数（非交易日或收盘后为下一个自然日的集合竞价开始时间）
+    :param now: 北京时间，默认取当前时间
+    :return: 秒数
+    """
+    now = now or china_now()
+    if is_trade_date(now.date()):
+        for boundary in PHASE_BOUNDARIES:
+            at = datetime.combine(now.date(), boundary)
+            if at > now:
+                return (at - now).total_seconds()
+    next_open = datetime.combine(now.date() + timedelta(days=1), AUCTION_OPEN)
+    return (next_open - now).total_seconds()
@@ -0,0 +1,185 @@
+"""
+API 负载基准
+
+通过 httpx 的 ASGI 传输直接驱动 FastAPI 应用（不经过网络和 uvicorn），
+上游数据全部来自回放数据源，结果可重复。按配置的并发度请求各接口，
+输出每个接口的吞吐量和 p50/p95/p99 耗时。
+
+默认生成合成夹具；使用真实数据时先在 DATA_SOURCE=record 下运行服务并访问页面录制夹具，
+再通过 --fixtures 指定录制目录。
+
+运行: python -m benchmarks.bench_api --concurrency 20 --requests 500
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+# 在导入服务之前配置：关闭后台预取、降低日志级别、使用独立的历史数据和磁盘缓存目录
+os.environ.setdefault("PREFETCH_ENABLED", "0")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("HISTORY_STORE_DIR", tempfile.mkdtemp(prefix="bench-history-"))
+os.environ.setdefault("DISK_CACHE_DIR", tempfile.mkdtemp(prefix="bench-cache-"))
+
+import httpx
+import numpy as np
+import pandas as pd
+from api.modules.utils.data_source import ReplaySource, use_data_source
+from benchmarks.bench_frame_mapper import make_min_frame, make_spot_frame
+
+# 合成夹具中的股票数量和压测使用的代码
+SPOT_ROWS = 5000
+BENCH_TICKERS = ["sh600001", "sh600003", "sz000002", "sz000004", "sh600005"]
+BENCH_INDICES = ["sh000300", "sh000016"]
+
+# 各接口的请求路径（按顺序轮换代码）
+ENDPOINTS: Dict[str, List[str]] = {
+    "chart_1m": [f"/api/py/stock/chart?ticker={t}&interval=1m" for t in BENCH_TICKERS + BENCH_INDICES],
+    "chart_5m": [f"/api/py/stock/chart?ticker={t}&interval=5m" for t in BENCH_TICKERS],
+    "chart_1d": [f"/api/py/stock/chart?ticker={t}&interval=1d&range=1y" for t in BENCH_TICKERS],
+    "quote": [f"/api/py/stock/quote?ticker={t}" for t in BENCH_TICKERS + BENCH_INDICES],
+    "quote_summary": [f"/api/py/stock/quoteSummary?ticker={t}" for t in BENCH_TICKERS],
+    "screener": [
+        f"/api/py/stock/screener?screener={s}&count=40"
+        for s in ("most_actives", "day_gainers", "day_losers", "small_cap_gainers", "growth_technology_stocks")
+    ],
+    "screener_query": ["/api/py/stock/screener/query?q=pe<20 and marketCap>1e10 sort -changePct limit 50"],
+    "search": [f"/api/py/stock/search?ticker={q}" for q in ("6000", "股票1", "gp", "sz00", "沪深")],
+}
+
+
+def make_daily_frame(days: int) -> pd.DataFrame:
+    """构造东方财富日线格式的测试数据"""
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize() - pd.Timedelta(days=1), periods=days)
+    prices = 10 + np.cumsum(np.random.randn(days) * 0.1)
+    return pd.DataFrame({
+        "日期": dates.strftime("%Y-%m-%d"),
+        "开盘": prices,
+        "收盘": prices + 0.05,
+        "最高": prices + 0.1,
+        "最低": prices - 0.1,
+        "成交量": np.random.randint(1000, 100000, days),
+        "成交额": prices * 1e6,
+    })
+
+
+def make_index_spot_frame() -> pd.DataFrame:
+    """构造新浪指数行情格式的测试数据"""
+    codes = ["sh000001", "sh000016", "sh000300", "sh000852", "sz399001", "sz399006"]
+    r = np.random.rand(len(codes))
+    return pd.DataFrame({
+        "代码": codes,
+        "名称": ["上证指数", "上证50", "沪深300", "中证1000", "深证成指", "创业板指"],
+        "最新价": 3000 + r * 100,
+        "涨跌额": r - 0.5,
+        "涨跌幅": r * 2 - 1,
+        "昨收": 3000.0,
+        "今开": 3000.0,
+        "最高": 3100.0,
+        "最低": 2900.0,
+        "成交量": r * 1e9,
+        "成交额": r * 1e11,
+    })
+
+
+def write_synthetic_fixtures(root: str) -> None:
+    """
+    生成回放数据源使用的合成夹具（每个akshare函数一个，不区分代码）
+    :param root: 夹具目录
+    """
+    os.makedirs(root, exist_ok=True)
+    spot = make_spot_frame(SPOT_ROWS)
+    spot["今开"] = spot["开盘"]
+    min_em = make_min_frame(240)
+    min_em["时间"] = pd.Timestamp.today().strftime("%Y-%m-%d ") + pd.to_datetime(min_em["时间"]).dt.strftime("%H:%M:%S")
+    min_sina = min_em.rename(columns={"时间": "day", "开盘": "open", "收盘": "close", "最高": "high", "最低": "low", "成交量": "volume"})
+    fixtures = {
+        "stock_zh_a_spot_em": spot,
+        "stock_info_a_code_name": spot[["代码", "名称"]].rename(columns={"代码": "code", "名称": "name"}),
+        "stock_zh_index_spot_sina": make_index_spot_frame(),
+        "tool_trade_date_hist_sina": pd.DataFrame({"trade_date": pd.bdate_range("2020-01-01", "2030-12-31").date}),
+        "stock_zh_a_hist_min_em": min_em,
+        "index_zh_a_hist_min_em": min_em,
+        "stock_zh_a_minute": min_sina,
+        "stock_zh_a_hist": make_daily_frame(500),
+        "index_zh_a_hist": make_daily_frame(500),
+    }
+    for name, frame in fixtures.items():
+        frame.to_pickle(os.path.join(root, f"{name}.pkl"))
+
+
+async def run_endpoint(
+    client: httpx.AsyncClient, paths: List[str], total: int, concurrency: int
+) -> Tuple[List[float], Dict[int, int], float]:
+    """
+    以固定并发度请求一个接口
+    :param client: ASGI客户端
+    :param paths: 轮换请求的路径
+    :param total: 请求总数
+    :param concurrency: 并发度
+    :return: (每个请求的耗时秒数, {状态码: 次数}, 总耗时秒数)
+    """
+    latencies: List[float] = []
+    statuses: Dict[int, int] = defaultdict(int)
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        for i in counter:
+            started = time.perf_counter()
+            response = await client.get(paths[i % len(paths)])
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - started
+
+
+async def main(args: argparse.Namespace) -> None:
+    fixtures = args.fixtures
+    if fixtures is None:
+        fixtures = tempfile.mkdtemp(prefix="bench-fixtures-")
+        write_synthetic_fixtures(fixtures)
+        print(f"合成夹具目录: {fixtures}")
+
+    latency = tuple(float(v) for v in args.latency_ms.split(",")) if args.latency_ms else None
+    source = ReplaySource(fixtures, (latency[0], latency[-1]) if latency else None)
+    use_data_source(source)
+
+    from api.index import app
+
+    endpoints = args.endpoints.split(",") if args.endpoints else list(ENDPOINTS)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        # 预热：填充缓存和证券代码索引，不计入结果
+        for name in endpoints:
+            for path in ENDPOINTS[name]:
+                await client.get(path)
+
+        print(f"\n并发度 {args.concurrency}，每个接口 {args.requests} 次请求")
+        print(f"{'接口':<16}{'请求/秒':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}  状态码")
+        for name in endpoints:
+            latencies, statuses, elapsed = await run_endpoint(client, ENDPOINTS[name], args.requests, args.concurrency)
+            p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+            codes = ", ".join(f"{code}:{count}" for code, count in sorted(statuses.items()))
+            print(f"{name:<16}{len(latencies) / elapsed:>10.1f}{p50:>10.2f}{p95:>10.2f}{p99:>10.2f}  {codes}")
+
+    print(f"\n回放调用: {source.calls}，未命中夹具: {source.misses}")
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="API 负载基准（回放数据源）")
+    parser.add_argument("--fixtures", help="夹具目录（默认生成合成夹具）")
+    parser.add_argument("--concurrency", type=int, default=10, help="并发请求数")
+    parser.add_argument("--requests", type=int, default=200, help="每个接口的请求数")
+    parser.add_argument("--endpoints", help=f"逗号分隔的接口，可选: {','.join(ENDPOINTS)}")
+    parser.add_argument("--latency-ms", help="模拟上游耗时范围（毫秒），如 50,200")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args(sys.argv[1:])))
@@ -0,0 +1,127 @@
+"""
+DataFrame -> quotes 转换微基准
+
+对比原 iterrows() 逐行转换与按列映射的批量转换，在240行（一个交易日的1分钟K线）
+和5000行（全市场行情快照）两种规模上的耗时。
+
+运行: python -m benchmarks.bench_frame_mapper
+"""
+import timeit
+import numpy as np
+import pandas as pd
+from api.modules.utils.frame_mapper import convert_frame, frame_to_columns
+from api.modules.utils.screener_engine import to_screener_quotes
+from api.modules.utils.stock_data_provider import STOCK_MIN_EM_COLUMNS, stock_data_provider
+
+
+def make_min_frame(rows: int) -> pd.DataFrame:
+    """构造东方财富分时数据格式的测试数据"""
+    times = pd.date_range("2025-03-05 09:31:00", periods=rows, freq="min")
+    prices = 10 + np.cumsum(np.random.randn(rows) * 0.01)
+    return pd.DataFrame({
+        "时间": times.strftime("%Y-%m-%d %H:%M:%S"),
+        "开盘": prices,
+        "收盘": prices + 0.01,
+        "最高": prices + 0.02,
+        "最低": prices - 0.02,
+        "成交量": np.random.randint(100, 10000, rows),
+        "成交额": prices * 1000,
+        "均价": prices,
+    })
+
+
+def make_spot_frame(rows: int) -> pd.DataFrame:
+    """构造东方财富A股行情快照格式的测试数据"""
+    r = np.random.rand(rows)
+    frame = pd.DataFrame({
+        "代码": [f"{600000 + i:06d}" if i % 2 else f"{i:06d}" for i in range(rows)],
+        "名称": [f"股票{i}" for i in range(rows)],
+        "最新价": 10 + r,
+        "涨跌幅": r * 10 - 5,
+        "涨跌额": r - 0.5,
+        "成交量": r * 1e6,
+        "成交额": r * 1e8,
+        "最高": 11.0,
+        "最低": 9.0,
+        "开盘": 10.0,
+        "昨收": 10.0,
+        "市盈率-动态": np.where(r > 0.9, np.nan, r * 50),
+        "总市值": r * 1e11,
+        "所处行业": np.where(r > 0.5, "电子", "银行"),
+    })
+    return frame
+
+
+def legacy_map_min(df: pd.DataFrame) -> list:
+    """原 _map_stock_min_em 的逐行实现"""
+    quotes = []
+    for _, row in df.iterrows():
+        quotes.append({
+            "date": row["时间"],
+            "open": float(row["开盘"]),
+            "close": float(row["收盘"]),
+            "high": float(row["最高"]),
+            "low": float(row["最低"]),
+            "volume": float(row["成交量"]) if "成交量" in row else 0,
+        })
+    return quotes
+
+
+def legacy_map_screener(df: pd.DataFrame) -> list:
+    """原 stock_screener 响应循环的逐行实现"""
+    quotes = []
+    for _, row in df.iterrows():
+        symbol = row["代码"]
+        if symbol.startswith(("0", "3")):
+            display_symbol = f"sz{symbol}"
+        elif symbol.startswith("6"):
+            display_symbol = f"sh{symbol}"
+        else:
+            display_symbol = symbol
+        quotes.append({
+            "symbol": display_symbol,
+            "shortName": row["名称"],
+            "regularMarketPrice": float(row["最新价"]),
+            "regularMarketChange": float(row["涨跌额"]),
+            "regularMarketChangePercent": float(row["涨跌幅"]) / 100,
+            "regularMarketVolume": float(row["成交量"]) if "成交量" in row and not pd.isna(row["成交量"]) else 0,
+            "regularMarketDayHigh": float(row["最高"]) if "最高" in row and not pd.isna(row["最高"]) else 0,
+            "regularMarketDayLow": float(row["最低"]) if "最低" in row and not pd.isna(row["最低"]) else 0,
+            "regularMarketOpen": float(row["开盘"]) if "开盘" in row and not pd.isna(row["开盘"]) else 0,
+            "regularMarketPreviousClose": float(row["昨收"]) if "昨收" in row and not pd.isna(row["昨收"]) else 0,
+            "trailingPE": float(row["市盈率-动态"]) if "市盈率-动态" in row and not pd.isna(row["市盈率-动态"]) else 0,
+            "marketCap": float(row["总市值"]) if "总市值" in row else 0,
+            "averageDailyVolume3Month": float(row["成交量"]) if "成交量" in row and not pd.isna(row["成交量"]) else 0,
+            "sector": row["所处行业"] if "所处行业" in row else "未知",
+            "currency": "CNY",
+        })
+    return quotes
+
+
+def bench(label: str, func, repeat: int = 5, number: int = 3) -> float:
+    """执行基准测试，返回单次调用的最佳耗时（毫秒）"""
+    best = min(timeit.repeat(func, repeat=repeat, number=number)) / number * 1000
+    print(f"  {label:<28} {best:10.3f} ms")
+    return best
+
+
+def main():
+    for rows in (240, 5000):
+        min_df = make_min_frame(rows)
+        print(f"\n分时数据 {rows} 行:")
+        legacy = bench("iterrows", lambda: legacy_map_min(min_df))
+        records = bench("convert_frame -> BarSeries", lambda: stock_data_provider._map_stock_min_em(min_df))
+        columns = bench("convert_frame -> columns", lambda: frame_to_columns(
+            convert_frame(min_df, STOCK_MIN_EM_COLUMNS, text_columns=("date",))
+        ))
+        print(f"  加速比: BarSeries {legacy / records:.1f}x, columns {legacy / columns:.1f}x")
+
+        spot_df = make_spot_frame(rows)
+        print(f"\n行情快照 {rows} 行:")
+        legacy = bench("iterrows", lambda: legacy_map_screener(spot_df))
+        records = bench("convert_frame -> records", lambda: to_screener_quotes(spot_df))
+        print(f"  加速比: {legacy / records:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
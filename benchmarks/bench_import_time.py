@@ -0,0 +1,87 @@
+"""
+冷启动导入耗时基准
+
+在独立子进程中用 python -X importtime 导入 api.index，输出总耗时和最慢的模块，
+并检查 akshare、pypinyin、redis 等依赖没有在导入阶段被加载（应在首次使用时才导入）。
+总耗时超过预算或这些依赖被提前加载时以非零状态退出，可用于CI回归检查。
+
+pandas/numpy 仍在导入阶段加载（约占总耗时的四成，单独列出）：行情快照、分时K线序列、
+日线存储和选股引擎的模块级代码和类型注解都依赖它们，延迟导入只会把这部分耗时转移到第一个请求上。
+
+运行: python -m benchmarks.bench_import_time --budget-ms 1500
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import List, Tuple
+
+# 导入耗时预算（毫秒），可通过环境变量 IMPORT_TIME_BUDGET_MS 配置
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500"))
+
+# 导入 api.index 时不应被加载的模块
+LAZY_MODULES = ("akshare", "pypinyin", "redis")
+
+# 在导入阶段加载、单独列出累计耗时的模块
+EAGER_MODULES = ("pandas", "numpy")
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+CHECK_SCRIPT = (
+    "import sys, json, api.index; "
+    f"print(json.dumps([m for m in {list(LAZY_MODULES)!r} if m in sys.modules]))"
+)
+
+
+def measure(target: str) -> Tuple[List[Tuple[str, int, int]], str]:
+    """
+    在子进程中导入目标模块并解析 -X importtime 输出
+    :param target: 导入的模块名
+    :return: ([(模块名, 自身耗时微秒, 累计耗时微秒)], 子进程标准输出)
+    """
+    env = dict(os.environ, PREFETCH_ENABLED="0", LOG_TO_FILE="0")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}; {CHECK_SCRIPT}"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            modules.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return modules, result.stdout.strip().splitlines()[-1]
+
+
+def main(args: argparse.Namespace) -> int:
+    modules, loaded = measure("api.index")
+    cumulative = {name: total for name, _, total in modules}
+    total_ms = cumulative.get("api.index", 0) / 1000
+
+    print(f"{'模块':<48}{'自身(ms)':>10}{'累计(ms)':>10}")
+    for name, own, total in sorted(modules, key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{name:<48}{own / 1000:>10.1f}{total / 1000:>10.1f}")
+
+    print(f"\nimport api.index: {total_ms:.1f}ms（预算 {args.budget_ms:.0f}ms）")
+    for name in EAGER_MODULES:
+        if name in cumulative:
+            print(f"  其中 {name}: {cumulative[name] / 1000:.1f}ms")
+    failed = False
+    if total_ms > args.budget_ms:
+        print("导入耗时超出预算")
+        failed = True
+    if loaded != "[]":
+        print(f"导入阶段加载了应延迟导入的模块: {loaded}")
+        failed = True
+    return 1 if failed else 0
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="冷启动导入耗时基准")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_TIME_BUDGET_MS, help="api.index 导入耗时预算（毫秒）")
+    parser.add_argument("--top", type=int, default=15, help="输出自身耗时最长的模块数")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args(sys.argv[1:])))
@@ -1,7 +1,7 @@
 'use client'
 
 import { ReactNode, createContext, useContext, useEffect } from 'react'
-import useStockStore, { fetchStockData } from '@/store/stockStore'
+import useStockStore, { fetchQuotes } from '@/store/stockStore'
 
 // 创建自选股上下文
 export const FavoritesContext = createContext<{
@@ -30,10 +30,8 @@ export function FavoritesProvider({ children }: { children: ReactNode }) {
   useEffect(() => {
     const loadFavoritesData = async () => {
       try {
-        // 异步加载所有自选股数据
-        await Promise.all(
-          favorites.map(favorite => fetchStockData(favorite.symbol))
-        )
+        // 自选股列表只展示报价，一次批量请求获取所有自选股的报价
+        await fetchQuotes(favorites.map(favorite => favorite.symbol))
       } catch (error) {
         console.error('加载自选股数据失败:', error)
       }
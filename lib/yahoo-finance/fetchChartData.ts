@@ -14,13 +14,16 @@ export const validateInterval = (range: Range, interval: Interval): Interval =>
 
 export async function fetchChartData(
   ticker: string,
-  interval: Interval
+  interval: Interval,
+  range?: Range
 ) {
   noStore()
 
   try {
     // 对 ticker 进行 URL 编码
     const encodedTicker = encodeURIComponent(ticker)
+    // 日线/周线/月线需要传入时间范围，分时数据由后端忽略
+    const rangeQuery = range ? `&range=${range}` : ""
     
     // 获取当前请求的 host
     const headersList = headers()
@@ -28,8 +31,8 @@ export async function fetchChartData(
     
     // 构建完整的 URL
     const url = process.env.NODE_ENV === 'development' 
-      ? `http://${host}/api/py/stock/chart?ticker=${encodedTicker}&interval=${interval}`
-      : `${process.env.API_BASE_URL}/api/py/stock/chart?ticker=${encodedTicker}&interval=${interval}`;
+      ? `http://${host}/api/py/stock/chart?ticker=${encodedTicker}&interval=${interval}${rangeQuery}`
+      : `${process.env.API_BASE_URL}/api/py/stock/chart?ticker=${encodedTicker}&interval=${interval}${rangeQuery}`;
     
     // 调用 Python FastAPI 接口
     const response = await fetch(url)
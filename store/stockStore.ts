@@ -248,6 +248,29 @@ export async function fetchStockData(ticker: string, interval: Interval = "1m")
   };
 }
 
+// 批量获取报价数据（自选股列表），一次请求代替逐个请求 /stock/quote
+export async function fetchQuotes(tickers: string[]) {
+  const store = useStockStore.getState();
+  const staleTickers = tickers.filter((ticker) => store.needsUpdate(ticker));
+  
+  if (staleTickers.length > 0) {
+    try {
+      const response = await fetch(`/api/py/stock/quotes?tickers=${encodeURIComponent(staleTickers.join(","))}`);
+      const data = await response.json();
+      
+      if (data && data.quotes) {
+        data.quotes.forEach((quote: QuoteData, index: number) => {
+          store.setQuoteData(staleTickers[index], quote);
+        });
+      }
+    } catch (error) {
+      console.error("批量获取报价数据失败:", error);
+    }
+  }
+  
+  return tickers.map((ticker) => store.getQuoteData(ticker));
+}
+
 // 获取筛选器数据
 export async function fetchScreenerData(screenerType: string = "most_actives", count: number = 40) {
   const store = useStockStore.getState();
@@ -319,4 +342,74 @@ export async function preloadStockChart(ticker: string, interval: Interval = "1m
   return store.getChartData(ticker);
 }
 
+// 由K线列表生成图表数据
+function buildChartData(ticker: string, quotes: any[]): StockData {
+  const lastClose = quotes.length ? quotes[quotes.length - 1].close : 0;
+  const firstClose = quotes.length ? quotes[0].close : 0;
+  return {
+    quotes,
+    meta: {
+      currency: "CNY",
+      symbol: ticker,
+      regularMarketPrice: lastClose,
+      exchangeName: ticker.startsWith('6') ? "SSE" : "SZSE",
+      instrumentType: ticker === "sh000016" || ticker === "sh000300" || ticker === "sh000852" ? "INDEX" : "EQUITY",
+      chartPreviousClose: firstClose,
+      previousClose: firstClose,
+    },
+  };
+}
+
+// 支持实时行情推送的分时间隔；日线及以上周期不推送，继续轮询 /stock/chart
+export const STREAM_INTERVALS: Interval[] = ["1m", "5m", "15m", "30m", "60m", "1h"];
+
+// 订阅实时行情推送（/stock/stream），推送的数据直接写入全局状态
+// 返回取消订阅的函数；连接出错时调用 onError，由调用方回退到轮询
+export function subscribeStockStream(
+  tickers: string[],
+  interval: Interval = "1m",
+  onUpdate?: () => void,
+  onError?: () => void
+): () => void {
+  const store = useStockStore.getState;
+  const source = new EventSource(
+    `/api/py/stock/stream?tickers=${encodeURIComponent(tickers.join(","))}&interval=${interval}`
+  );
+  
+  // 首次推送完整快照
+  source.addEventListener("snapshot", (event) => {
+    const data = JSON.parse((event as MessageEvent).data);
+    store().setChartData(data.ticker, buildChartData(data.ticker, data.bars || []));
+    if (data.quote && Object.keys(data.quote).length > 0) {
+      store().setQuoteData(data.ticker, data.quote);
+    }
+    onUpdate?.();
+  });
+  
+  // 之后只推送新增或更新的K线，替换相同时间及之后的K线
+  source.addEventListener("bars", (event) => {
+    const data = JSON.parse((event as MessageEvent).data);
+    const current = store().getChartData(data.ticker)?.quotes || [];
+    const firstDate = data.bars[0].date;
+    const merged = current.filter((bar: any) => bar.date < firstDate).concat(data.bars);
+    store().setChartData(data.ticker, buildChartData(data.ticker, merged));
+    onUpdate?.();
+  });
+  
+  // 报价只推送变化的字段
+  source.addEventListener("quote", (event) => {
+    const data = JSON.parse((event as MessageEvent).data);
+    const current = store().getQuoteData(data.ticker);
+    store().setQuoteData(data.ticker, { ...(current as QuoteData), ...data.quote });
+    onUpdate?.();
+  });
+  
+  source.onerror = () => {
+    source.close();
+    onError?.();
+  };
+  
+  return () => source.close();
+}
+
 export default useStockStore; 
\ No newline at end of file
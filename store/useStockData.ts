@@ -1,5 +1,5 @@
 import { useEffect, useState } from 'react';
-import useStockStore, { fetchStockData, StockData, QuoteData } from './stockStore';
+import useStockStore, { fetchStockData, subscribeStockStream, STREAM_INTERVALS, StockData, QuoteData } from './stockStore';
 import type { Interval } from "@/types/yahoo-finance";
 
 interface UseStockDataResult {
@@ -93,9 +93,37 @@ export default function useStockData(
   // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [ticker, interval]);
   
-  // 设置轮询
+  // 分时周期优先使用服务端推送，日线及以上周期或推送不可用时使用轮询
+  const [streamFailed, setStreamFailed] = useState(false);
+  const streaming = STREAM_INTERVALS.includes(interval) && !streamFailed && typeof EventSource !== "undefined";
+  
+  useEffect(() => {
+    if (pollingInterval <= 0 || !ticker || !streaming) return;
+    
+    console.log(`订阅实时行情推送，ticker: ${ticker}`);
+    const unsubscribe = subscribeStockStream(
+      [ticker],
+      interval,
+      () => {
+        setChartData(getChartData(ticker));
+        setQuoteData(getQuoteData(ticker));
+      },
+      () => {
+        console.log('实时行情推送连接失败，回退到轮询');
+        setStreamFailed(true);
+      }
+    );
+    
+    return () => {
+      console.log(`取消实时行情推送，ticker: ${ticker}`);
+      unsubscribe();
+    };
+  // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [ticker, interval, pollingInterval, streaming]);
+  
+  // 设置轮询（不使用推送时）
   useEffect(() => {
-    if (pollingInterval <= 0) return;
+    if (pollingInterval <= 0 || streaming) return;
     
     console.log(`设置轮询定时器，ticker: ${ticker}, 轮询间隔: ${pollingInterval}毫秒`);
     
@@ -115,7 +143,7 @@ export default function useStockData(
       clearInterval(intervalId);
     };
   // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [ticker, interval, pollingInterval]);
+  }, [ticker, interval, pollingInterval, streaming]);
   
   return {
     chartData,
@@ -0,0 +1,7 @@
+"""测试环境：日志不写文件，磁盘缓存和日线存储使用临时目录，不读写本机已有的缓存数据"""
+import os
+import tempfile
+
+os.environ.setdefault("LOG_TO_FILE", "0")
+os.environ["DISK_CACHE_DIR"] = tempfile.mkdtemp(prefix="stocks-cache-test-")
+os.environ["HISTORY_STORE_DIR"] = tempfile.mkdtemp(prefix="stocks-history-test-")
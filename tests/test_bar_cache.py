@@ -0,0 +1,107 @@
+"""分时K线缓存测试：增量合并与LRU淘汰"""
+from api.modules.utils.bar_cache import IntradayBarCache
+from api.modules.utils.bar_series import BarSeries
+
+KEY = ("sh600519", "1")
+
+
+def make_bars(times, close=10.0, symbol="sh600519"):
+    records = [
+        {"date": time, "open": close, "close": close + i, "high": close + i + 1, "low": close - 1, "volume": 100.0}
+        for i, time in enumerate(times)
+    ]
+    return BarSeries.from_records(records, symbol, "1")
+
+
+def test_merge_replaces_overlapping_tail():
+    cache = IntradayBarCache(max_entries=10)
+    cache.merge(KEY, make_bars(["2026-10-15 09:31:00", "2026-10-15 09:32:00", "2026-10-15 09:33:00"]))
+
+    # 新数据从09:32开始：09:32之后的缓存K线（可能尚未走完）以新数据为准
+    merged = cache.merge(KEY, make_bars(["2026-10-15 09:32:00", "2026-10-15 09:34:00"], close=20.0))
+
+    assert [bar["date"][11:] for bar in merged] == ["09:31:00", "09:32:00", "09:34:00"]
+    assert merged.close.tolist() == [10.0, 20.0, 21.0]
+    assert (merged.symbol, merged.interval) == KEY
+    assert cache.get_bars(KEY) is merged
+    assert cache.incremental_refreshes == 1
+
+
+def test_merge_does_not_modify_published_series():
+    cache = IntradayBarCache(max_entries=10)
+    first = cache.merge(KEY, make_bars(["2026-10-15 09:31:00", "2026-10-15 09:32:00"]))
+    cache.merge(KEY, make_bars(["2026-10-15 09:32:00", "2026-10-15 09:33:00"], close=20.0))
+
+    # 持有旧序列的请求看到的数据不变
+    assert first.close.tolist() == [10.0, 11.0]
+
+
+def test_merge_trims_to_window_start():
+    cache = IntradayBarCache(max_entries=10)
+    cache.merge(KEY, make_bars(["2026-10-14 14:59:00", "2026-10-14 15:00:00", "2026-10-15 09:31:00"]))
+    merged = cache.merge(KEY, make_bars(["2026-10-15 09:32:00"]), window_start="2026-10-15 09:30:00")
+
+    assert [bar["date"] for bar in merged] == ["2026-10-15 09:31:00", "2026-10-15 09:32:00"]
+
+
+def test_version_bumps_only_when_bars_change():
+    cache = IntradayBarCache(max_entries=10)
+    bars = make_bars(["2026-10-15 09:31:00", "2026-10-15 09:32:00"])
+    cache.merge(KEY, bars)
+    version = cache.get(KEY).version
+
+    # 上游返回与缓存相同的K线，或没有新数据：派生数据无需重新计算
+    cache.merge(KEY, bars[1:])
+    cache.merge(KEY, BarSeries())
+    assert cache.get(KEY).version == version
+
+    cache.merge(KEY, make_bars(["2026-10-15 09:33:00"]))
+    assert cache.get(KEY).version == version + 1
+
+
+def test_derived_value_recomputed_after_change():
+    cache = IntradayBarCache(max_entries=10)
+    cache.merge(KEY, make_bars(["2026-10-15 09:31:00"]))
+    calls = []
+
+    def count(bars):
+        calls.append(len(bars))
+        return len(bars)
+
+    assert cache.get_derived(KEY, "count", count) == 1
+    assert cache.get_derived(KEY, "count", count) == 1
+    cache.merge(KEY, make_bars(["2026-10-15 09:32:00"]))
+    assert cache.get_derived(KEY, "count", count) == 2
+    assert calls == [1, 2]
+
+
+def test_evicts_least_recently_used_entry():
+    cache = IntradayBarCache(max_entries=2)
+    keys = [("sh600519", "1"), ("sz000001", "1"), ("sh601318", "1")]
+    cache.merge(keys[0], make_bars(["2026-10-15 09:31:00"], symbol=keys[0][0]))
+    cache.merge(keys[1], make_bars(["2026-10-15 09:31:00"], symbol=keys[1][0]))
+    # 访问第一个条目，使第二个条目成为最久未使用
+    cache.get(keys[0])
+    cache.merge(keys[2], make_bars(["2026-10-15 09:31:00"], symbol=keys[2][0]))
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
+    assert cache.stats()["entries"] == 2 and cache.evictions == 1
+
+
+def test_evicts_by_estimated_bytes():
+    times = [f"2026-10-15 09:{minute:02d}:00" for minute in range(31, 41)]
+    size = make_bars(times).nbytes
+    cache = IntradayBarCache(max_entries=10, max_bytes=size * 2)
+    keys = [(symbol, "1") for symbol in ("sh600519", "sz000001", "sh601318")]
+    for key in keys:
+        cache.merge(key, make_bars(times, symbol=key[0]))
+
+    assert cache.get(keys[0]) is None
+    assert cache.stats()["bytes"] == size * 2
+    assert cache.evictions == 1
+
+    # 条目增长后同样按内存上限淘汰
+    cache.merge(keys[2], make_bars([f"2026-10-15 10:{minute:02d}:00" for minute in range(10)], symbol=keys[2][0]))
+    assert cache.get(keys[1]) is None
+    assert cache.stats()["bytes"] <= size * 2
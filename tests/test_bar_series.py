@@ -0,0 +1,123 @@
+"""K线序列测试：二分查找、拼接、按时间截取、切片视图与追加"""
+import pickle
+import pytest
+
+from api.modules.utils.bar_series import BarSeries
+
+TIMES = [
+    "2026-10-15 14:58:00",
+    "2026-10-15 14:59:00",
+    "2026-10-15 15:00:00",
+    "2026-10-16 09:31:00",
+    "2026-10-16 09:32:00",
+]
+
+
+def make_bars(times=TIMES, start=0):
+    records = [
+        {"date": time, "open": 10.0 + i, "close": 10.5 + i, "high": 11.0 + i, "low": 9.5 + i, "volume": 100.0 * (i + 1)}
+        for i, time in enumerate(times, start)
+    ]
+    return BarSeries.from_records(records, "sh600519", "1")
+
+
+def dates(bars):
+    return [bar["date"] for bar in bars]
+
+
+@pytest.mark.parametrize("date, index", [
+    ("2026-10-15 09:30:00", 0),  # 早于全部K线
+    ("2026-10-15 14:58:00", 0),  # 恰好等于第一根
+    ("2026-10-15 14:58:30", 1),  # 两根K线之间
+    ("2026-10-16 09:31:00", 3),
+    ("2026-10-16 09:32:00", 4),  # 恰好等于最后一根
+    ("2026-10-16 09:33:00", 5),  # 晚于全部K线
+])
+def test_index_at(date, index):
+    assert make_bars().index_at(date) == index
+
+
+def test_index_at_empty():
+    assert BarSeries().index_at("2026-10-15 09:31:00") == 0
+
+
+def test_since():
+    bars = make_bars()
+    assert dates(bars.since("2026-10-15 15:00:00")) == TIMES[2:]
+    assert dates(bars.since("2026-10-16 00:00:00")) == TIMES[3:]
+    assert len(bars.since("2026-10-17 00:00:00")) == 0
+    assert dates(bars.last_day()) == TIMES[3:]
+    # 截取结果保留元数据
+    assert (bars.since(TIMES[1]).symbol, bars.since(TIMES[1]).interval) == ("sh600519", "1")
+
+
+def test_concat():
+    head, tail = make_bars(TIMES[:2]), make_bars(TIMES[2:], start=2)
+    tail.symbol = "other"
+    merged = BarSeries.concat([head, tail])
+
+    assert merged.to_records() == make_bars().to_records()
+    # 元数据取第一个序列
+    assert merged.symbol == "sh600519"
+    assert len(BarSeries.concat([])) == 0
+    assert BarSeries.concat([BarSeries(), head]).equals(head)
+
+
+def test_concat_copies_parts():
+    head = make_bars(TIMES[:2])
+    merged = BarSeries.concat([head, make_bars(TIMES[2:], start=2)])
+    merged["close"][0] = 0.0
+    assert head.close[0] == 10.5
+
+
+def test_slice_is_view_sharing_buffers():
+    bars = make_bars()
+    view = bars[1:3]
+
+    assert dates(view) == TIMES[1:3]
+    assert view[0] == bars[1]
+    assert view[-1]["date"] == TIMES[2]
+    with pytest.raises(IndexError):
+        view[2]
+    # 视图共享底层数组
+    assert view.close.base is not None
+    assert view.nbytes < bars.nbytes
+
+
+def test_append_to_view_does_not_modify_original():
+    bars = make_bars()
+    original = bars.to_records()
+    view = bars[:2]
+    view.append("2026-10-15 14:59:30", 1.0, 2.0, 3.0, 0.5, 10.0)
+
+    assert dates(view) == TIMES[:2] + ["2026-10-15 14:59:30"]
+    assert bars.to_records() == original
+
+
+def test_append_grows_and_invalidates_records():
+    bars = BarSeries(symbol="sh600519", interval="1")
+    for i in range(40):
+        bars.append(f"2026-10-15 10:{i:02d}:00", 1.0, 1.0 + i, 2.0, 0.5, 1.0)
+        assert len(bars.to_records()) == i + 1
+    assert bars.last_date == "2026-10-15 10:39:00"
+    assert bars.close.tolist() == [1.0 + i for i in range(40)]
+
+
+def test_equals_and_pickle():
+    bars = make_bars()
+    assert bars.equals(make_bars())
+    assert not bars.equals(make_bars(TIMES[:4]))
+    assert not bars.equals(make_bars(start=1))
+
+    view = bars[1:]
+    restored = pickle.loads(pickle.dumps(view))
+    assert restored.equals(view) and (restored.symbol, restored.interval) == ("sh600519", "1")
+
+
+def test_aggregates():
+    last_day = make_bars().last_day()
+    assert last_day.day_high() == 15.0
+    assert last_day.day_low() == 12.5
+    assert last_day.total_volume() == 900.0
+    assert last_day.cumulative_volume().tolist() == [400.0, 900.0]
+    assert BarSeries().day_high() is None and BarSeries().vwap() is None
@@ -0,0 +1,103 @@
+"""共享缓存后端（Redis）测试，使用 fakeredis 代替真实的Redis服务"""
+import asyncio
+import threading
+import time
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from api.modules.utils.cache_backend import RedisCacheBackend, RefreshLock, refresh_lock_stats
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def make_backend(server, prefix: str = "test:") -> RedisCacheBackend:
+    """连接到同一个 FakeServer 的后端相当于两个工作进程"""
+    return RedisCacheBackend(client=fakeredis.FakeRedis(server=server), prefix=prefix)
+
+
+def test_get_set_round_trip(server):
+    writer, reader = make_backend(server), make_backend(server)
+    value = (1700000000.0, {"symbol": "sh600519", "bars": [1.0, 2.0]})
+    writer.set("bars:sh600519:1", value)
+
+    assert reader.get("bars:sh600519:1") == value
+    assert reader.get("bars:sz000001:1") is None
+    assert (reader.hits, reader.misses, reader.errors) == (1, 1, 0)
+    # 键按前缀保存
+    assert fakeredis.FakeRedis(server=server).exists("test:bars:sh600519:1")
+
+
+def test_set_ttl(server):
+    backend = make_backend(server)
+    backend.set("snapshot:spot", "data", ttl=0.2)
+    ttl_ms = fakeredis.FakeRedis(server=server).pttl("test:snapshot:spot")
+    assert 0 < ttl_ms <= 200
+    assert backend.get("snapshot:spot") == "data"
+
+    time.sleep(0.3)
+    assert backend.get("snapshot:spot") is None
+
+
+def test_refresh_lock_contention(server):
+    first, second = make_backend(server), make_backend(server)
+    contended = refresh_lock_stats["contended"]
+
+    with RefreshLock(first, "snapshot:spot", ttl=5) as leader:
+        assert leader
+        # 锁被另一个工作进程持有：等待到超时后返回False
+        started = time.monotonic()
+        with RefreshLock(second, "snapshot:spot", ttl=5, wait_timeout=0.2) as other:
+            assert not other
+        assert time.monotonic() - started >= 0.2
+    assert refresh_lock_stats["contended"] == contended + 1
+
+    # 持有者释放后可以立即获取
+    with RefreshLock(second, "snapshot:spot", ttl=5) as leader:
+        assert leader
+
+
+def test_refresh_lock_waiter_wakes_on_release(server):
+    first, second = make_backend(server), make_backend(server)
+    holder = RefreshLock(first, "bars:sh600519:1", ttl=5)
+    assert holder.__enter__()
+    threading.Timer(0.1, holder.__exit__, (None, None, None)).start()
+
+    started = time.monotonic()
+    with RefreshLock(second, "bars:sh600519:1", ttl=5, wait_timeout=5) as leader:
+        assert not leader
+    # 持有者释放后等待方立即返回，由调用方重新读取共享缓存
+    assert time.monotonic() - started < 1
+
+
+def test_release_keeps_lock_taken_after_expiry(server):
+    first, second = make_backend(server), make_backend(server)
+    token = first.acquire_lock("snapshot:spot", ttl=0.1)
+    assert token is not None
+    time.sleep(0.2)
+
+    other = second.acquire_lock("snapshot:spot", ttl=5)
+    assert other is not None
+    # 过期的持有者释放时不能删除他人持有的锁
+    first.release_lock("snapshot:spot", token)
+    assert second.is_locked("snapshot:spot")
+    second.release_lock("snapshot:spot", other)
+    assert not second.is_locked("snapshot:spot")
+
+
+def test_async_refresh_lock_contention(server):
+    first, second = make_backend(server), make_backend(server)
+
+    async def run():
+        async with RefreshLock(first, "bars:sh600519:1", ttl=5) as leader:
+            assert leader
+            async with RefreshLock(second, "bars:sh600519:1", ttl=5, wait_timeout=0.2) as other:
+                assert not other
+        async with RefreshLock(second, "bars:sh600519:1", ttl=5) as leader:
+            assert leader
+
+    asyncio.run(run())
+    assert not first.is_locked("bars:sh600519:1")
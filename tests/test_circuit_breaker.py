@@ -0,0 +1,130 @@
+"""熔断器状态转换测试：closed -> open -> half_open -> closed/open"""
+import time
+import pytest
+
+from api.modules.utils.circuit_breaker import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerRegistry, circuit_breaker, circuit_breakers,
+)
+
+OPEN_SECONDS = 0.05
+
+
+def make_breaker(**kwargs) -> CircuitBreaker:
+    options = dict(window_seconds=60, min_calls=4, error_threshold=0.5, open_seconds=OPEN_SECONDS)
+    options.update(kwargs)
+    return CircuitBreaker("test", **options)
+
+
+def trip(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.min_calls):
+        breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+def test_stays_closed_below_min_calls_and_threshold():
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_failure()
+    # 调用次数不足 min_calls 时不判断熔断
+    assert breaker.state == CLOSED
+
+    breaker = make_breaker()
+    for ok in (True, True, True, False, False):
+        breaker.record_success(0.1) if ok else breaker.record_failure()
+    # 错误率 40% 低于阈值
+    assert breaker.state == CLOSED
+    assert breaker.error_rate() == pytest.approx(0.4)
+
+
+def test_opens_at_error_threshold_and_rejects():
+    breaker = make_breaker()
+    for ok in (True, True, False, False):
+        breaker.record_success(0.1) if ok else breaker.record_failure()
+    assert breaker.state == OPEN
+
+    assert not breaker.allow_request()
+    assert breaker.rejected == 1
+    assert breaker.health_score() == float("inf")
+
+
+def test_half_open_allows_single_probe():
+    breaker = make_breaker()
+    trip(breaker)
+    time.sleep(OPEN_SECONDS * 1.5)
+
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    # 探测请求完成前其余请求仍被拒绝
+    assert not breaker.allow_request()
+
+
+def test_probe_success_closes_and_resets_window():
+    breaker = make_breaker()
+    trip(breaker)
+    time.sleep(OPEN_SECONDS * 1.5)
+    assert breaker.allow_request()
+
+    breaker.record_success(0.2)
+    assert breaker.state == CLOSED
+    # 恢复后熔断前的失败不再计入错误率
+    assert breaker.error_rate() == 0.0
+    assert breaker.allow_request() and breaker.allow_request()
+
+
+def test_probe_failure_reopens():
+    breaker = make_breaker()
+    trip(breaker)
+    time.sleep(OPEN_SECONDS * 1.5)
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    # 重新计算冷却时间
+    assert not breaker.allow_request()
+
+
+def test_failures_expire_from_window():
+    breaker = make_breaker(window_seconds=0.05)
+    for _ in range(3):
+        breaker.record_failure()
+    time.sleep(0.1)
+    breaker.record_failure()
+    # 过期的失败不计入窗口，只剩1次调用
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["calls"] == 1
+
+
+def test_registry_orders_by_health():
+    registry = CircuitBreakerRegistry()
+    registry.get("slow").record_success(2.0)
+    registry.get("fast").record_success(0.1)
+    broken = registry.get("broken")
+    broken.min_calls = 1
+    broken.record_failure()
+
+    sources = [{"name": "broken"}, {"name": "slow"}, {"name": "fast"}]
+    assert [source["name"] for source in registry.order(sources)] == ["fast", "slow", "broken"]
+
+
+def test_decorator_counts_none_and_errors_as_failures():
+    name = "test_decorator_source"
+    breaker = circuit_breakers.get(name)
+    breaker.min_calls, breaker.open_seconds = 3, 60
+    calls = []
+
+    @circuit_breaker(name)
+    def fetch(value):
+        calls.append(value)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    assert fetch(1) == 1
+    assert fetch(None) is None
+    with pytest.raises(RuntimeError):
+        fetch(RuntimeError("upstream"))
+    assert breaker.state == OPEN
+
+    # 熔断期间直接返回None，不访问上游
+    assert fetch(2) is None
+    assert len(calls) == 3
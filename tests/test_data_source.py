@@ -0,0 +1,41 @@
+"""数据源调用指标测试：指标按实际调用的akshare函数名记录，而不是数据提供者的方法名"""
+import pandas as pd
+import pytest
+
+from api.modules.utils import data_source
+from api.modules.utils.data_source import ReplaySource, call_source, use_data_source
+from api.modules.utils.metrics import metrics
+from api.modules.utils.stock_data_provider import stock_data_provider
+
+
+def counter(name: str, function: str) -> float:
+    return metrics._counters[name].get((("function", function),), 0.0)
+
+
+@pytest.fixture
+def replay(tmp_path):
+    frame = pd.DataFrame({"时间": ["2026-10-15 09:31:00"], "开盘": [1.0], "收盘": [1.1], "最高": [1.2], "最低": [0.9], "成交量": [100.0]})
+    frame.to_pickle(tmp_path / "index_zh_a_hist_min_em.pkl")
+    original = data_source.data_source
+    use_data_source(ReplaySource(str(tmp_path)))
+    yield
+    use_data_source(original)
+
+
+def test_records_akshare_function_name(replay):
+    calls = counter("akshare_calls_total", "index_zh_a_hist_min_em")
+    rows = counter("akshare_rows_total", "index_zh_a_hist_min_em")
+
+    # get_index_min_sina 实际调用的是 index_zh_a_hist_min_em
+    assert stock_data_provider.get_index_min_sina("sh000300") is not None
+
+    assert counter("akshare_calls_total", "index_zh_a_hist_min_em") == calls + 1
+    assert counter("akshare_rows_total", "index_zh_a_hist_min_em") == rows + 1
+    assert counter("akshare_calls_total", "get_index_min_sina") == 0
+
+
+def test_records_errors(replay):
+    errors = counter("akshare_errors_total", "stock_zh_a_spot_em")
+    with pytest.raises(LookupError):
+        call_source("stock_zh_a_spot_em")
+    assert counter("akshare_errors_total", "stock_zh_a_spot_em") == errors + 1
@@ -0,0 +1,67 @@
+"""磁盘缓存测试：已定稿交易日不被覆盖、按交易日范围读取、目录不可用时关闭磁盘缓存"""
+import os
+
+from api.modules.utils.disk_cache import DiskCache
+
+
+def test_round_trip(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    assert cache.get("intraday", "sh600519", "1", "2026-10-15") is None
+
+    cache.put("intraday", "sh600519", "1", "2026-10-15", b"bars", complete=False)
+    entry = cache.get("intraday", "sh600519", "1", "2026-10-15")
+
+    assert (entry.trade_day, entry.payload, entry.complete) == ("2026-10-15", b"bars", False)
+    assert cache.get("intraday", "sh600519", "5", "2026-10-15") is None
+    assert (cache.hits, cache.misses, cache.writes) == (1, 2, 1)
+
+
+def test_incomplete_day_is_overwritten(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache.put("intraday", "sh600519", "1", "2026-10-15", b"morning", complete=False)
+    cache.put("intraday", "sh600519", "1", "2026-10-15", b"close", complete=True)
+
+    entry = cache.get("intraday", "sh600519", "1", "2026-10-15")
+    assert (entry.payload, entry.complete) == (b"close", True)
+
+
+def test_complete_day_is_not_overwritten(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache.put("intraday", "sh600519", "1", "2026-10-15", b"close", complete=True)
+    # 定稿后的写入（如晚到的不完整数据）被忽略
+    cache.put("intraday", "sh600519", "1", "2026-10-15", b"partial", complete=False)
+    cache.put("intraday", "sh600519", "1", "2026-10-15", b"again", complete=True)
+
+    entry = cache.get("intraday", "sh600519", "1", "2026-10-15")
+    assert (entry.payload, entry.complete) == (b"close", True)
+
+
+def test_get_since_orders_by_trade_day(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    for day in ("2026-10-16", "2026-10-14", "2026-10-15"):
+        cache.put("intraday", "sh600519", "1", day, day.encode(), complete=day != "2026-10-16")
+    cache.put("intraday", "sz000001", "1", "2026-10-16", b"other", complete=False)
+
+    entries = cache.get_since("intraday", "sh600519", "1", "2026-10-15")
+    assert [(entry.trade_day, entry.complete) for entry in entries] == [("2026-10-15", True), ("2026-10-16", False)]
+
+
+def test_shared_between_instances(tmp_path):
+    # 同一目录的两个实例相当于两个工作进程
+    DiskCache(str(tmp_path)).put("snapshot", "*", "spot", "2026-10-15", b"spot", complete=True)
+    assert DiskCache(str(tmp_path)).get("snapshot", "*", "spot", "2026-10-15").payload == b"spot"
+
+
+def test_unusable_directory_disables_cache(tmp_path):
+    # 存储目录的上级是文件，os.makedirs 抛出 OSError
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = DiskCache(os.path.join(str(blocker), "cache"))
+
+    assert cache.get("intraday", "sh600519", "1", "2026-10-15") is None
+    cache.put("intraday", "sh600519", "1", "2026-10-15", b"bars", complete=True)
+    assert cache.get_since("intraday", "sh600519", "1", "2026-10-15") == []
+
+    assert cache.enabled is False
+    assert cache.errors == 1 and cache.writes == 0
+    assert cache.stats()["bytes"] == 0
@@ -0,0 +1,37 @@
+"""日线存储测试：存储目录在首次写入时才创建，只追加更新的记录"""
+import numpy as np
+
+from api.modules.utils.history_store import HISTORY_DTYPE, HistoryStore
+
+
+def make_records(days):
+    records = np.zeros(len(days), dtype=HISTORY_DTYPE)
+    records["date"] = np.array(days, dtype="M8[D]")
+    records["close"] = np.arange(len(days), dtype="float64") + 10
+    return records
+
+
+def test_directory_created_on_first_write(tmp_path):
+    root = tmp_path / "history"
+    store = HistoryStore(str(root))
+
+    # 创建实例和读取都不创建目录
+    assert not root.exists()
+    assert store.count("sh600519") == 0 and len(store.read("sh600519")) == 0
+    assert store.stats()["symbols"] == 0
+    assert store.append("sh600519", make_records([])) == 0
+    assert not root.exists()
+
+    assert store.append("sh600519", make_records(["2026-10-14", "2026-10-15"])) == 2
+    assert root.is_dir()
+    assert store.stats()["records"] == 2
+
+
+def test_append_skips_existing_dates(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append("sh600519", make_records(["2026-10-14", "2026-10-15"]))
+
+    assert store.append("sh600519", make_records(["2026-10-15", "2026-10-16"])) == 1
+    dates = np.datetime_as_string(store.read("sh600519")["date"]).tolist()
+    assert dates == ["2026-10-14", "2026-10-15", "2026-10-16"]
+    assert str(store.last_date("sh600519")) == "2026-10-16"
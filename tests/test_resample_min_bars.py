@@ -0,0 +1,119 @@
+"""分钟K线聚合测试（StockDataProvider.resample_min_bars），与手工分组的1分钟K线比较"""
+import pytest
+
+from api.modules.utils.bar_series import BarSeries
+from api.modules.utils.stock_data_provider import StockDataProvider
+
+# 手工构造的1分钟K线：包含09:30开盘K线、午休前后各一根K线、收盘K线和下一交易日的K线
+TIMES = [
+    "2026-10-15 09:30:00",  # 0 开盘K线，并入第一个周期
+    "2026-10-15 09:31:00",  # 1
+    "2026-10-15 09:35:00",  # 2
+    "2026-10-15 09:36:00",  # 3
+    "2026-10-15 10:30:00",  # 4
+    "2026-10-15 11:29:00",  # 5
+    "2026-10-15 11:30:00",  # 6 午休前最后一根
+    "2026-10-15 13:01:00",  # 7 午休后第一根
+    "2026-10-15 13:05:00",  # 8
+    "2026-10-15 14:00:00",  # 9
+    "2026-10-15 14:01:00",  # 10
+    "2026-10-15 15:00:00",  # 11 收盘
+    "2026-10-16 09:31:00",  # 12 下一交易日
+]
+
+# 各周期的期望结果：(以结束时间为标签的K线时间, 归入该K线的1分钟K线下标)
+EXPECTED = {
+    5: [
+        ("2026-10-15 09:35:00", [0, 1, 2]),
+        ("2026-10-15 09:40:00", [3]),
+        ("2026-10-15 10:30:00", [4]),
+        ("2026-10-15 11:30:00", [5, 6]),
+        ("2026-10-15 13:05:00", [7, 8]),
+        ("2026-10-15 14:00:00", [9]),
+        ("2026-10-15 14:05:00", [10]),
+        ("2026-10-15 15:00:00", [11]),
+        ("2026-10-16 09:35:00", [12]),
+    ],
+    15: [
+        ("2026-10-15 09:45:00", [0, 1, 2, 3]),
+        ("2026-10-15 10:30:00", [4]),
+        ("2026-10-15 11:30:00", [5, 6]),
+        ("2026-10-15 13:15:00", [7, 8]),
+        ("2026-10-15 14:00:00", [9]),
+        ("2026-10-15 14:15:00", [10]),
+        ("2026-10-15 15:00:00", [11]),
+        ("2026-10-16 09:45:00", [12]),
+    ],
+    30: [
+        ("2026-10-15 10:00:00", [0, 1, 2, 3]),
+        ("2026-10-15 10:30:00", [4]),
+        ("2026-10-15 11:30:00", [5, 6]),
+        ("2026-10-15 13:30:00", [7, 8]),
+        ("2026-10-15 14:00:00", [9]),
+        ("2026-10-15 14:30:00", [10]),
+        ("2026-10-15 15:00:00", [11]),
+        ("2026-10-16 10:00:00", [12]),
+    ],
+    60: [
+        ("2026-10-15 10:30:00", [0, 1, 2, 3, 4]),
+        ("2026-10-15 11:30:00", [5, 6]),
+        ("2026-10-15 14:00:00", [7, 8, 9]),
+        ("2026-10-15 15:00:00", [10, 11]),
+        ("2026-10-16 10:30:00", [12]),
+    ],
+}
+
+
+def make_bars():
+    records = [
+        {
+            "date": date,
+            "open": 10.0 + i,
+            "close": 10.5 + i,
+            # 最高/最低价不随时间单调变化，检查聚合取的是区间极值而不是首尾
+            "high": 12.0 + (i * 7) % 5,
+            "low": 9.0 - (i * 3) % 4,
+            "volume": 100.0 * (i + 1),
+        }
+        for i, date in enumerate(TIMES)
+    ]
+    return BarSeries.from_records(records, "sh600519", "1"), records
+
+
+@pytest.mark.parametrize("minutes", sorted(EXPECTED))
+def test_resample_matches_hand_grouped_bars(minutes):
+    bars, records = make_bars()
+    result = StockDataProvider.resample_min_bars(bars, minutes)
+
+    expected = []
+    for label, indices in EXPECTED[minutes]:
+        group = [records[i] for i in indices]
+        expected.append({
+            "date": label,
+            "open": group[0]["open"],
+            "close": group[-1]["close"],
+            "high": max(bar["high"] for bar in group),
+            "low": min(bar["low"] for bar in group),
+            "volume": sum(bar["volume"] for bar in group),
+        })
+    assert result.to_records() == expected
+    assert (result.symbol, result.interval) == ("sh600519", str(minutes))
+
+
+def test_lunch_break_is_not_merged():
+    bars, _ = make_bars()
+    for minutes in EXPECTED:
+        resampled = StockDataProvider.resample_min_bars(bars, minutes).to_records()
+        labels = [bar["date"][11:16] for bar in resampled[:-1]]
+        # 午休前的最后一根K线标签为11:30，午休后的K线从下午时段重新计数
+        assert "11:30" in labels
+        assert not any("11:30" < label <= "13:00" for label in labels)
+
+
+def test_empty_and_unsupported_interval():
+    empty = StockDataProvider.resample_min_bars(BarSeries(symbol="sh600519", interval="1"), 5)
+    assert len(empty) == 0 and empty.interval == "5"
+
+    bars, _ = make_bars()
+    with pytest.raises(ValueError):
+        StockDataProvider.resample_min_bars(bars, 7)
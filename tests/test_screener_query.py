@@ -0,0 +1,100 @@
+"""自定义筛选查询测试：运算符优先级、未知字段、语法错误及接口返回的错误信息"""
+import asyncio
+import httpx
+import pandas as pd
+import pytest
+
+from api.index import app
+from api.modules.utils.async_data_provider import async_stock_data_provider
+from api.modules.utils.screener_query import QuerySyntaxError, build_screener_frame, compile_query, run_query
+
+# 手工构造的行情快照（东方财富列名）
+SNAPSHOT = pd.DataFrame({
+    "代码": ["600519", "000001", "601398", "300750", "688981"],
+    "名称": ["贵州茅台", "平安银行", "工商银行", "宁德时代", "中芯国际"],
+    "所处行业": ["酿酒行业", "银行", "银行", "电池", "半导体"],
+    "最新价": [1500.0, 11.0, 5.5, 200.0, 80.0],
+    "涨跌额": [15.0, -0.1, 0.05, 6.0, -1.6],
+    "涨跌幅": [1.0, -0.9, 0.9, 3.0, -2.0],
+    "成交量": [3e4, 9e5, 2e6, 4e5, 6e5],
+    "成交额": [4.5e9, 1e9, 1.1e9, 8e9, 4.8e9],
+    "市盈率-动态": [25.0, 4.5, 5.0, 20.0, None],
+    "总市值": [1.9e12, 2.1e11, 1.9e12, 8.8e11, 6.4e11],
+})
+
+
+def symbols(query: str):
+    return run_query(build_screener_frame(SNAPSHOT), compile_query(query))["代码"].tolist()
+
+
+def test_and_binds_tighter_than_or():
+    # pe<5 or (changePct>0 and price>100)
+    assert symbols("pe<5 or changePct>0 and price>100 sort symbol") == ["000001", "300750", "600519"]
+    # 括号改变优先级：(pe<5 or changePct>0) and price>100
+    assert symbols("(pe<5 or changePct>0) and price>100 sort symbol") == ["300750", "600519"]
+
+
+def test_not_binds_tighter_than_and():
+    # (not sector="银行") and changePct>0
+    assert symbols('not sector="银行" and changePct>0 sort symbol') == ["300750", "600519"]
+    assert symbols('not (sector="银行" and changePct>0) sort symbol') == ["000001", "300750", "600519", "688981"]
+
+
+def test_missing_values_never_match():
+    # 中芯国际的市盈率缺失，pe 条件取反之外都不会选中
+    assert "688981" not in symbols("pe>0 or pe<=0")
+
+
+def test_units_sort_and_limit():
+    assert symbols("marketCap>=1e12 sort -price") == ["600519", "601398"]
+    assert symbols("amount>4.5亿 sort -amount limit 2") == ["300750", "688981"]
+    assert symbols('name~"银行" sort price') == ["601398", "000001"]
+
+
+@pytest.mark.parametrize("query, message", [
+    ("foo>1", "未知字段: foo"),
+    ("pe>1 sort bar", "未知排序字段: bar"),
+    ('name>"银行"', "字段 name 不支持运算符 >"),
+    ("pe<", "查询意外结束"),
+    ("pe 20", "字段 pe 之后需要比较运算符"),
+    ("(pe<20", "查询意外结束"),
+    ("pe<20)", "多余的内容: ')'"),
+    ("pe<20 and", "查询意外结束"),
+    ("pe<20 # 1", "无法识别的字符: '# 1'"),
+    ("limit 0", "limit 必须大于0"),
+])
+def test_syntax_errors(query, message):
+    with pytest.raises(QuerySyntaxError) as error:
+        compile_query(query)
+    assert str(error.value) == message
+
+
+def request_query(query: str) -> httpx.Response:
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/api/py/stock/screener/query", params={"q": query})
+    return asyncio.run(send())
+
+
+@pytest.mark.parametrize("query, message", [
+    ("pe<5 or foo>1", "查询语法错误: 未知字段: foo"),
+    ("pe<20 sort -bar", "查询语法错误: 未知排序字段: bar"),
+    ("(pe<20 and price>10", "查询语法错误: 查询意外结束"),
+    ("pe<20 price>10", "查询语法错误: 多余的内容: 'price'"),
+])
+def test_endpoint_reports_query_errors(query, message):
+    response = request_query(query)
+    assert response.status_code == 200
+    assert response.json() == {"quotes": [], "error": message}
+
+
+def test_endpoint_runs_query(monkeypatch):
+    async def get_snapshot_derived(snapshot, name, compute):
+        return compute(SNAPSHOT)
+
+    monkeypatch.setattr(async_stock_data_provider, "get_snapshot_derived", get_snapshot_derived)
+    response = request_query("pe<5 or changePct>0 and price>100 sort -price")
+
+    assert response.status_code == 200
+    assert [quote["symbol"] for quote in response.json()["quotes"]] == ["sh600519", "sz300750", "sz000001"]